@@ -1,21 +1,179 @@
-from flask import Blueprint, jsonify, request
-from config import data_manager
+import hashlib
+import json
+from itertools import islice
+from urllib.parse import urlencode
+from flask import Blueprint, Response, jsonify, request, stream_with_context, url_for
+from config import (BATCH_IMPORT_MAX_ITEMS, MAX_PAGE_SIZE, MOVIES_PAGE_SIZE, SEARCH_PAGE_SIZE,
+                    STREAM_BATCH_SIZE, SUGGEST_MAX_RESULTS, USERS_PAGE_SIZE, data_manager,
+                    data_versions, job_queue, lookup_cache, movie_lookup, page_cache, title_index)
+from data_manager.listing import MovieQuery, next_cursor
+from data_manager.search import highlight_html
+from data_manager.versioned_data_manager import user_version_keys
 
 api = Blueprint("api", __name__)
 
 
+def representation(format_name, **args) -> str:
+    """
+    Return what tells one representation of some data from the others: its format and the
+    request arguments that shape it, normalized (defaults applied, sorted, None left out).
+    """
+    args = sorted((name, value) for name, value in args.items() if value is not None)
+    return f"{format_name}?{urlencode(args)}"
+
+
+def conditional(version_keys, make_response, variant=""):
+    """
+    Return `make_response()` with ETag and Last-Modified, or 304 if the client's copy is current.
+
+    The validators are derived from the data versions only, so a 304 neither queries nor
+    serializes the data. The ETag also covers the representation, so a page, another page and
+    an export of the same data never share one.
+
+    :param version_keys: The data version keys the response depends on.
+    :type version_keys: tuple
+
+    :param make_response: Function building the full response.
+    :type make_response: function
+
+    :param variant: The representation of the response (see `representation`).
+    :type variant: str
+    """
+    # Read versions before the data -> A write racing the read can only make the ETag older
+    etag = f"{data_versions.etag(version_keys)}-{hashlib.sha1(variant.encode()).hexdigest()[:16]}"
+    last_modified = data_versions.last_modified(version_keys)
+
+    # Is client's copy current? -> Answer without the data (If-None-Match wins over If-Modified-Since)
+    if request.if_none_match:
+        is_not_modified = request.if_none_match.contains(etag)
+    else:
+        is_not_modified = (request.if_modified_since is not None
+                           and int(last_modified) <= request.if_modified_since.timestamp())
+
+    response = Response(status=304) if is_not_modified else make_response()
+    response.set_etag(etag)
+    response.last_modified = int(last_modified)
+    return response
+
+
+def conditional_json(version_keys, load, next_url=None, variant=""):
+    """
+    Return the JSON of `load()` as a conditional response (see `conditional`).
+
+    :param version_keys: The data version keys the response depends on.
+    :type version_keys: tuple
+
+    :param load: Function returning the data to serialize.
+    :type load: function
+
+    :param next_url: Optional function returning the URL of the next page of the loaded data,
+                     sent as a "next" link, or None if it is the last page.
+    :type next_url: function
+
+    :param variant: The representation of the response (see `representation`).
+    :type variant: str
+    """
+    def make_response():
+        data = load()
+        response = jsonify(data)
+
+        # Is there a next page? -> Link to it
+        url = next_url(data) if next_url else None
+        if url:
+            response.headers["Link"] = f'<{url}>; rel="next"'
+        return response
+
+    return conditional(version_keys, make_response, variant)
+
+
+def stream_items(items, ndjson=False):
+    """
+    Return a response writing (key, value) pairs incrementally as they are iterated.
+
+    Items are serialized and sent `STREAM_BATCH_SIZE` at a time, so memory use stays constant
+    and the first bytes leave before the last item is read.
+
+    :param items: Iterable of (key, value) pairs, value being a dictionary.
+    :type items: iterable
+
+    :param ndjson: Whether to write one JSON document per line, {"id": key, **value}, instead of
+                   a single JSON object {key: value, ...}.
+    :type ndjson: bool
+    """
+    def generate():
+        iterator = iter(items)
+        is_first_chunk = True
+        if not ndjson:
+            yield "{"
+
+        while True:
+            batch = list(islice(iterator, STREAM_BATCH_SIZE))
+            if not batch:
+                break
+
+            if ndjson:
+                yield "".join(json.dumps({"id": key, **value}) + "\n" for key, value in batch)
+            else:
+                chunk = ", ".join(f"{json.dumps(str(key))}: {json.dumps(value)}" for key, value in batch)
+                yield chunk if is_first_chunk else ", " + chunk
+            is_first_chunk = False
+
+        if not ndjson:
+            yield "}"
+
+    return Response(stream_with_context(generate()),
+                    mimetype="application/x-ndjson" if ndjson else "application/json")
+
+
 # --- API Endpoints ---
 @api.route('/users', methods=['GET'])
 def get_users():
-    users = data_manager.get_all_users()
-    return jsonify(users)
+    # Is a full export requested? -> Stream all users instead of returning one page
+    ndjson = (request.args.get("format") == "ndjson"
+              or request.accept_mimetypes.best == "application/x-ndjson")
+    if ndjson or request.args.get("stream") in ("1", "true"):
+        response = conditional(("global",),
+                               lambda: stream_items(data_manager.iter_users(STREAM_BATCH_SIZE), ndjson),
+                               representation("ndjson" if ndjson else "stream"))
+    else:
+        after_id = request.args.get("after")
+        limit = max(1, min(request.args.get("limit", USERS_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+
+        def next_url(users):
+            # Is page full? -> There might be more users after the last one
+            if len(users) == limit:
+                return url_for("api.get_users", after=list(users)[-1], limit=limit)
+
+        response = conditional_json(("global",), lambda: data_manager.get_all_users(after_id, limit),
+                                    next_url, representation("json", after=after_id, limit=limit))
+
+    # Format depends on the Accept header -> Caches must keep one copy per Accept value
+    response.vary.add("Accept")
+    return response
 
 
 @api.route('/users/<user_id>/movies', methods=['GET'])
 def get_user_movies(user_id):
     try:
-        username, movies = data_manager.get_username_and_movies(user_id)
-        return jsonify({username: movies})
+        movie_query = MovieQuery.from_args(request.args, MOVIES_PAGE_SIZE, MAX_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def load_user_movies():
+        username, movies = data_manager.get_username_and_movies(user_id, movie_query)
+        return {username: movies}
+
+    def next_url(user_movies):
+        movies = next(iter(user_movies.values()))
+        cursor = movie_query.next_cursor(movies)
+        if cursor:
+            return url_for("api.get_user_movies", user_id=user_id, limit=movie_query.limit,
+                           **movie_query.to_args(after=cursor))
+
+    try:
+        return conditional_json(user_version_keys(user_id), load_user_movies,
+                                next_url, representation("json", limit=movie_query.limit,
+                                                         **movie_query.to_args()))
     except TypeError:
         return jsonify({"error": "User not found"}), 404
 
@@ -23,9 +181,15 @@ def get_user_movies(user_id):
 @api.route('/users/<user_id>/movies', methods=['POST'])
 def add_user_movie(user_id):
     movie_data = request.json
-    is_movie_added = data_manager.add_movie(user_id, movie_data)
+    try:
+        is_movie_added = data_manager.add_movie(user_id, movie_data)
+    except (KeyError, ValueError):
+        return jsonify({"error": "Incomplete movie data: Title, Year, Director and imdbRating "
+                                 "are required"}), 400
 
     if is_movie_added:
+        page_cache.invalidate(f"user:{user_id}")
+        title_index.add(movie_data.get("Title"))
         return jsonify({"success": True}), 201
     else:
         return (jsonify({
@@ -33,3 +197,122 @@ def add_user_movie(user_id):
                      "list"
         }),
                 400)
+
+
+@api.route('/users/<user_id>/movies/batch', methods=['POST'])
+def add_user_movies_batch(user_id):
+    """
+    Add a list of movie titles and/or IMDb IDs to a user's favorites.
+
+    Accepts either a JSON list or {"movies": [...]}. All lookups are resolved concurrently,
+    then every found movie is inserted in one transaction. The response reports a status per
+    item: "added", "duplicate", "incomplete", "not_found" or "invalid".
+    """
+    payload = request.get_json(silent=True)
+    queries = payload.get("movies") if isinstance(payload, dict) else payload
+
+    if not isinstance(queries, list) or not queries:
+        return jsonify({"error": "Please provide a non-empty list of movie titles or IMDb IDs"}), 400
+    if len(queries) > BATCH_IMPORT_MAX_ITEMS:
+        return jsonify({"error": f"A batch can contain at most {BATCH_IMPORT_MAX_ITEMS} movies"}), 400
+
+    results = [{"query": query, "status": "invalid"} for query in queries]
+    valid_items = [item for item in results
+                   if isinstance(item["query"], str) and item["query"].strip()]
+
+    # Resolve all lookups concurrently -> Keep only movies OMDb knows about
+    fetched = movie_lookup.fetch_many([item["query"] for item in valid_items])
+    found_items = []
+    for item, (movie_data, is_fetch_successful) in zip(valid_items, fetched):
+        if is_fetch_successful:
+            item["title"] = movie_data["Title"]
+            found_items.append((item, movie_data))
+        else:
+            item["status"] = "not_found"
+
+    # Insert all found movies in one go
+    added = data_manager.add_movies(user_id, [movie_data for item, movie_data in found_items])
+    for (item, movie_data), is_movie_added in zip(found_items, added):
+        # Is movie data incomplete (e.g. year "N/A")? -> It can't be added
+        if is_movie_added is None:
+            item["status"] = "incomplete"
+            continue
+        item["status"] = "added" if is_movie_added else "duplicate"
+        if is_movie_added:
+            title_index.add(movie_data["Title"])
+    if any(added):
+        page_cache.invalidate(f"user:{user_id}")
+
+    return jsonify({
+        "added": sum(1 for is_movie_added in added if is_movie_added),
+        "results": results
+    })
+
+
+@api.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Report the status of a background job: "queued", "running", or once finished "added",
+    "duplicate", "not_found" or "failed".
+    """
+    job = job_queue.get(job_id) if job_queue else None
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify({
+        "id": job["id"],
+        "status": job["status"],
+        "result": job["result"]
+    })
+
+
+@api.route('/movies/suggest', methods=['GET'])
+def suggest_movie_titles():
+    limit = max(1, min(request.args.get("limit", SUGGEST_MAX_RESULTS, type=int), SUGGEST_MAX_RESULTS))
+    return jsonify(title_index.suggest(request.args.get("q", ""), limit))
+
+
+@api.route('/search', methods=['GET'])
+def search():
+    """
+    Full-text search over movie titles and directors (type=movies) or review texts (type=reviews).
+
+    Results are ranked best match first and paginated like the listings. Highlighted fields are
+    HTML with the matched words wrapped in <mark> tags.
+    """
+    search_text = request.args.get("q", "")
+    search_type = request.args.get("type", "movies")
+    limit = max(1, min(request.args.get("limit", SEARCH_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+
+    if search_type not in ("movies", "reviews"):
+        return jsonify({"error": "Type must be 'movies' or 'reviews'"}), 400
+
+    try:
+        if search_type == "movies":
+            results = data_manager.search_movies(search_text, request.args.get("after"), limit)
+            highlighted_fields = ("title_highlight", "director_highlight")
+        else:
+            results = data_manager.search_reviews(search_text, request.args.get("after"), limit)
+            highlighted_fields = ("snippet",)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    for result in results.values():
+        for field in highlighted_fields:
+            result[field] = str(highlight_html(result[field]))
+
+    response = jsonify(results)
+    cursor = next_cursor(results, limit, "score")
+    if cursor:
+        url = url_for("api.search", q=search_text, type=search_type, limit=limit, after=cursor)
+        response.headers["Link"] = f'<{url}>; rel="next"'
+    return response
+
+
+@api.route('/omdb/cache', methods=['GET'])
+def get_lookup_cache_stats():
+    stats = lookup_cache.stats()
+    # Is a local catalog configured? -> Report its hits too
+    if movie_lookup.catalog:
+        stats["catalog"] = movie_lookup.catalog.stats()
+    return jsonify(stats)
@@ -1,9 +1,13 @@
-import requests
-from config import FETCH_MOVIE_URL, app, data_manager
+from config import (MOVIES_PAGE_SIZE, MAX_PAGE_SIZE, REVIEWS_PAGE_SIZE, SEARCH_PAGE_SIZE,
+                    USERS_PAGE_SIZE, app, data_manager, job_queue, metrics, movie_lookup,
+                    page_cache, title_index)
 from flask import request, render_template, abort
 from api import api
+from data_manager.listing import MovieQuery, next_cursor
+from data_manager.search import highlight_html
 
 app.register_blueprint(api, url_prefix="/api")
+app.add_template_filter(highlight_html, "highlight")
 
 
 # --- Helper Functions ---
@@ -32,59 +36,47 @@ def render_index(title="Home - Movie App", content_type="home", **kwargs):
     return render_template("index.html", **data_to_render)
 
 
-def fetch_data(url, movie_name):
-    """
-    Fetch movie data from an API using a given URL and movie name.
-
-    - Note: This is a helper function for fetching movie data.
-
-    :param url: The API endpoint URL.
-    :type url: str
-
-    :param movie_name: The name of the movie to search for.
-    :type movie_name: dict
-
-    :return: Tuple containing movie data and a boolean indicating success.
-             If successful, the first element is the movie data, and the second element is True.
-             If unsuccessful, both elements are None, and the second element is False.
-    :rtype: tuple
-    """
-    res = requests.get(url, params=movie_name)
-    movie_data = res.json()
-    is_successful = movie_data["Response"]
-
-    if is_successful == "True":
-        return movie_data, True
-    return None, False
-
-
 # --- Routes ---
 @app.route("/")
 @app.route("/users")
+@page_cache.cached(tags=lambda: {"users"})
 def list_all_users():
-    """Render the index page listing all users."""
-    users = data_manager.get_all_users()
-    return render_index(title="Users - Movie Web App", users=users)
+    """Render the index page listing one page of users."""
+    users = data_manager.get_all_users(request.args.get("after"), USERS_PAGE_SIZE)
+
+    # Is page full? -> There might be more users after the last one
+    next_cursor = list(users)[-1] if len(users) == USERS_PAGE_SIZE else None
+    return render_index(title="Users - Movie Web App", users=users, next_cursor=next_cursor)
 
 
 @app.route("/users/<user_id>")
+@page_cache.cached(tags=lambda user_id: {f"user:{user_id}"})
 def list_user_movies(user_id):
-    """Render the page listing movies of a specific user."""
+    """Render the page listing one sorted and filtered page of movies of a specific user."""
     try:
-        username, movies = data_manager.get_username_and_movies(user_id)
+        movie_query = MovieQuery.from_args(request.args, MOVIES_PAGE_SIZE, MAX_PAGE_SIZE)
+    except ValueError as e:
+        abort(400, str(e))
+
+    try:
+        username, movies = data_manager.get_username_and_movies(user_id, movie_query)
 
         # Is user in db? -> Render list movies page
         if username:
+            page_cache.tag(*(f"movie:{movie_id}" for movie_id in movies or {}))
             return render_index(title=f"Movies of {username}  - Movie Web App",
                                 content_type="list_movies",
                                 user=username,
                                 movies=movies,
-                                user_id=user_id)
+                                user_id=user_id,
+                                movie_query=movie_query,
+                                next_cursor=movie_query.next_cursor(movies))
     except TypeError:
         abort(404, "User not in database.")
 
 
 @app.route("/add_user", methods=["GET", "POST"])
+@page_cache.cached()
 def add_user():
     """Handle addition of a new user to the database."""
     if request.method == "GET":
@@ -101,6 +93,7 @@ def add_user():
         is_user_added = data_manager.add_user(new_username)
 
         if is_user_added:
+            page_cache.invalidate("users")
             return render_index(title="Success", content_type="add_user_success")
 
         return abort(400, "There was an issue adding your username")
@@ -119,6 +112,7 @@ def delete_user():
         is_user_deleted = data_manager.delete_user(user_id)
 
         if is_user_deleted:
+            page_cache.invalidate("users", f"user:{user_id}", "reviews")
             return render_index(title="Success! - Movie Web App",
                                 content_type="delete_user_success")
         raise TypeError
@@ -130,6 +124,7 @@ def delete_user():
 
 
 @app.route("/users/<user_id>/add_movie", methods=["GET", "POST"])
+@page_cache.cached()
 def add_movie(user_id):
     """Handle addition of a movie to a user's favorites."""
     if request.method == "GET":
@@ -137,17 +132,32 @@ def add_movie(user_id):
                             content_type="add_movie",
                             user_id=user_id)
 
-    # If POST -> Fetch movie data from OMDb API endpoint
     movie_name = request.form.get("movie_name")
-    movie_data, is_fetch_successful = fetch_data(FETCH_MOVIE_URL,
-                                                 {"t": movie_name})
+    if not movie_name or not movie_name.strip():
+        abort(400, "Please provide a movie name.")
+
+    # Is background mode on? -> Queue the lookup and let the page poll for its status
+    if job_queue:
+        job_id = job_queue.submit({"user_id": user_id, "movie_name": movie_name})
+        return render_index(title="Adding Movie - Movie Web App",
+                            content_type="add_movie_queued",
+                            user_id=user_id,
+                            job_id=job_id), 202
+
+    # If POST -> Fetch movie data from OMDb API endpoint
+    movie_data, is_fetch_successful = movie_lookup.fetch_data({"t": movie_name})
 
     # Is fetching successful? -> Try to add movie to users favorites
     if is_fetch_successful:
-        is_movie_added = data_manager.add_movie(user_id, movie_data)
+        try:
+            is_movie_added = data_manager.add_movie(user_id, movie_data)
+        except ValueError:
+            abort(400, "Sorry! The movie data we found is incomplete, so we can't add it.")
 
         # Is movie successfully added? -> Render success page
         if is_movie_added:
+            page_cache.invalidate(f"user:{user_id}")
+            title_index.add(movie_data["Title"])
             return render_index(title="Success! - Movie Web App", content_type="add_movie_success")
         abort(400, description="Your movie is already in your favorites.")
 
@@ -155,6 +165,7 @@ def add_movie(user_id):
 
 
 @app.route("/users/<user_id>/update_movie/<movie_id>", methods=["GET", "POST"])
+@page_cache.cached(tags=lambda user_id, movie_id: {f"user:{user_id}", f"movie:{movie_id}"})
 def update_movie_details(user_id, movie_id):
     """Handle updating details of a movie in a user's favorites."""
     if request.method == "GET":
@@ -190,6 +201,7 @@ def update_movie_details(user_id, movie_id):
     # Try update -> If successful render success page
     is_update_successful = data_manager.update_user_movies(user_id, movie_id, update_data)
     if is_update_successful:
+        page_cache.invalidate(f"user:{user_id}", f"movie:{movie_id}")
         return render_index(title="Update Movie - Movie Web App",
                             content_type="update_movie_success")
 
@@ -200,6 +212,7 @@ def delete_movie(user_id, movie_id):
     is_movie_deleted = data_manager.delete_user_movie(user_id, movie_id)
 
     if is_movie_deleted:
+        page_cache.invalidate(f"user:{user_id}")
         return render_index(title="Success - Movie Web App",
                             content_type="delete_movie_success")
 
@@ -208,6 +221,7 @@ def delete_movie(user_id, movie_id):
 
 
 @app.route("/add_review/<user_id>/<movie_id>/<movie_title>", methods=["GET", "POST"])
+@page_cache.cached()
 def add_review(user_id, movie_id, movie_title):
     """Handle addition of a review for a movie by a user."""
     if request.method == "GET":
@@ -222,6 +236,7 @@ def add_review(user_id, movie_id, movie_title):
     is_review_added = data_manager.add_review(user_id, movie_id, review_text)
 
     if is_review_added:
+        page_cache.invalidate(f"reviews:{movie_id}")
         return render_index(title="Success - Movie Web App",
                             content_type="add_review_success",
                             movie_title=movie_title)
@@ -231,14 +246,57 @@ def add_review(user_id, movie_id, movie_title):
 
 
 @app.route("/reviews/<movie_id>/<movie_title>")
+@page_cache.cached(tags=lambda movie_id, movie_title: {f"reviews:{movie_id}", "reviews"})
 def list_reviews(movie_id, movie_title):
-    """Render the page listing reviews for a specific movie."""
-    reviews = data_manager.get_all_reviews(movie_id)
+    """Render the page listing reviews for a specific movie, one page at a time."""
+    after_id = request.args.get("after", type=int)
+    reviews = data_manager.get_all_reviews(movie_id, after_id, REVIEWS_PAGE_SIZE)
+
+    # Is page full? -> There might be more reviews after the last one
+    next_cursor = max(reviews) if reviews and len(reviews) == REVIEWS_PAGE_SIZE else None
 
     return render_index(title="list Reviews - Movie Web App",
                         content_type="list_reviews",
+                        movie_id=movie_id,
                         movie_title=movie_title,
-                        reviews=reviews)
+                        reviews=reviews,
+                        next_cursor=next_cursor)
+
+
+@app.route("/search")
+def search():
+    """
+    Render the search page with matching movies and reviews, best match first.
+
+    Without a type, the first page of both is shown. Following a "More" link continues one
+    of them (type=movies or type=reviews) after the cursor.
+    """
+    search_text = request.args.get("q", "")
+    search_type = request.args.get("type")
+    after = request.args.get("after")
+    movies, reviews = {}, {}
+
+    try:
+        if search_type in (None, "movies"):
+            movies = data_manager.search_movies(search_text, after, SEARCH_PAGE_SIZE)
+        if search_type in (None, "reviews"):
+            reviews = data_manager.search_reviews(search_text, after, SEARCH_PAGE_SIZE)
+    except ValueError as e:
+        abort(400, str(e))
+
+    return render_index(title="Search - Movie Web App",
+                        content_type="search",
+                        search_text=search_text,
+                        movies=movies,
+                        reviews=reviews,
+                        next_movies_cursor=next_cursor(movies, SEARCH_PAGE_SIZE, "score"),
+                        next_reviews_cursor=next_cursor(reviews, SEARCH_PAGE_SIZE, "score"))
+
+
+@app.route("/metrics")
+def get_metrics():
+    """Expose request, OMDb and data manager metrics in Prometheus text format."""
+    return metrics.response()
 
 
 # --- Error Handler ---
@@ -0,0 +1,419 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from itertools import accumulate
+from flask import Flask
+from data_manager.json_data_manager import JournaledJSONDataManager, JSONDataManager
+from data_manager.listing import MovieQuery
+from data_manager.sql_data_manager import SQLiteDataManager
+from data_manager.sql_data_models import db
+
+# Words titles, directors and reviews are made of, so searches have realistic hit rates
+ADJECTIVES = ("Dark", "Silent", "Lost", "Last", "Golden", "Broken", "Hidden", "Wild", "Red", "Eternal",
+              "Frozen", "Secret", "Burning", "Final", "Little", "Iron", "Crimson", "Empty", "Distant", "Blue")
+NOUNS = ("Knight", "River", "City", "Night", "Empire", "Garden", "Storm", "Road", "Dream", "Island",
+         "Mirror", "Shadow", "Harbor", "Station", "Kingdom", "Forest", "Machine", "Letter", "Voyage", "Star")
+REVIEW_WORDS = ("great", "boring", "acting", "plot", "twist", "score", "visuals", "slow", "brilliant",
+                "ending", "characters", "dialogue", "classic", "overrated", "masterpiece", "pacing")
+
+# Operations reading the whole data set run fewer iterations
+SCAN_OPERATIONS = {"iter_users", "iter_movie_titles"}
+
+
+class Dataset:
+    """
+    Synthetic users, movies, favorites and reviews, the same for every backend.
+
+    Movie popularity follows a Zipf distribution: the movie of rank r is picked as a favorite
+    with a weight of 1 / r ** skew, so a few movies are in many collections and most movies in
+    few. Reviews are written by users about movies of their own collection.
+    """
+
+    def __init__(self, users, movies, favorites_per_user, reviews, skew=1.1, seed=42):
+        """
+        Generates the data set.
+
+        :param users: The number of users.
+        :type users: int
+
+        :param movies: The number of distinct movies.
+        :type movies: int
+
+        :param favorites_per_user: The number of movies in every user's collection.
+        :type favorites_per_user: int
+
+        :param reviews: The number of reviews.
+        :type reviews: int
+
+        :param skew: The Zipf exponent of movie popularity. 0 makes all movies equally popular.
+        :type skew: float
+
+        :param seed: Seed of the random generator, so runs are reproducible.
+        :type seed: int
+        """
+        rng = random.Random(seed)
+        self.users = users
+        self.movies = [self.movie_data(rng, i) for i in range(movies)]
+
+        cum_weights = list(accumulate(1 / (rank + 1) ** skew for rank in range(movies)))
+        favorites_per_user = min(favorites_per_user, movies)
+        self.favorites = []
+        for _ in range(users):
+            favorites = set()
+            while len(favorites) < favorites_per_user:
+                favorites.update(rng.choices(range(movies), cum_weights=cum_weights,
+                                             k=favorites_per_user - len(favorites)))
+            self.favorites.append(sorted(favorites))
+
+        # (user index, movie index, review text)
+        self.reviews = []
+        for _ in range(reviews):
+            user = rng.randrange(users)
+            self.reviews.append((user, rng.choice(self.favorites[user]),
+                                 " ".join(rng.choices(REVIEW_WORDS, k=rng.randint(8, 40)))))
+
+    @staticmethod
+    def movie_data(rng, i, prefix="", id_offset=0) -> dict:
+        """Return a movie as OMDb would, with a unique title and IMDb ID."""
+        return {
+            "Title": f"{prefix}{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}",
+            "Director": f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}son",
+            "Year": str(1950 + rng.randrange(75)),
+            "imdbRating": str(round(rng.uniform(1, 10), 1)),
+            "imdbID": f"tt{id_offset + i:07d}",
+            "Response": "True"
+        }
+
+
+class SQLiteBackend:
+    """SQLiteDataManager on a fresh database file, seeded with bulk inserts."""
+
+    name = "sqlite"
+
+    def __init__(self, directory, dataset):
+        app = Flask(__name__)
+        self.data_manager = SQLiteDataManager(app, f"sqlite:///{os.path.join(directory, 'movies.sqlite')}")
+        self.app = app
+
+        with app.app_context(), db.engine.begin() as connection:
+            connection.exec_driver_sql("INSERT INTO user (user) VALUES (?)",
+                                       [(f"user {i}",) for i in range(dataset.users)])
+            connection.exec_driver_sql(
+                "INSERT INTO movie (title, director, publication_year, rating, imdb_id) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(movie["Title"], movie["Director"], int(movie["Year"]), float(movie["imdbRating"]),
+                  movie["imdbID"]) for movie in dataset.movies])
+            connection.exec_driver_sql(
+                "INSERT INTO user_movies (user_id, movie_id) VALUES (?, ?)",
+                [(self.user_id(user), self.movie_id(user, movie))
+                 for user, favorites in enumerate(dataset.favorites) for movie in favorites])
+            connection.exec_driver_sql(
+                "INSERT INTO review (user_id, movie_id, review_text) VALUES (?, ?, ?)",
+                [(self.user_id(user), self.movie_id(user, movie), text)
+                 for user, movie, text in dataset.reviews])
+
+    def context(self):
+        """Return the context data manager calls need, the app context."""
+        return self.app.app_context()
+
+    @staticmethod
+    def user_id(user):
+        return user + 1
+
+    @staticmethod
+    def movie_id(user, movie):
+        return movie + 1
+
+
+class JSONBackend:
+    """JSONDataManager on a fresh JSON file, seeded by writing the document at once."""
+
+    name = "json"
+    data_manager_class = JSONDataManager
+
+    def __init__(self, directory, dataset):
+        filename = os.path.join(directory, "movie_data.json")
+        reviews = {}
+        for review_number, (user, movie, text) in enumerate(dataset.reviews):
+            reviews.setdefault((user, movie), {})[f"review-{review_number}"] = {
+                "user_id": self.user_id(user), "review_text": text}
+
+        all_users = {}
+        for user, favorites in enumerate(dataset.favorites):
+            movies = {}
+            for movie in favorites:
+                movie_data = dataset.movies[movie]
+                movies[self.movie_id(user, movie)] = {
+                    "title": movie_data["Title"],
+                    "director": movie_data["Director"],
+                    "year": int(movie_data["Year"]),
+                    "rating": float(movie_data["imdbRating"]),
+                    "imdb_id": movie_data["imdbID"],
+                    "reviews": reviews.get((user, movie), {})
+                }
+            all_users[self.user_id(user)] = {"name": f"user {user}", "movies": movies}
+
+        JSONDataManager.write_json(filename, all_users)
+        self.data_manager = self.data_manager_class(filename)
+
+    @staticmethod
+    def context():
+        return nullcontext()
+
+    @staticmethod
+    def user_id(user):
+        return f"user-{user}"
+
+    @staticmethod
+    def movie_id(user, movie):
+        # Movies belong to one user's collection in the JSON document
+        return f"movie-{user}-{movie}"
+
+
+class JournaledJSONBackend(JSONBackend):
+    """JournaledJSONDataManager, appending writes to a journal instead of rewriting the file."""
+
+    name = "json-journal"
+    data_manager_class = JournaledJSONDataManager
+
+
+BACKENDS = {backend.name: backend for backend in (SQLiteBackend, JSONBackend, JournaledJSONBackend)}
+
+
+def read_operations(backend, dataset, rng) -> dict:
+    """Return the read operations, each a function of the iteration number."""
+    data_manager = backend.data_manager
+    reviewed = [(user, movie) for user, movie, _ in dataset.reviews] or [(0, dataset.favorites[0][0])]
+
+    return {
+        "get_all_users": lambda i: data_manager.get_all_users(None, 50),
+        "get_username_and_movies": lambda i: data_manager.get_username_and_movies(
+            backend.user_id(rng.randrange(dataset.users))),
+        "get_username_and_movies_sorted": lambda i: data_manager.get_username_and_movies(
+            backend.user_id(rng.randrange(dataset.users)),
+            MovieQuery(sort="rating", descending=True, min_rating=5, limit=25)),
+        "get_all_reviews": lambda i: data_manager.get_all_reviews(
+            backend.movie_id(*rng.choice(reviewed))),
+        "search_movies": lambda i: data_manager.search_movies(
+            f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)[:3]}", limit=20),
+        "search_reviews": lambda i: data_manager.search_reviews(rng.choice(REVIEW_WORDS), limit=20),
+        "iter_users": lambda i: sum(1 for _ in data_manager.iter_users()),
+        "iter_movie_titles": lambda i: sum(1 for _ in data_manager.iter_movie_titles()),
+    }
+
+
+def write_operations(backend, dataset, rng) -> dict:
+    """
+    Return the write operations, each a function of the iteration number.
+
+    Deletions work through distinct favorites and users, so every iteration deletes something.
+    """
+    data_manager = backend.data_manager
+    favorites = [(user, movie) for user, movies in enumerate(dataset.favorites) for movie in movies]
+    rng.shuffle(favorites)
+
+    return {
+        "add_user": lambda i: data_manager.add_user(f"new user {i}"),
+        "add_movie": lambda i: data_manager.add_movie(
+            backend.user_id(rng.randrange(dataset.users)), Dataset.movie_data(rng, i, "New ", 8000000)),
+        "add_movies": lambda i: data_manager.add_movies(
+            backend.user_id(rng.randrange(dataset.users)),
+            [Dataset.movie_data(rng, i * 10 + j, "Batch ", 9000000) for j in range(10)]),
+        "update_user_movies": lambda i: data_manager.update_user_movies(
+            backend.user_id(favorites[-i - 1][0]), backend.movie_id(*favorites[-i - 1]),
+            {"rating": round(rng.uniform(1, 10), 1)}),
+        "add_review": lambda i: data_manager.add_review(
+            backend.user_id(favorites[-i - 1][0]), backend.movie_id(*favorites[-i - 1]),
+            " ".join(rng.choices(REVIEW_WORDS, k=20))),
+        "delete_user_movie": lambda i: data_manager.delete_user_movie(
+            backend.user_id(favorites[i][0]), backend.movie_id(*favorites[i])),
+        "delete_user": lambda i: data_manager.delete_user(backend.user_id(dataset.users - 1 - i)),
+    }
+
+
+def percentile(sorted_values, fraction) -> float:
+    """Return a percentile of sorted values, using the nearest rank."""
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def time_operation(operation, iterations) -> dict:
+    """
+    Run an operation and summarize its latencies.
+
+    One untimed call runs first, so lazily built indexes and caches don't distort the numbers.
+
+    :return: Iterations, operations per second and mean, p50 and p99 latency in milliseconds.
+    :rtype: dict
+    """
+    operation(iterations)
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "iterations": iterations,
+        "ops_per_sec": round(iterations / total, 1) if total else None,
+        "mean_ms": round(total / iterations * 1000, 4),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Return the peak resident set size of this process in megabytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_backend(backend_name, users, args) -> dict:
+    """
+    Benchmark one backend at one data set size.
+
+    Reads run before writes, so they see the seeded data set. Every run happens in its own
+    process, so its peak RSS is not inflated by earlier runs.
+    """
+    dataset = Dataset(users, users * args["movies_per_user"], args["favorites"],
+                      users * args["reviews_per_user"], args["skew"], args["seed"])
+    rng = random.Random(args["seed"])
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        backend = BACKENDS[backend_name](directory, dataset)
+        seed_seconds = time.perf_counter() - start
+
+        operations = {}
+        with backend.context():
+            for name, operation in read_operations(backend, dataset, rng).items():
+                iterations = args["scan_iterations"] if name in SCAN_OPERATIONS else args["iterations"]
+                operations[name] = time_operation(operation, iterations)
+
+            write_iterations = min(args["write_iterations"], users // 2)
+            for name, operation in write_operations(backend, dataset, rng).items():
+                operations[name] = time_operation(operation, write_iterations)
+
+    return {
+        "backend": backend_name,
+        "users": users,
+        "movies": len(dataset.movies),
+        "favorites": sum(len(favorites) for favorites in dataset.favorites),
+        "reviews": len(dataset.reviews),
+        "seed_seconds": round(seed_seconds, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "operations": operations,
+    }
+
+
+def run_in_subprocess(backend_name, users, args) -> dict:
+    """Run `run_backend` in a fresh interpreter and return its result."""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(run_backend, (backend_name, users, args))
+
+
+def compare(results, baseline, tolerance) -> list:
+    """
+    Compare results with a baseline run.
+
+    :param results: The results of this run.
+    :type results: list
+
+    :param baseline: The results of the baseline run.
+    :type baseline: list
+
+    :param tolerance: The relative slowdown of p99 latency tolerated, e.g. 0.25 for 25 %.
+    :type tolerance: float
+
+    :return: One line per regression, empty if there is none.
+    :rtype: list
+    """
+    baseline_by_run = {(result["backend"], result["users"]): result for result in baseline}
+    regressions = []
+
+    for result in results:
+        baseline_result = baseline_by_run.get((result["backend"], result["users"]))
+        if not baseline_result:
+            continue
+
+        for name, stats in result["operations"].items():
+            baseline_stats = baseline_result["operations"].get(name)
+            if baseline_stats and stats["p99_ms"] > baseline_stats["p99_ms"] * (1 + tolerance):
+                regressions.append(f"{result['backend']} users={result['users']} {name}: p99 "
+                                   f"{baseline_stats['p99_ms']:.3f} ms -> {stats['p99_ms']:.3f} ms")
+
+    return regressions
+
+
+def print_results(results):
+    """Print one table per run."""
+    for result in results:
+        print(f"\n{result['backend']}: {result['users']} users, {result['movies']} movies, "
+              f"{result['favorites']} favorites, {result['reviews']} reviews "
+              f"(seeded in {result['seed_seconds']:.1f}s, peak RSS {result['peak_rss_mb']} MB)")
+        print(f"{'operation':<32}{'ops/s':>12}{'p50 ms':>12}{'p99 ms':>12}")
+        for name, stats in result["operations"].items():
+            print(f"{name:<32}{stats['ops_per_sec'] or 0:>12.1f}{stats['p50_ms']:>12.3f}"
+                  f"{stats['p99_ms']:>12.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every data manager method of the SQLite and "
+                                                 "JSON backends on synthetic data sets.")
+    parser.add_argument("--backends", default=",".join(BACKENDS),
+                        help=f"Comma-separated backends out of: {', '.join(BACKENDS)}")
+    parser.add_argument("--sizes", default="100,1000", help="Comma-separated numbers of users")
+    parser.add_argument("--movies-per-user", type=int, default=2, help="Distinct movies per user")
+    parser.add_argument("--favorites", type=int, default=20, help="Movies in every user's collection")
+    parser.add_argument("--reviews-per-user", type=int, default=2)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of movie popularity")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--scan-iterations", type=int, default=10)
+    parser.add_argument("--write-iterations", type=int, default=20)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Compare with the JSON results of an earlier run and "
+                                          "exit with status 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Relative p99 slowdown tolerated by --compare")
+    args = parser.parse_args()
+
+    run_args = {key: getattr(args, key) for key in ("movies_per_user", "favorites", "reviews_per_user",
+                                                     "skew", "seed", "iterations", "scan_iterations",
+                                                     "write_iterations")}
+    results = [run_in_subprocess(backend_name, int(users), run_args)
+               for users in args.sizes.split(",")
+               for backend_name in args.backends.split(",")]
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"created_at": datetime.now(timezone.utc).isoformat(),
+                       "python": platform.python_version(),
+                       "platform": platform.platform(),
+                       "arguments": vars(args),
+                       "results": results}, file, indent=4)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file)["results"], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+import requests
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Scenario -> weight of the default mix
+DEFAULT_MIX = "browse_users=30,view_movies=35,add_movie=15,review=10,update=10"
+
+
+def free_port() -> int:
+    """Return a TCP port that is free on localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url, timeout=30):
+    """Poll a URL until it answers, raising RuntimeError after `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def parse_mix(mix) -> dict:
+    """Parse a scenario mix like "browse_users=30,add_movie=10" into scenario weights."""
+    weights = {}
+    for entry in mix.split(","):
+        scenario, weight = entry.split("=")
+        if scenario not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {scenario!r}, expected one of: {', '.join(SCENARIOS)}")
+        weights[scenario] = float(weight)
+    return weights
+
+
+class LoadDriver:
+    """
+    Sends a weighted mix of user scenarios to a running app and records the latency per route.
+
+    Every scenario is one request. Errors are responses with a 5xx status and requests that
+    failed without a response. Expected rejections, like adding a movie the user already has,
+    are 4xx responses and not counted as errors.
+    """
+
+    def __init__(self, base_url, favorites, user_ids, titles, seed=42):
+        """
+        Initializes the driver with the data scenarios pick from.
+
+        :param base_url: URL of the app, e.g. "http://127.0.0.1:5000".
+        :type base_url: str
+
+        :param favorites: Known (user ID, movie ID, title) tuples to review and update.
+        :type favorites: list
+
+        :param user_ids: Known user IDs to browse and add movies to.
+        :type user_ids: list
+
+        :param titles: Movie titles to add. Repeated titles exercise the lookup cache.
+        :type titles: list
+
+        :param seed: Seed of the random generators, one per thread.
+        :type seed: int
+        """
+        self.base_url = base_url
+        self.favorites = favorites
+        self.user_ids = user_ids
+        self.titles = titles
+        self.seed = seed
+        # Route -> list of (latency, status), status None for failed requests
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def request(self, session, route, method, path, data=None):
+        """Send one request and record its latency under the route."""
+        start = time.perf_counter()
+        try:
+            status = session.request(method, f"{self.base_url}{path}", data=data, timeout=60).status_code
+        except requests.RequestException:
+            status = None
+        latency = time.perf_counter() - start
+
+        with self._lock:
+            self.samples.setdefault(route, []).append((latency, status))
+
+    def run_worker(self, worker, weights, deadline, requests_left):
+        """Run scenarios until the deadline passes or the request budget is used up."""
+        rng = random.Random(self.seed + worker)
+        scenarios, cum_weights = list(weights), []
+        for weight in weights.values():
+            cum_weights.append((cum_weights[-1] if cum_weights else 0) + weight)
+
+        with requests.Session() as session:
+            while time.monotonic() < deadline:
+                with self._lock:
+                    if requests_left[0] is not None:
+                        if requests_left[0] <= 0:
+                            return
+                        requests_left[0] -= 1
+                scenario = rng.choices(scenarios, cum_weights=cum_weights)[0]
+                SCENARIOS[scenario](self, session, rng)
+
+    def run(self, weights, concurrency, duration, total_requests=None) -> float:
+        """
+        Run the scenario mix on `concurrency` threads.
+
+        :return: The wall-clock seconds the run took.
+        :rtype: float
+        """
+        deadline = time.monotonic() + duration
+        requests_left = [total_requests]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(self.run_worker, worker, weights, deadline, requests_left)
+                           for worker in range(concurrency)]:
+                future.result()
+        return time.perf_counter() - start
+
+
+def browse_users(driver, session, rng):
+    driver.request(session, "GET /users", "GET", "/users")
+
+
+def view_movies(driver, session, rng):
+    user_id = rng.choice(driver.user_ids)
+    driver.request(session, "GET /users/<user_id>", "GET", f"/users/{user_id}")
+
+
+def add_movie(driver, session, rng):
+    user_id = rng.choice(driver.user_ids)
+    driver.request(session, "POST /users/<user_id>/add_movie", "POST", f"/users/{user_id}/add_movie",
+                   {"movie_name": rng.choice(driver.titles)})
+
+
+def review(driver, session, rng):
+    user_id, movie_id, title = rng.choice(driver.favorites)
+    driver.request(session, "POST /add_review/<user_id>/<movie_id>/<movie_title>", "POST",
+                   f"/add_review/{user_id}/{movie_id}/{quote(title, safe='')}",
+                   {"review_text": f"Load test review {rng.randrange(10 ** 6)}"})
+
+
+def update(driver, session, rng):
+    user_id, movie_id, title = rng.choice(driver.favorites)
+    driver.request(session, "POST /users/<user_id>/update_movie/<movie_id>", "POST",
+                   f"/users/{user_id}/update_movie/{movie_id}",
+                   {"director": "Load Test Director", "year": str(rng.randint(1950, 2024)),
+                    "rating": f"{rng.uniform(1, 10):.1f}"})
+
+
+SCENARIOS = {
+    "browse_users": browse_users,
+    "view_movies": view_movies,
+    "add_movie": add_movie,
+    "review": review,
+    "update": update,
+}
+
+
+def percentile(sorted_values, fraction) -> float:
+    """Return a percentile of sorted values, using the nearest rank."""
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def summarize(samples, elapsed) -> dict:
+    """
+    Summarize the recorded samples per route.
+
+    :return: Requests, errors, requests per second and p50/p95/p99 latency in ms per route.
+    :rtype: dict
+    """
+    summary = {}
+    for route, route_samples in sorted(samples.items()):
+        latencies = sorted(latency for latency, _ in route_samples)
+        statuses = {}
+        for _, status in route_samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        summary[route] = {
+            "requests": len(route_samples),
+            "errors": sum(1 for _, status in route_samples if status is None or status >= 500),
+            "statuses": statuses,
+            "requests_per_sec": round(len(route_samples) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        }
+    return summary
+
+
+def discover(base_url, max_users=50) -> tuple:
+    """
+    Read user IDs and some of their movies from the API of the app.
+
+    :return: User IDs and (user ID, movie ID, title) tuples.
+    :rtype: tuple
+    """
+    user_ids = [str(user_id) for user_id in requests.get(f"{base_url}/api/users?stream=1", timeout=30).json()]
+    if not user_ids:
+        raise RuntimeError("The database has no users to run scenarios for")
+
+    favorites = []
+    for user_id in user_ids[:max_users]:
+        user_movies = requests.get(f"{base_url}/api/users/{user_id}/movies?limit=100", timeout=30).json()
+        for movies in user_movies.values():
+            favorites.extend((user_id, movie_id, movie["title"]) for movie_id, movie in movies.items())
+    if not favorites:
+        raise RuntimeError("The users have no movies to review or update")
+
+    return user_ids, favorites
+
+
+def start_process(command, log_path, env):
+    """Start a process in the repository directory, logging to a file."""
+    with open(log_path, "w") as log:
+        return subprocess.Popen(command, cwd=REPO_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the app against a local OMDb stub and drive a "
+                                                 "scenario mix against it.")
+    parser.add_argument("--database", default=os.path.join(REPO_DIR, "user_data", "movies.sqlite"),
+                        help="SQLite database to start from. The test runs on a copy.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights, e.g. browse_users=30,add_movie=10")
+    parser.add_argument("--titles", type=int, default=500, help="Distinct titles added by add_movie")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--omdb-url", help="Use this OMDb (or stub) URL instead of starting a stub")
+    parser.add_argument("--omdb-latency-ms", type=float, default=100)
+    parser.add_argument("--omdb-jitter-ms", type=float, default=50)
+    parser.add_argument("--omdb-error-rate", type=float, default=0.0)
+    parser.add_argument("--omdb-hang-rate", type=float, default=0.0)
+    parser.add_argument("--omdb-recordings", help="Recordings the stub replays")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    processes = []
+    directory = tempfile.mkdtemp(prefix="movie-web-app-load-")
+
+    try:
+        env = dict(os.environ)
+        database = os.path.join(directory, "movies.sqlite")
+        shutil.copyfile(args.database, database)
+        env["DATABASE_URI"] = f"sqlite:///{database}"
+
+        if args.omdb_url:
+            env["OMDB_BASE_URL"] = args.omdb_url
+        else:
+            stub_port = free_port()
+            stub_command = [sys.executable, "-m", "benchmarks.omdb_stub", "--port", str(stub_port),
+                            "--latency-ms", str(args.omdb_latency_ms),
+                            "--jitter-ms", str(args.omdb_jitter_ms),
+                            "--error-rate", str(args.omdb_error_rate),
+                            "--hang-rate", str(args.omdb_hang_rate), "--seed", str(args.seed)]
+            if args.omdb_recordings:
+                stub_command += ["--recordings", args.omdb_recordings]
+            processes.append(start_process(stub_command, os.path.join(directory, "stub.log"), env))
+            env["OMDB_BASE_URL"] = f"http://127.0.0.1:{stub_port}/"
+            wait_until_up(env["OMDB_BASE_URL"])
+
+        app_port = free_port()
+        base_url = f"http://127.0.0.1:{app_port}"
+        processes.append(start_process(
+            [sys.executable, "-c",
+             f"from app import app; app.run(host='127.0.0.1', port={app_port}, threaded=True)"],
+            os.path.join(directory, "app.log"), env))
+        wait_until_up(f"{base_url}/api/users")
+
+        user_ids, favorites = discover(base_url)
+        titles = [f"Load Test Movie {i}" for i in range(args.titles)]
+        driver = LoadDriver(base_url, favorites, user_ids, titles, args.seed)
+
+        print(f"Running {args.mix} on {args.concurrency} threads for {args.duration:.0f}s "
+              f"(OMDb {env['OMDB_BASE_URL']})", flush=True)
+        elapsed = driver.run(weights, args.concurrency, args.duration, args.requests)
+        summary = summarize(driver.samples, elapsed)
+
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    total_requests = sum(route["requests"] for route in summary.values())
+    print(f"\n{total_requests} requests in {elapsed:.1f}s: {total_requests / elapsed:.1f} requests/s")
+    print(f"{'route':<56}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, stats in summary.items():
+        print(f"{route:<56}{stats['requests']:>10}{stats['errors']:>8}{stats['requests_per_sec']:>9.1f}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"arguments": vars(args), "elapsed_seconds": round(elapsed, 3),
+                       "requests_per_sec": round(total_requests / elapsed, 1), "routes": summary},
+                      file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+import requests
+from omdb.lookup_cache import LookupCacheInterface
+
+NOT_FOUND = {"Response": "False", "Error": "Movie not found!"}
+
+
+def synthetic_movie(params) -> dict:
+    """
+    Return a made-up but stable OMDb response for a title or IMDb ID.
+
+    Year, rating and ID are derived from a hash of the query, so the same query always gets
+    the same movie.
+    """
+    query = params.get("i") or params.get("t") or ""
+    digest = int(hashlib.sha1(query.strip().lower().encode()).hexdigest(), 16)
+    return {
+        "Title": params.get("t") or f"Movie {query}",
+        "Year": params.get("y") or str(1950 + digest % 75),
+        "Director": f"Director {digest % 500}",
+        "imdbRating": f"{1 + digest % 90 / 10:.1f}",
+        "imdbID": params.get("i") or f"tt{digest % 10 ** 8:08d}",
+        "Response": "True"
+    }
+
+
+class OMDbStub:
+    """
+    Stand-in for the OMDb API with record/replay, injected latency and injected failures.
+
+    Responses come from recordings (JSON lines of {"params": ..., "response": ...}), keyed
+    like the lookup cache keys them. Queries without a recording are forwarded to an upstream
+    and recorded if one is configured, answered with a synthetic movie if enabled, or answered
+    with "Movie not found!".
+    """
+
+    def __init__(self, recordings_path=None, upstream_url=None, synthetic=True, latency_ms=0,
+                 jitter_ms=0, error_rate=0.0, hang_rate=0.0, hang_seconds=30, seed=None):
+        """
+        Initializes the stub and loads its recordings.
+
+        :param recordings_path: JSON lines file to replay from and, with an upstream, record to.
+        :type recordings_path: str
+
+        :param upstream_url: OMDb URL including the API key, e.g. "http://www.omdbapi.com/?apikey=...".
+        :type upstream_url: str
+
+        :param synthetic: Whether unknown queries get a synthetic movie instead of "not found".
+        :type synthetic: bool
+
+        :param latency_ms: Delay added to every response.
+        :type latency_ms: float
+
+        :param jitter_ms: Maximum random delay added on top of the latency.
+        :type jitter_ms: float
+
+        :param error_rate: Share of requests answered with "503 Service Unavailable".
+        :type error_rate: float
+
+        :param hang_rate: Share of requests answered only after `hang_seconds`, to trip timeouts.
+        :type hang_rate: float
+
+        :param hang_seconds: Delay of hanging requests.
+        :type hang_seconds: float
+
+        :param seed: Seed of the random generator drawing failures and jitter.
+        :type seed: int
+        """
+        self.recordings_path = recordings_path
+        self.upstream_url = upstream_url
+        self.synthetic = synthetic
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.recordings = {}
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        if recordings_path:
+            try:
+                with open(recordings_path) as file:
+                    for line in file:
+                        if line.strip():
+                            recording = json.loads(line)
+                            self.recordings[LookupCacheInterface.make_key(recording["params"])] = \
+                                recording["response"]
+            except FileNotFoundError:
+                pass
+
+    def _record(self, params, response):
+        """Keep an upstream response and append it to the recordings file."""
+        with self._lock:
+            self.recordings[LookupCacheInterface.make_key(params)] = response
+            if self.recordings_path:
+                with open(self.recordings_path, "a") as file:
+                    file.write(json.dumps({"params": params, "response": response}) + "\n")
+
+    def respond(self, params) -> tuple:
+        """
+        Answer an OMDb request, applying injected latency and failures.
+
+        :param params: Query parameters of the request, e.g. {"t": "Batman", "apikey": "..."}.
+        :type params: dict
+
+        :return: Status code and JSON response body.
+        :rtype: tuple
+        """
+        params = {key: value for key, value in params.items() if key != "apikey"}
+        with self._lock:
+            self.requests += 1
+            draw = self._random.random()
+            delay = (self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000
+
+        # Is request picked for a failure? -> Fail like an overloaded or stalled upstream
+        if draw < self.error_rate:
+            time.sleep(delay)
+            return 503, {"Response": "False", "Error": "Service unavailable (injected)"}
+        if draw < self.error_rate + self.hang_rate:
+            time.sleep(self.hang_seconds)
+            return 504, {"Response": "False", "Error": "Gateway timeout (injected)"}
+
+        time.sleep(delay)
+        response = self.recordings.get(LookupCacheInterface.make_key(params))
+        if response is not None:
+            return 200, response
+
+        if self.upstream_url:
+            upstream_response = requests.get(self.upstream_url, params=params, timeout=10)
+            if upstream_response.status_code == 200:
+                response = upstream_response.json()
+                self._record(params, response)
+                return 200, response
+            return upstream_response.status_code, {"Response": "False", "Error": "Upstream error"}
+
+        return 200, synthetic_movie(params) if self.synthetic else NOT_FOUND
+
+
+def make_server(stub, host="127.0.0.1", port=8089) -> ThreadingHTTPServer:
+    """Return an HTTP server answering every GET request through the stub."""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, body = stub.respond(dict(parse_qsl(urlsplit(self.path).query)))
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            # Keep load tests quiet
+            pass
+
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local OMDb stub. Point OMDB_BASE_URL at it.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--recordings", help="JSON lines file to replay from (and record to with --upstream)")
+    parser.add_argument("--upstream", help="Record misses from this OMDb URL, including ?apikey=...")
+    parser.add_argument("--no-synthetic", action="store_true",
+                        help="Answer unknown queries with 'Movie not found!' instead of a made-up movie")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 503")
+    parser.add_argument("--hang-rate", type=float, default=0.0,
+                        help="Share of requests answered only after --hang-seconds")
+    parser.add_argument("--hang-seconds", type=float, default=30)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    stub = OMDbStub(args.recordings, args.upstream, not args.no_synthetic, args.latency_ms, args.jitter_ms,
+                    args.error_rate, args.hang_rate, args.hang_seconds, args.seed)
+    server = make_server(stub, args.host, args.port)
+    print(f"OMDb stub listening on http://{args.host}:{args.port}/ "
+          f"({len(stub.recordings)} recordings)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
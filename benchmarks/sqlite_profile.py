@@ -0,0 +1,97 @@
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+from data_manager.migrations import migrate
+from data_manager.sqlite_profile import DEFAULT_PRAGMAS, apply_profile, engine_options
+
+
+def create_default_engine(path):
+    """Create an engine with SQLite and SQLAlchemy defaults, like the app had before tuning."""
+    return create_engine(f"sqlite:///{path}", poolclass=NullPool)
+
+
+def create_tuned_engine(path, pool_size):
+    """Create an engine with the tuned profile used by SQLiteDataManager."""
+    engine = create_engine(f"sqlite:///{path}", **engine_options(pool_size))
+    apply_profile(engine, DEFAULT_PRAGMAS)
+    return engine
+
+
+def seed(engine, users, movies_per_user):
+    """Fill the database with users, movies and favorites to read from."""
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO user (user) VALUES (?)", [(f"user {i}",) for i in range(users)])
+        connection.exec_driver_sql(
+            "INSERT INTO movie (title, director, publication_year, rating) VALUES (?, ?, ?, ?)",
+            [(f"movie {i}", "director", 1950 + i % 70, 7.5) for i in range(movies_per_user * 10)])
+        connection.exec_driver_sql(
+            "INSERT INTO user_movies (user_id, movie_id) VALUES (?, ?)",
+            [(user_id, (user_id * 7 + i) % (movies_per_user * 10) + 1)
+             for user_id in range(1, users + 1) for i in range(movies_per_user)])
+
+
+def write_op(engine, i):
+    """One committed write, like add_user."""
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO user (user) VALUES (?)", (f"new user {i}",))
+
+
+def read_op(engine, i, users):
+    """One read, like get_username_and_movies."""
+    with engine.connect() as connection:
+        connection.exec_driver_sql(
+            "SELECT movie.* FROM movie JOIN user_movies ON user_movies.movie_id = movie.movie_id "
+            "WHERE user_movies.user_id = ?", (i % users + 1,)).fetchall()
+
+
+def run(operation, operations, threads) -> float:
+    """Run an operation `operations` times on `threads` threads and return operations per second."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(operation, range(operations)))
+    return operations / (time.perf_counter() - start)
+
+
+def benchmark(profile, create_engine_for, args) -> dict:
+    """Measure read and write throughput of one engine profile on a fresh database."""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine_for(os.path.join(directory, "benchmark.sqlite"))
+        migrate(engine)
+        seed(engine, args.users, args.movies_per_user)
+
+        result = {
+            "profile": profile,
+            "writes_per_sec": run(lambda i: write_op(engine, i), args.writes, args.threads),
+            "reads_per_sec": run(lambda i: read_op(engine, i, args.users), args.reads, args.threads),
+        }
+        engine.dispose()
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SQLite defaults with the tuned engine "
+                                                 "profile of SQLiteDataManager.")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--movies-per-user", type=int, default=20)
+    args = parser.parse_args()
+
+    results = [
+        benchmark("default", create_default_engine, args),
+        benchmark("tuned", lambda path: create_tuned_engine(path, args.threads), args),
+    ]
+
+    print(f"{'profile':<10}{'writes/s':>12}{'reads/s':>12}")
+    for result in results:
+        print(f"{result['profile']:<10}{result['writes_per_sec']:>12.0f}{result['reads_per_sec']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
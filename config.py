@@ -2,20 +2,173 @@ import os
 import logging
 from flask import Flask
 from dotenv import load_dotenv
+from data_manager.caching_data_manager import CachingDataManager
+from data_manager.instrumented_data_manager import InstrumentedDataManager
 from data_manager.sql_data_manager import SQLiteDataManager
+from data_manager.sql_profiler import SQLProfiler
+from data_manager.title_index import TitlePrefixIndex
+from data_manager.versioned_data_manager import SQLiteDataVersions
+from job_queue import JobQueue, MemoryJobStore, SQLiteJobStore
+from metrics import MetricsRegistry, instrument_app
+from page_cache import PageCache
+# OMDb settings (OMDB_BASE_URL, OMDB_CACHE_PATH, ...) live with the lookup, shared with the CLI tools
+from omdb.settings import make_movie_lookup
 
 # --- Load environment variables ---
 load_dotenv()
 
-# --- URLs & URIs for Data and API Access ---
-DATABASE_URI = "sqlite:///user_data/movies.sqlite"
+# --- URIs for Data Access ---
+DATABASE_URI = os.environ.get("DATABASE_URI", "sqlite:///user_data/movies.sqlite")
 JSON_DATA_PATH = "user_data/movie_data.json"
-API_KEY = os.environ.get("MY_API_KEY")
-FETCH_MOVIE_URL = f"http://www.omdbapi.com/?apikey={API_KEY}"
+
+# --- Batch Import Config ---
+BATCH_IMPORT_MAX_ITEMS = int(os.environ.get("BATCH_IMPORT_MAX_ITEMS", 500))
+
+# --- SQLite Engine Config ---
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", -64000)),
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000)),
+    "temp_store": os.environ.get("SQLITE_TEMP_STORE", "MEMORY"),
+}
+SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", 5))
+
+# --- SQL Profiler Config ---
+SQL_SLOW_QUERY_MS = float(os.environ.get("SQL_SLOW_QUERY_MS", 100))
+# Executions of one statement within a request reported as a possible N+1 query
+SQL_REPEAT_THRESHOLD = int(os.environ.get("SQL_REPEAT_THRESHOLD", 5))
+# Set to 1 to add an X-SQL-Profile header with query count and time to every response
+SQL_PROFILE_HEADER = os.environ.get("SQL_PROFILE_HEADER", "0") == "1"
+
+# --- Data Cache Config ---
+# Set DATA_CACHE_SIZE to 0 to disable caching of reads
+DATA_CACHE_SIZE = int(os.environ.get("DATA_CACHE_SIZE", 1024))
+DATA_CACHE_TTL = float(os.environ.get("DATA_CACHE_TTL", 60))
+
+# --- Page Cache Config ---
+# Set PAGE_CACHE_SIZE to 0 to disable caching of rendered pages
+PAGE_CACHE_SIZE = int(os.environ.get("PAGE_CACHE_SIZE", 256))
+PAGE_CACHE_TTL = float(os.environ.get("PAGE_CACHE_TTL", 60))
+
+# --- Title Suggestion Config ---
+SUGGEST_MAX_RESULTS = int(os.environ.get("SUGGEST_MAX_RESULTS", 10))
+
+# --- Pagination Config ---
+REVIEWS_PAGE_SIZE = int(os.environ.get("REVIEWS_PAGE_SIZE", 25))
+USERS_PAGE_SIZE = int(os.environ.get("USERS_PAGE_SIZE", 50))
+MOVIES_PAGE_SIZE = int(os.environ.get("MOVIES_PAGE_SIZE", 25))
+# Largest page size API clients can ask for with ?limit=
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 100))
+SEARCH_PAGE_SIZE = int(os.environ.get("SEARCH_PAGE_SIZE", 20))
+# Rows fetched and written per chunk by streamed API responses
+STREAM_BATCH_SIZE = int(os.environ.get("STREAM_BATCH_SIZE", 1000))
+
+# --- Job Queue Config ---
+# Set to 1 to look up and add movies in the background, answering the add movie form at once
+ADD_MOVIE_ASYNC = os.environ.get("ADD_MOVIE_ASYNC", "0") == "1"
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 4))
+# Seconds a finished job can still be asked for
+JOB_TTL = float(os.environ.get("JOB_TTL", 60 * 60))
+# Set to e.g. "user_data/jobs.sqlite" to keep queued jobs across restarts and share them between workers
+JOB_QUEUE_PATH = os.environ.get("JOB_QUEUE_PATH")
 
 # --- App Config ---
 app = Flask(__name__)
-data_manager = SQLiteDataManager(app, DATABASE_URI)
+
+# In-process metrics, exposed at /metrics
+metrics = MetricsRegistry()
+request_latency = metrics.histogram("http_request_duration_seconds", "Latency of HTTP requests.",
+                                    ("method", "route", "status"))
+omdb_latency = metrics.histogram("omdb_request_duration_seconds",
+                                 "Latency of requests to OMDb, per attempt.", ("outcome",))
+data_manager_latency = metrics.histogram("data_manager_call_duration_seconds",
+                                         "Latency of data manager method calls.", ("method",))
+instrument_app(app, request_latency)
+
+sql_profiler = SQLProfiler(SQL_SLOW_QUERY_MS / 1000, SQL_REPEAT_THRESHOLD, metrics)
+sql_profiler.init_app(app, SQL_PROFILE_HEADER)
+
+data_manager = SQLiteDataManager(app, DATABASE_URI, SQLITE_PRAGMAS, SQLITE_POOL_SIZE, sql_profiler)
+# Versions of the data, bumped in the database by every write of any worker or tool
+engine = data_manager.engine
+
+if DATA_CACHE_SIZE > 0:
+    # The versions changed since the last read tell the cache what other workers wrote
+    data_manager = CachingDataManager(data_manager, DATA_CACHE_SIZE, DATA_CACHE_TTL,
+                                      SQLiteDataVersions(engine))
+
+# Versions of the data answer conditional API requests
+data_versions = SQLiteDataVersions(engine)
+
+# Times every call the app makes, including calls answered by the read cache
+data_manager = InstrumentedDataManager(data_manager, data_manager_latency)
+
+# Pages are dropped by the writes of every worker too, read from the data versions
+page_cache = PageCache(PAGE_CACHE_SIZE, PAGE_CACHE_TTL, SQLiteDataVersions(engine))
+
+# Known titles for autocompletion, extended by every added movie afterwards
+title_index = TitlePrefixIndex()
+with app.app_context():
+    title_index.build(data_manager.iter_movie_titles())
+
+movie_lookup = make_movie_lookup(omdb_latency)
+lookup_cache = movie_lookup.cache
+
+metrics.callback("omdb_lookup_cache_hits_total", "Lookups answered by the OMDb lookup cache.",
+                 "counter", lambda: sum(lookup_cache.stats()[key] for key in ("hits", "negative_hits")))
+metrics.callback("omdb_lookup_cache_misses_total", "Lookups missing the OMDb lookup cache.",
+                 "counter", lambda: lookup_cache.stats()["misses"])
+
+add_movie_jobs = metrics.counter("add_movie_jobs_total", "Finished background add movie jobs.",
+                                 ("status",))
+
+
+def add_movie_job(payload) -> tuple:
+    """
+    Look up a movie and add it to a user's favorites, as a background job.
+
+    Idempotent like JobQueue requires: running the job again finds the movie as a duplicate.
+
+    :param payload: The user ID and the movie name, e.g. {"user_id": "3", "movie_name": "Batman"}.
+    :type payload: dict
+
+    :return: Status ("added", "duplicate", "not_found" or "failed") and result of the job.
+    :rtype: tuple
+    """
+    with app.app_context():
+        movie_data, is_fetch_successful = movie_lookup.fetch_data({"t": payload["movie_name"]})
+
+        # Is fetching unsuccessful? -> Nothing to add
+        if not is_fetch_successful:
+            add_movie_jobs.inc("not_found")
+            return "not_found", None
+
+        try:
+            is_movie_added = data_manager.add_movie(payload["user_id"], movie_data)
+        except ValueError:
+            # Movie data incomplete (e.g. year "N/A") -> It can't be added
+            add_movie_jobs.inc("failed")
+            return "failed", {"title": movie_data["Title"], "error": "Incomplete movie data"}
+
+        if is_movie_added:
+            page_cache.invalidate(f"user:{payload['user_id']}")
+            title_index.add(movie_data["Title"])
+
+        status = "added" if is_movie_added else "duplicate"
+        add_movie_jobs.inc(status)
+        return status, {"title": movie_data["Title"], "imdb_id": movie_data.get("imdbID")}
+
+
+job_queue = None
+if ADD_MOVIE_ASYNC:
+    job_queue = JobQueue(add_movie_job,
+                         SQLiteJobStore(JOB_QUEUE_PATH, JOB_TTL) if JOB_QUEUE_PATH else MemoryJobStore(JOB_TTL),
+                         JOB_WORKERS)
+    job_queue.start()
+    metrics.callback("jobs_pending", "Queued and running background jobs.", "gauge",
+                     job_queue.store.pending)
 
 # --- Logger Config ---
 logging.basicConfig(
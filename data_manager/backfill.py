@@ -0,0 +1,100 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine
+from omdb.settings import make_movie_lookup
+from .migrations import migrate
+
+
+def to_lookup_params(title, year) -> dict:
+    """Build the OMDb query parameters resolving a stored movie, narrowed by its year if known."""
+    if year is None:
+        return {"t": title}
+    return {"t": title, "y": str(year)}
+
+
+def merge_movie(connection, old_id, new_id):
+    """
+    Merge a movie into another one: move its favorites and reviews over, then delete it.
+
+    Favorites the user already has for the kept movie are dropped.
+    """
+    params = {"old_id": old_id, "new_id": new_id}
+    connection.exec_driver_sql(
+        "UPDATE OR IGNORE user_movies SET movie_id = :new_id WHERE movie_id = :old_id", params)
+    connection.exec_driver_sql("DELETE FROM user_movies WHERE movie_id = :old_id", params)
+    connection.exec_driver_sql("UPDATE review SET movie_id = :new_id WHERE movie_id = :old_id", params)
+    connection.exec_driver_sql("DELETE FROM movie WHERE movie_id = :old_id", params)
+
+
+def backfill_imdb_ids(engine, lookup, batch_size=100) -> dict:
+    """
+    Look up and store the IMDb IDs of all movies stored without one.
+
+    Movies are read in batches by movie ID, resolved concurrently through the lookup (local
+    catalog, lookup cache, OMDb) and updated in one transaction per batch. A lookup only counts
+    if it returns a movie of the same year. A movie whose ID is already stored on another row
+    is merged into that row. Movies that can't be resolved keep no ID and are left as they are,
+    so the job can be run again, e.g. once OMDb is reachable.
+
+    :param engine: Engine connected to the SQLite database.
+    :type engine: sqlalchemy.engine.Engine
+
+    :param lookup: The movie lookup resolving titles.
+    :type lookup: MovieLookup
+
+    :param batch_size: The number of movies resolved and updated at once.
+    :type batch_size: int
+
+    :return: The number of movies updated, merged and not found.
+    :rtype: dict
+    """
+    counts = {"updated": 0, "merged": 0, "not_found": 0}
+    last_id = 0
+
+    with ThreadPoolExecutor(max_workers=lookup.max_workers) as executor:
+        while True:
+            with engine.connect() as connection:
+                movies = connection.exec_driver_sql(
+                    "SELECT movie_id, title, publication_year FROM movie "
+                    "WHERE imdb_id IS NULL AND movie_id > ? ORDER BY movie_id LIMIT ?",
+                    (last_id, batch_size)).fetchall()
+            if not movies:
+                break
+            last_id = movies[-1][0]
+
+            results = executor.map(lookup.fetch_data,
+                                   [to_lookup_params(title, year) for _, title, year in movies])
+
+            with engine.begin() as connection:
+                for (movie_id, title, year), (movie_data, is_found) in zip(movies, results):
+                    # Is lookup unsuccessful or about another movie? -> Leave movie as it is
+                    if not is_found or not movie_data.get("imdbID") \
+                            or (year is not None and not movie_data.get("Year", "").startswith(str(year))):
+                        counts["not_found"] += 1
+                        continue
+
+                    imdb_id = movie_data["imdbID"]
+                    existing_id = connection.exec_driver_sql(
+                        "SELECT movie_id FROM movie WHERE imdb_id = ?", (imdb_id,)).scalar()
+
+                    # Is ID already stored on another row? -> Both rows are the same movie
+                    if existing_id is not None:
+                        merge_movie(connection, movie_id, existing_id)
+                        counts["merged"] += 1
+                    else:
+                        connection.exec_driver_sql("UPDATE movie SET imdb_id = ? WHERE movie_id = ?",
+                                                   (imdb_id, movie_id))
+                        counts["updated"] += 1
+
+    return counts
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python -m data_manager.backfill <path to sqlite file>")
+
+    sqlite_engine = create_engine(f"sqlite:///{sys.argv[1]}")
+    migrate(sqlite_engine)
+    # Resolves movies like the app (catalog, cache and OMDb client), without starting it
+    for outcome, count in backfill_imdb_ids(sqlite_engine, make_movie_lookup()).items():
+        print(f"{outcome}: {count}")
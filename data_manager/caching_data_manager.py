@@ -0,0 +1,283 @@
+import threading
+import time
+from collections import OrderedDict
+from .data_manager_interface import DataManagerInterface
+from .json_data_manager import JSONDataManager
+
+
+class TaggedCache:
+    """
+    In-process LRU cache with per-entry expiry and tag based invalidation.
+
+    Every entry carries a set of tags. Invalidating a tag removes all entries carrying it.
+    Every invalidation bumps `generation`, so a value loaded before an invalidation can be
+    recognized as possibly stale and isn't cached.
+    """
+
+    def __init__(self, max_size=1024, ttl=60):
+        """
+        Initializes an empty cache.
+
+        :param max_size: Maximum number of entries before the least recently used is evicted.
+        :type max_size: int
+
+        :param ttl: Seconds an entry stays valid.
+        :type ttl: float
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._keys_by_tag = {}
+        self._lock = threading.Lock()
+
+    def get(self, key) -> tuple:
+        """
+        Return the cached value of a key.
+
+        :return: A tuple of a boolean indicating a hit and the cached value (None on a miss).
+        :rtype: tuple
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            # Is entry cached and still fresh? -> Mark as most recently used
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+
+            if entry:
+                self._remove(key)
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value, tags, generation=None):
+        """
+        Cache a value under a key, evicting the least recently used entry if full.
+
+        :param tags: Tags under which the entry can be invalidated.
+        :type tags: set
+
+        :param generation: The generation read before the value was loaded. If anything was
+                           invalidated since, the value is not cached.
+        :type generation: int
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        """Remove all entries carrying any of the given tags."""
+        with self._lock:
+            self.generation += 1
+            for tag in tags:
+                for key in self._keys_by_tag.pop(tag, set()):
+                    self._remove(key)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def _remove(self, key):
+        """Remove an entry and unlink it from its tags. Must be called while holding the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        for tag in entry[2]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def stats(self) -> dict:
+        """Return hits, misses and current size of the cache."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+class CachingDataManager(DataManagerInterface):
+    """
+    Read-through cache in front of any data manager.
+
+    `get_all_users`, `get_username_and_movies` and `get_all_reviews` are memoized. Every
+    mutating method invalidates exactly the cached reads it can affect:
+
+    - users: `get_all_users`
+    - user:<user_id>: `get_username_and_movies` of that user
+    - movie:<movie_id>: `get_username_and_movies` of every user that has the movie
+    - movies: sorted, filtered or paged `get_username_and_movies` of all users, whose pages
+      a changed movie can enter or leave
+    - reviews:<movie_id>: all pages of `get_all_reviews` of that movie
+    - reviews: all pages of `get_all_reviews` of all movies
+    """
+
+    def __init__(self, data_manager, max_size=1024, ttl=60, invalidation_bus=None):
+        """
+        Initializes the cache in front of a data manager.
+
+        :param data_manager: The wrapped data manager, e.g. SQLiteDataManager or JSONDataManager.
+        :type data_manager: DataManagerInterface
+
+        :param max_size: Maximum number of cached reads.
+        :type max_size: int
+
+        :param ttl: Seconds a cached read stays valid, bounding staleness of writes made
+                    outside this data manager.
+        :type ttl: float
+
+        :param invalidation_bus: Optional bus sharing invalidations with other workers, e.g. the
+                                 versions of the database, polled for the keys other workers
+                                 changed.
+        :type invalidation_bus: SQLiteDataVersions
+        """
+        self.data_manager = data_manager
+        self.cache = TaggedCache(max_size, ttl)
+        self.invalidation_bus = invalidation_bus
+
+        # Users of the single-file JSON backends carry their movies and reviews
+        self.users_include_movies = isinstance(data_manager, JSONDataManager)
+
+    def __getattr__(self, name):
+        """Delegate everything that isn't cached to the wrapped data manager."""
+        return getattr(self.data_manager, name)
+
+    def _cached(self, key, tags_for, load):
+        """
+        Return a cached read or load, cache and return it.
+
+        :param key: The cache key of the read.
+        :type key: tuple
+
+        :param tags_for: Function returning the tags of a loaded value.
+        :type tags_for: function
+
+        :param load: Function loading the value from the wrapped data manager.
+        :type load: function
+        """
+        # Did other workers write? -> Drop what they invalidated first
+        if self.invalidation_bus:
+            published_tags = self.invalidation_bus.poll()
+            if published_tags:
+                self.cache.invalidate(published_tags)
+
+        is_hit, value = self.cache.get(key)
+        if is_hit:
+            return value
+
+        generation = self.cache.generation
+        value = load()
+        self.cache.set(key, value, tags_for(value), generation)
+        return value
+
+    def _invalidate(self, *tags):
+        """Invalidate tags locally and, if configured, in all other workers."""
+        if self.users_include_movies and "users" not in tags:
+            tags += ("users",)
+
+        self.cache.invalidate(tags)
+        if self.invalidation_bus:
+            self.invalidation_bus.publish(tags)
+
+    def get_all_users(self, after_id=None, limit=None):
+        """Get one page of users, served from the cache when possible."""
+        return self._cached(("users", after_id, limit), lambda users: {"users"},
+                            lambda: self.data_manager.get_all_users(after_id, limit))
+
+    def get_username_and_movies(self, user_id, movie_query=None):
+        """Get the name and movies of a user, served from the cache when possible."""
+        def tags_for(result):
+            movies = result[1] if result and result[1] else {}
+            tags = {f"user:{user_id}"} | {f"movie:{movie_id}" for movie_id in movies}
+            # Is result one page of a query? -> Movies not on it may change into it
+            if movie_query:
+                tags.add("movies")
+            return tags
+
+        return self._cached(("user", str(user_id), movie_query.key() if movie_query else None),
+                            tags_for,
+                            lambda: self.data_manager.get_username_and_movies(user_id, movie_query))
+
+    def get_all_reviews(self, movie_id, after_id=None, limit=None):
+        """Get one page of reviews of a movie, served from the cache when possible."""
+        # Omitted arguments fall back to the wrapped data manager's defaults
+        kwargs = {key: value for key, value in (("after_id", after_id), ("limit", limit))
+                  if value is not None}
+        return self._cached(("reviews", str(movie_id), after_id, limit),
+                            lambda reviews: {f"reviews:{movie_id}", "reviews"},
+                            lambda: self.data_manager.get_all_reviews(movie_id, **kwargs))
+
+    def iter_users(self, batch_size=1000):
+        """Iterate over all users of the wrapped data manager, bypassing the cache."""
+        return self.data_manager.iter_users(batch_size)
+
+    def iter_movie_titles(self, batch_size=1000):
+        """Iterate over the titles of all movies of the wrapped data manager."""
+        return self.data_manager.iter_movie_titles(batch_size)
+
+    def search_movies(self, search_text, after=None, limit=None):
+        """Search movies in the wrapped data manager."""
+        return self.data_manager.search_movies(search_text, after, limit)
+
+    def search_reviews(self, search_text, after=None, limit=None):
+        """Search reviews in the wrapped data manager."""
+        return self.data_manager.search_reviews(search_text, after, limit)
+
+    def add_user(self, new_username):
+        """Add a new user and invalidate the user list."""
+        is_user_added = self.data_manager.add_user(new_username)
+        self._invalidate("users")
+        return is_user_added
+
+    def delete_user(self, user_id):
+        """Delete a user and invalidate the user list, the user's movies and all reviews."""
+        is_user_deleted = self.data_manager.delete_user(user_id)
+        # Reviews are joined with their author, so any movie's reviews may have changed
+        self._invalidate("users", f"user:{user_id}", "reviews")
+        return is_user_deleted
+
+    def add_movie(self, user_id, fetched_movie_data):
+        """Add a movie to a user's collection and invalidate the user's movies."""
+        is_movie_added = self.data_manager.add_movie(user_id, fetched_movie_data)
+        self._invalidate(f"user:{user_id}")
+        return is_movie_added
+
+    def add_movies(self, user_id, fetched_movies):
+        """Add several movies to a user's collection and invalidate the user's movies."""
+        added = self.data_manager.add_movies(user_id, fetched_movies)
+        self._invalidate(f"user:{user_id}")
+        return added
+
+    def update_user_movies(self, user_id, movie_id, update_data):
+        """Update a movie and invalidate the movies of every user that has it and all queries."""
+        is_update_successful = self.data_manager.update_user_movies(user_id, movie_id, update_data)
+        self._invalidate(f"user:{user_id}", f"movie:{movie_id}", "movies")
+        return is_update_successful
+
+    def delete_user_movie(self, user_id, movie_id):
+        """Delete a movie from a user's collection and invalidate the user's movies."""
+        is_movie_deleted = self.data_manager.delete_user_movie(user_id, movie_id)
+        self._invalidate(f"user:{user_id}")
+        return is_movie_deleted
+
+    def add_review(self, user_id, movie_id, review_text):
+        """Add a review and invalidate the reviews of the movie."""
+        is_review_added = self.data_manager.add_review(user_id, movie_id, review_text)
+        self._invalidate(f"reviews:{movie_id}")
+        return is_review_added
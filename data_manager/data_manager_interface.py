@@ -12,10 +12,30 @@ class DataManagerInterface(ABC):
         return False
 
     @abstractmethod
-    def get_all_users(self):
-        """Get all users from the database."""
+    def get_all_users(self, after_id=None, limit=None):
+        """Get one page of users, ordered by ID, from the database. Defaults to all users."""
         pass
 
+    def iter_users(self, batch_size=1000):
+        """
+        Iterate over all users, ordered by ID, as (user ID, user) pairs.
+
+        - Note: Backends reading from a database should override this default, which loads all
+          users at once, to fetch users in batches of `batch_size` instead.
+        """
+        yield from (self.get_all_users() or {}).items()
+
+    def iter_movie_titles(self, batch_size=1000):
+        """
+        Iterate over the titles of all movies, e.g. to build an index of known titles.
+
+        - Note: This default reads the movies stored within the users (JSON backends). Backends
+          keeping movies elsewhere must override it.
+        """
+        for user_id, user in self.iter_users(batch_size):
+            for movie in (user.get("movies") or {}).values():
+                yield movie.get("title")
+
     @abstractmethod
     def add_user(self, new_username):
         """Add a new user to the database."""
@@ -27,15 +47,41 @@ class DataManagerInterface(ABC):
         pass
 
     @abstractmethod
-    def get_username_and_movies(self, user_id):
-        """Get the name and movies of a user from the database."""
+    def get_username_and_movies(self, user_id, movie_query=None):
+        """Get the name and movies of a user, sorted, filtered and paginated by a MovieQuery."""
         pass
 
     @abstractmethod
     def add_movie(self, user_id, fetched_res):
-        """Add a new movie to the user's collection."""
+        """
+        Add a new movie to the user's collection.
+
+        :return: True if the movie was added, False if it already was in the collection.
+        :rtype: bool
+
+        :raises ValueError: If the movie data is incomplete, e.g. a year or rating of "N/A".
+        """
         pass
 
+    def add_movies(self, user_id, fetched_movies) -> list:
+        """
+        Add several movies to the user's collection.
+
+        - Note: Backends that can insert in bulk should override this default, which simply
+          adds the movies one by one.
+
+        :return: One boolean per movie indicating if it was added, or None if its data is
+                 incomplete.
+        :rtype: list
+        """
+        results = []
+        for fetched_movie_data in fetched_movies:
+            try:
+                results.append(self.add_movie(user_id, fetched_movie_data))
+            except ValueError:
+                results.append(None)
+        return results
+
     @abstractmethod
     def update_user_movies(self, user_id, movie_id, update_data):
         """Update the specified movie data for a given user."""
@@ -51,6 +97,14 @@ class DataManagerInterface(ABC):
         """Add a new review of a user for a movie to the database"""
         pass
 
-    def get_all_reviews(self, movie_id):
-        """Get all reviews of a given movie from the database"""
+    def get_all_reviews(self, movie_id, after_id=None, limit=None):
+        """Get one page of reviews of a given movie from the database"""
+        pass
+
+    def search_movies(self, search_text, after=None, limit=None):
+        """Get one page of movies whose title or director match a text, best match first."""
+        pass
+
+    def search_reviews(self, search_text, after=None, limit=None):
+        """Get one page of reviews whose text matches a text, best match first."""
         pass
@@ -0,0 +1,47 @@
+import time
+from functools import wraps
+
+
+class InstrumentedDataManager:
+    """
+    Times every method call of a data manager.
+
+    Calls are recorded in a histogram labeled with the method name. Attributes that aren't
+    methods are passed through untouched. Methods returning a generator (e.g. `iter_users`)
+    are only timed until the generator is created.
+    """
+
+    def __init__(self, data_manager, histogram):
+        """
+        Initializes the instrumentation in front of a data manager.
+
+        :param data_manager: The wrapped data manager.
+        :type data_manager: DataManagerInterface
+
+        :param histogram: Histogram with the label method.
+        :type histogram: metrics.Histogram
+        """
+        self.data_manager = data_manager
+        self.histogram = histogram
+        self._timed_methods = {}
+
+    def __getattr__(self, name):
+        """Return a timed version of a method of the wrapped data manager."""
+        timed_method = self._timed_methods.get(name)
+        if timed_method is not None:
+            return timed_method
+
+        attribute = getattr(self.data_manager, name)
+        if not callable(attribute):
+            return attribute
+
+        @wraps(attribute)
+        def timed_method(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                self.histogram.observe(time.perf_counter() - start, name)
+
+        self._timed_methods[name] = timed_method
+        return timed_method
@@ -1,20 +1,143 @@
 import json
+import os
+import stat
+import tempfile
+import threading
 from uuid import uuid4
 from .data_manager_interface import DataManagerInterface
+from .listing import page_by_key
+from .search import InvertedIndex, highlight, page_of_matches, tokenize
+from .title_index import normalize_title
+from functools import wraps
 from typing import Union
 
+try:
+    import fcntl
+except ImportError:
+    # No fcntl (e.g. Windows) -> Locks only guard threads of this process
+    fcntl = None
+
+
+def synchronized(method):
+    """Run a method while holding the instance's lock, so read-modify-write cycles don't interleave."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def file_signature(path):
+    """Return modification time and size of a file, or None if it can't be read."""
+    try:
+        file_stat = os.stat(path)
+        return file_stat.st_mtime_ns, file_stat.st_size
+    except OSError:
+        return None
+
+
+def proc_umask() -> Union[int, None]:
+    """Return the umask of the process as Linux reports it in /proc, or None elsewhere."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except OSError:
+        pass
+    return None
+
+
+def import_umask() -> int:
+    """
+    Return the umask of the process by setting it and setting it back right away.
+
+    Other threads creating files in between would get the wrong permissions, so this only runs
+    once at import, before the app starts any threads.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Umask when the module was imported, for systems without /proc
+IMPORT_UMASK = import_umask()
+
+
+def file_mode(path) -> int:
+    """Return the permission bits of a file, or those a new file would get under the umask."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = proc_umask()
+        return 0o666 & ~(IMPORT_UMASK if umask is None else umask)
+
+
+class FileLock:
+    """
+    Exclusive lock backed by a lock file.
+
+    The lock is held across threads of this process (re-entrant) and, where `fcntl` is
+    available, across processes.
+    """
+
+    def __init__(self, path):
+        """
+        Initializes the lock. The lock file is created on first use.
+
+        :param path: The path to the lock file.
+        :type path: str
+        """
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+
+        # Is this the outermost acquisition in this process? -> Lock the file as well
+        if self._depth == 0 and fcntl:
+            self._file = open(self.path, "a")
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._depth -= 1
+        if self._depth == 0 and self._file:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
 
 class JSONDataManager(DataManagerInterface):
     """Data manager for handling JSON files"""
 
     def __init__(self, filename: str):
-        """Initializes the filename of the JSON data to be used"""
+        """
+        Initializes the filename of the JSON data to be used.
+
+        The parsed data is kept in memory and only reloaded when modification time or size of
+        the file change, e.g. because another process wrote to it.
+        """
         self.filename = filename
+        self._all_users = None
+        self._file_signature = None
+        self._title_indexes = {}
+        self._search_index = None
+        self._lock = threading.RLock()
 
     @staticmethod
     def write_json(filename, content):
         """
-        Write JSON content to a file.
+        Write JSON content to a file atomically.
+
+        The content is written to a temporary file in the same directory, which then replaces
+        the original file. A crash mid-write therefore leaves the previous version intact. The
+        temporary file gets the permissions of the file it replaces (or, for a new file, those
+        `open` would have given it), since it is created readable by its owner only.
 
         :param filename: The path to the JSON file.
         :type filename: str
@@ -22,40 +145,190 @@ class JSONDataManager(DataManagerInterface):
         :param content: The data to be written to the file.
         :type content: Any valid JSON-serializable object
         """
-        with open(filename, "w") as file:
-            json.dump(content, file, indent=4)
+        directory = os.path.dirname(os.path.abspath(filename))
+        with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False) as file:
+            try:
+                json.dump(content, file, indent=4)
+                file.flush()
+                os.fsync(file.fileno())
+                os.chmod(file.name, file_mode(filename))
+            except Exception:
+                file.close()
+                os.remove(file.name)
+                raise
+        os.replace(file.name, filename)
+
+    @staticmethod
+    def apply_operation(all_users, operation):
+        """
+        Apply a single mutation to the users dictionary in place.
+
+        Every mutation of the data manager is expressed as an operation, so it can be written
+        to a journal and replayed later. Operations carry absolute values, so replaying a journal
+        over a snapshot that already contains its changes yields the same state.
+
+        :param all_users: The users dictionary to change.
+        :type all_users: dict
+
+        :param operation: The mutation, e.g. {"op": "delete_user", "user_id": "..."}.
+        :type operation: dict
+        """
+        op = operation["op"]
+        user = all_users.get(operation["user_id"])
+
+        if op == "add_user":
+            all_users[operation["user_id"]] = {"name": operation["name"], "movies": {}}
+        elif op == "delete_user":
+            all_users.pop(operation["user_id"], None)
+        elif user is None:
+            return
+        elif op == "add_movie":
+            user.setdefault("movies", {})[operation["movie_id"]] = operation["movie"]
+        elif op == "update_movie" and operation["movie_id"] in user.get("movies", {}):
+            user["movies"][operation["movie_id"]].update(operation["update_data"])
+        elif op == "delete_movie":
+            user.get("movies", {}).pop(operation["movie_id"], None)
+        elif op == "add_review" and operation["movie_id"] in user.get("movies", {}):
+            movie = user["movies"][operation["movie_id"]]
+            movie.setdefault("reviews", {})[operation["review_id"]] = operation["review"]
+
+    @staticmethod
+    def movie_keys(movie) -> list:
+        """
+        Return the keys identifying a movie within a user's collection.
+
+        :param movie: A movie of the user's collection.
+        :type movie: dict
+
+        :return: The normalized title and, if known, the IMDb ID prefixed with "imdb:".
+        :rtype: list
+        """
+        keys = [normalize_title(movie["title"])]
+        if movie.get("imdb_id"):
+            keys.append(f"imdb:{movie['imdb_id']}")
+        return keys
+
+    def _get_title_index(self, user_id) -> dict:
+        """
+        Return the index of a user's movies from normalized title and IMDb ID to movie ID.
+
+        The index is built on first use and kept up to date by every commit afterwards.
+        """
+        title_index = self._title_indexes.get(user_id)
+
+        if title_index is None:
+            user = self.get_all_users().get(user_id) or {}
+            title_index = {key: movie_id
+                           for movie_id, movie in user.get("movies", {}).items()
+                           for key in self.movie_keys(movie)}
+            self._title_indexes[user_id] = title_index
+
+        return title_index
+
+    def _apply(self, all_users, operation):
+        """Apply an operation to the data in memory and update the affected title index."""
+        user_id = operation["user_id"]
+        movie_id = operation.get("movie_id")
+        old_movie = dict((all_users.get(user_id) or {}).get("movies", {}).get(movie_id) or {})
+
+        self.apply_operation(all_users, operation)
+        self._search_index = None
+
+        title_index = self._title_indexes.get(user_id)
+        if operation["op"] in ("add_user", "delete_user"):
+            self._title_indexes.pop(user_id, None)
+        elif title_index is not None and movie_id:
+            # Drop keys of the movie as it was, then add keys of the movie as it is now
+            for key in self.movie_keys(old_movie) if old_movie else []:
+                if title_index.get(key) == movie_id:
+                    del title_index[key]
+            new_movie = all_users[user_id].get("movies", {}).get(movie_id)
+            for key in self.movie_keys(new_movie) if new_movie else []:
+                title_index[key] = movie_id
+
+    def _commit(self, operation):
+        """Apply an operation to the data in memory and write the whole document to the file."""
+        all_users = self.get_all_users()
+        self._apply(all_users, operation)
+
+        try:
+            self.write_json(self.filename, all_users)
+        except Exception:
+            # Memory might be ahead of the file now -> Force a reload on next access
+            self._file_signature = None
+            raise
+        self._file_signature = file_signature(self.filename)
 
-    def get_all_users(self) -> Union[dict, None]:
+    def get_all_users(self, after_id=None, limit=None) -> Union[dict, None]:
         """
-        Return all the users from a JSON file as a dictionary.
+        Return the users from a JSON file as a dictionary.
+
+        Without arguments, all users are returned as they are kept in memory. Otherwise one
+        page of users, ordered by ID, is returned.
+
+        :param after_id: Only return users with an ID sorting after this one.
+        :type after_id: str
+
+        :param limit: The maximum number of users to return. Defaults to all.
+        :type limit: int
 
         :return: A dictionary containing user data if successful, or None if an error occurs.
         :rtype: Union[dict, None]
         """
-        try:
-            with open(self.filename, "r") as f:
-                return json.load(f)
-        except OSError:
-            return None
+        all_users = self._load()
+
+        # Is a page requested? -> Slice it out of all users
+        if all_users is not None and (after_id is not None or limit is not None):
+            return page_by_key(all_users, after_id, limit)
+        return all_users
+
+    def _load(self) -> Union[dict, None]:
+        """
+        Return all the users from the JSON file, kept in memory.
 
-    def add_user(self, new_username):
+        The file is only parsed again if it changed since it was last read or written.
+
+        :return: A dictionary containing user data if successful, or None if an error occurs.
+        :rtype: Union[dict, None]
+        """
+        with self._lock:
+            current_signature = file_signature(self.filename)
+
+            # Is file unchanged? -> Serve parsed data from memory
+            if current_signature is not None and current_signature == self._file_signature:
+                return self._all_users
+
+            try:
+                with open(self.filename, "r") as f:
+                    self._all_users = json.load(f)
+                self._title_indexes = {}
+                self._search_index = None
+            except OSError:
+                self._all_users, self._file_signature = None, None
+                return None
+
+            self._file_signature = current_signature
+            return self._all_users
+
+    @synchronized
+    def add_user(self, new_username, user_id=None):
         """
         Adds a new user to the database.
 
         :param new_username: The name of the new user.
-        """
-        all_users = self.get_all_users()
 
-        # Generate a new user ID and add the user to the database
-        new_user_id = str(uuid4())
-        all_users[new_user_id] = {
-            "name": new_username,
-            "movies": {}
-        }
+        :param user_id: The ID of the new user. Defaults to a newly generated one.
+        :type user_id: str
 
-        # Update JSON file with new user
-        self.write_json(self.filename, all_users)
+        :return: True once the user was added.
+        :rtype: bool
+        """
+        # Generate a new user ID and add the user to the database
+        new_user_id = user_id or str(uuid4())
+        self._commit({"op": "add_user", "user_id": new_user_id, "name": new_username})
+        return True
 
+    @synchronized
     def delete_user(self, user_id) -> bool:
         """
         Delete a user from the database.
@@ -70,18 +343,21 @@ class JSONDataManager(DataManagerInterface):
 
         # Is user in database? -> del & return True
         if user_id in all_users:
-            del all_users[user_id]
-            self.write_json(self.filename, all_users)
+            self._commit({"op": "delete_user", "user_id": user_id})
             return True
         return False
 
-    def get_username_and_movies(self, user_id):
+    def get_username_and_movies(self, user_id, movie_query=None):
         """
         Get the name and movies of a user from the database.
 
         :param user_id: The unique identifier of the user.
         :type user_id: str
 
+        :param movie_query: Sort order, filters and page of the movies. Defaults to None, which
+                            returns all movies.
+        :type movie_query: MovieQuery
+
         :return: A tuple containing the user's name and movie collection if the user exists,
                  otherwise False.
         :rtype: Union[tuple, False]
@@ -95,12 +371,15 @@ class JSONDataManager(DataManagerInterface):
 
         username = user.get("name")
         user_movies = user.get("movies")
+        if user_movies and movie_query:
+            user_movies = movie_query.apply(user_movies)
 
         # Does user have any movies?
         if not user_movies:
             user_movies = None
         return username, user_movies
 
+    @synchronized
     def add_movie(self, user_id, fetched_movie_data) -> bool:
         """
         Add a new movie to the user's collection.
@@ -112,38 +391,43 @@ class JSONDataManager(DataManagerInterface):
         :type fetched_movie_data: dict
 
         :return: True if the movie was successfully added,
-                 False if the movie already exists in the collection.
+                 False if the user does not exist or the movie already exists in the collection.
         :rtype: bool
+
+        :raises ValueError: If year or rating of the movie are not numeric (e.g. "N/A").
         """
         fetched_movie_title = fetched_movie_data["Title"]
         fetched_movie_director = fetched_movie_data["Director"]
         fetched_movie_year = int(fetched_movie_data["Year"])
         fetched_movie_rating = float(fetched_movie_data["imdbRating"])
 
-        all_users = self.get_all_users()
-        user = all_users.get(user_id)
-        user_movies = user.get("movies")
-
-        # Is movie already in users favorites? -> return False
-        for movie in user_movies.values():
-            if fetched_movie_title == movie["title"]:
-                return False
+        # Is user not in database? -> return False
+        if user_id not in self.get_all_users():
+            return False
 
-        # Add unique ID with prefix and create movie dict
-        unique_id = str(uuid4())
         new_movie = {
             "title": fetched_movie_title,
             "director": fetched_movie_director,
             "rating": fetched_movie_rating,
             "year": fetched_movie_year
         }
+        if fetched_movie_data.get("imdbID"):
+            new_movie["imdb_id"] = fetched_movie_data["imdbID"]
+
+        # Is movie already in users favorites (same title or IMDb ID)? -> return False
+        title_index = self._get_title_index(user_id)
+        if any(key in title_index for key in self.movie_keys(new_movie)):
+            return False
+
+        # Add unique ID
+        unique_id = str(uuid4())
 
         #  Add fetched movie to database & return True
-        user["movies"][unique_id] = new_movie
-        all_users[user_id] = user
-        self.write_json(self.filename, all_users)
+        self._commit({"op": "add_movie", "user_id": user_id, "movie_id": unique_id,
+                      "movie": new_movie})
         return True
 
+    @synchronized
     def update_user_movies(self, user_id, movie_id, update_data) -> bool:
         """
         Update the specified movie data for a given user.
@@ -163,22 +447,17 @@ class JSONDataManager(DataManagerInterface):
         """
         all_users = self.get_all_users()
         user = all_users.get(user_id)
-        has_movies = user.get("movies")
 
-        # Is user in database or has user movies? -> return False
-        if not user or not has_movies:
+        # Is user not in database or movie not in users favorites? -> return False
+        if not user or movie_id not in user.get("movies", {}):
             return False
 
-        # Update movie data for user
-        user_movies = user["movies"]
-        user_movies[movie_id].update(update_data)
-        all_users[user_id] = user
-        user["movies"] = user_movies
-
-        # Write updated data back to JSON file
-        self.write_json(self.filename, all_users)
+        # Update movie data for user & write it back
+        self._commit({"op": "update_movie", "user_id": user_id, "movie_id": movie_id,
+                      "update_data": update_data})
         return True
 
+    @synchronized
     def delete_user_movie(self, user_id, movie_id) -> bool:
         """
         Delete the specified movie of a user.
@@ -193,21 +472,300 @@ class JSONDataManager(DataManagerInterface):
                  False if the user or movie does not exist.
         :rtype: bool
         """
-
         all_users = self.get_all_users()
         user = all_users.get(user_id)
-        has_movies = user.get("movies")
 
-        # Is user in database or has no movies? -> return False
-        if not user or not has_movies:
+        # Is user not in database or movie not in users favorites? -> return False
+        if not user or movie_id not in user.get("movies", {}):
             return False
 
-        # Delete movie
-        user_movies = user["movies"]
-        del user_movies[movie_id]
-        user["movies"] = user_movies
-        all_users[user_id] = user
+        # Delete movie & write it back
+        self._commit({"op": "delete_movie", "user_id": user_id, "movie_id": movie_id})
+        return True
+
+    @synchronized
+    def add_review(self, user_id, movie_id, review_text) -> bool:
+        """
+        Add a new review of a user for one of their movies.
+
+        :param user_id: The unique identifier of the user.
+        :type user_id: str
+
+        :param movie_id: The unique identifier of the reviewed movie.
+        :type movie_id: str
+
+        :param review_text: The content of the review.
+        :type review_text: str
 
-        # Write updated data back to JSON file
-        self.write_json(self.filename, all_users)
+        :return: True if the review was added, False if the user or movie does not exist.
+        :rtype: bool
+        """
+        all_users = self.get_all_users()
+        user = all_users.get(user_id)
+
+        # Is user not in database or movie not in users favorites? -> return False
+        if not user or movie_id not in user.get("movies", {}):
+            return False
+
+        self._commit({"op": "add_review", "user_id": user_id, "movie_id": movie_id,
+                      "review_id": str(uuid4()),
+                      "review": {"user_id": user_id, "review_text": review_text}})
         return True
+
+    def get_all_reviews(self, movie_id, after_id=None, limit=None) -> dict:
+        """
+        Get the reviews of a given movie.
+
+        :param movie_id: The unique identifier of the movie.
+        :type movie_id: str
+
+        :param after_id: Only return reviews sorting after this review ID.
+        :type after_id: str
+
+        :param limit: The maximum number of reviews to return. Defaults to all.
+        :type limit: int
+
+        :return: A dictionary of review details keyed by review ID.
+        :rtype: dict
+        """
+        all_users = self.get_all_users() or {}
+
+        for user in all_users.values():
+            movie = user.get("movies", {}).get(movie_id)
+            if movie is None:
+                continue
+
+            review_ids = sorted(review_id for review_id in movie.get("reviews", {})
+                                if after_id is None or review_id > str(after_id))
+            return {
+                review_id: {
+                    "movie_id": movie_id,
+                    "user_id": movie["reviews"][review_id]["user_id"],
+                    "user_name": user.get("name"),
+                    "review_text": movie["reviews"][review_id]["review_text"]
+                }
+                for review_id in review_ids[:limit]
+            }
+
+        return {}
+
+    def _get_search_index(self) -> dict:
+        """
+        Return the inverted indexes of movies and reviews together with the indexed documents.
+
+        The indexes are built on first use and dropped by every change of the data, to be built
+        again by the next search.
+
+        :return: A dictionary with the keys "movies" and "reviews", each holding a tuple of the
+                 InvertedIndex and a dictionary of the indexed documents by ID.
+        :rtype: dict
+        """
+        with self._lock:
+            all_users = self.get_all_users() or {}
+            if self._search_index is not None:
+                return self._search_index
+
+            movie_index, movie_documents = InvertedIndex(), {}
+            review_index, review_documents = InvertedIndex(), {}
+            for user_id, user in all_users.items():
+                for movie_id, movie in user.get("movies", {}).items():
+                    movie_index.add(movie_id, f"{movie.get('title')} {movie.get('director') or ''}")
+                    movie_documents[movie_id] = (user_id, movie)
+
+                    for review_id, review in movie.get("reviews", {}).items():
+                        review_index.add(review_id, review.get("review_text"))
+                        review_documents[review_id] = (user, movie_id, movie, review)
+
+            self._search_index = {"movies": (movie_index, movie_documents),
+                                  "reviews": (review_index, review_documents)}
+            return self._search_index
+
+    def search_movies(self, search_text, after=None, limit=None) -> dict:
+        """
+        Search titles and directors of all movies with an in-memory inverted index.
+
+        :param search_text: The words to search for. The last word also matches as a prefix.
+        :type search_text: str
+
+        :param after: The cursor of the previous page. Defaults to None, the first page.
+        :type after: str
+
+        :param limit: The maximum number of movies to return. Defaults to all.
+        :type limit: int
+
+        :return: A dictionary of matching movies keyed by movie ID, best match first.
+        :rtype: dict
+        """
+        movie_index, movie_documents = self._get_search_index()["movies"]
+        terms = tokenize(search_text)
+
+        results = {}
+        for score, movie_id in page_of_matches(movie_index.search(search_text), after, limit):
+            user_id, movie = movie_documents[movie_id]
+            results[movie_id] = {
+                "title": movie.get("title"),
+                "director": movie.get("director"),
+                "year": movie.get("year"),
+                "rating": movie.get("rating"),
+                "title_highlight": highlight(movie.get("title"), terms),
+                "director_highlight": highlight(movie.get("director"), terms),
+                "score": score,
+                "user_id": user_id
+            }
+        return results
+
+    def search_reviews(self, search_text, after=None, limit=None) -> dict:
+        """
+        Search the texts of all reviews with an in-memory inverted index.
+
+        Works like `search_movies`.
+
+        :return: A dictionary of matching reviews keyed by review ID, best match first.
+        :rtype: dict
+        """
+        review_index, review_documents = self._get_search_index()["reviews"]
+        terms = tokenize(search_text)
+
+        results = {}
+        for score, review_id in page_of_matches(review_index.search(search_text), after, limit):
+            user, movie_id, movie, review = review_documents[review_id]
+            results[review_id] = {
+                "movie_id": movie_id,
+                "movie_title": movie.get("title"),
+                "user_id": review.get("user_id"),
+                "user_name": user.get("name"),
+                "review_text": review.get("review_text"),
+                "snippet": highlight(review.get("review_text"), terms),
+                "score": score
+            }
+        return results
+
+
+class JournaledJSONDataManager(JSONDataManager):
+    """
+    JSON data manager that appends mutations to a journal instead of rewriting the whole file.
+
+    The JSON file is a snapshot. Every mutation is appended as one JSON line to
+    `<filename>.journal` and replayed over the snapshot when loading. Once the journal grows past
+    `compaction_threshold` bytes it is folded into a new snapshot and truncated. Appends and
+    compactions hold `<filename>.journal.lock`, so several processes can share the files.
+    """
+
+    def __init__(self, filename: str, compaction_threshold=1024 * 1024, fsync=True):
+        """
+        Initializes snapshot and journal file names.
+
+        :param filename: The path to the JSON snapshot.
+        :type filename: str
+
+        :param compaction_threshold: Journal size in bytes that triggers a compaction.
+        :type compaction_threshold: int
+
+        :param fsync: Whether every journal append is flushed to disk before returning.
+        :type fsync: bool
+        """
+        super().__init__(filename)
+        self.journal_filename = f"{filename}.journal"
+        self.compaction_threshold = compaction_threshold
+        self.fsync = fsync
+        self._journal_offset = 0
+        self._journal_signature = None
+        self._journal_lock = FileLock(f"{self.journal_filename}.lock")
+
+    def _replay_journal(self):
+        """
+        Apply the journal entries written since the last replay to the data in memory.
+
+        A trailing line without newline is an append cut short by a crash and is ignored.
+        """
+        try:
+            with open(self.journal_filename, "rb") as journal:
+                journal.seek(self._journal_offset)
+                for line in journal:
+                    if not line.endswith(b"\n"):
+                        break
+                    self.apply_operation(self._all_users, json.loads(line))
+                    self._journal_offset += len(line)
+                    self._title_indexes = {}
+                    self._search_index = None
+        except FileNotFoundError:
+            self._journal_offset = 0
+
+        self._journal_signature = file_signature(self.journal_filename)
+
+    def _load(self) -> Union[dict, None]:
+        """
+        Return all the users of the last snapshot with the journal replayed over it.
+
+        Only journal entries appended since the last call are replayed. The snapshot is parsed
+        again only if it changed, e.g. because another process compacted the journal.
+
+        :return: A dictionary containing user data if successful, or None if an error occurs.
+        :rtype: Union[dict, None]
+        """
+        with self._lock:
+            current_signature = file_signature(self.filename)
+            journal_signature = file_signature(self.journal_filename)
+
+            if current_signature is not None and current_signature == self._file_signature:
+                # Is journal unchanged too? -> Serve data from memory
+                if journal_signature == self._journal_signature:
+                    return self._all_users
+
+                # Has journal only grown? -> Replay just the new entries
+                if journal_signature and journal_signature[1] >= self._journal_offset:
+                    self._replay_journal()
+                    return self._all_users
+
+            # Snapshot changed or journal was truncated -> Load everything again
+            self._journal_offset = 0
+            if super()._load() is None:
+                return None
+            self._replay_journal()
+            return self._all_users
+
+    def _commit(self, operation):
+        """
+        Append an operation to the journal, apply it in memory and compact if due.
+
+        An append cut short by a crash is cut off the journal first. Appending after it would
+        merge both into one invalid line that breaks every later replay. Replay, cut and append
+        hold the journal lock, so the cut can't drop a line another process just appended.
+        """
+        with self._journal_lock:
+            all_users = self.get_all_users()
+
+            with open(self.journal_filename, "ab") as journal:
+                # Is journal longer than the replayed entries? -> Drop the torn trailing line
+                if journal.tell() > self._journal_offset:
+                    journal.truncate(self._journal_offset)
+                line = (json.dumps(operation) + "\n").encode()
+                journal.write(line)
+                journal.flush()
+                if self.fsync:
+                    os.fsync(journal.fileno())
+
+            self._apply(all_users, operation)
+            self._journal_offset += len(line)
+            self._journal_signature = file_signature(self.journal_filename)
+
+            if self._journal_offset >= self.compaction_threshold:
+                self.compact()
+
+    @synchronized
+    def compact(self):
+        """
+        Fold the journal into a new snapshot and truncate it.
+
+        The snapshot is replaced atomically before the journal is truncated. If the process dies
+        in between, replaying the old journal over the new snapshot is harmless (see
+        `apply_operation`).
+        """
+        with self._journal_lock:
+            all_users = self.get_all_users()
+            self.write_json(self.filename, all_users)
+            open(self.journal_filename, "w").close()
+
+            self._file_signature = file_signature(self.filename)
+            self._journal_offset = 0
+            self._journal_signature = file_signature(self.journal_filename)
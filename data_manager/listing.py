@@ -0,0 +1,226 @@
+import base64
+import json
+
+# Sortable movie fields, named like the keys of the movie dictionaries
+SORT_FIELDS = ("title", "year", "rating")
+
+
+def encode_cursor(value, key) -> str:
+    """Encode the sort value and key of the last item of a page into an opaque cursor."""
+    return base64.urlsafe_b64encode(json.dumps([value, key]).encode()).decode()
+
+
+def decode_cursor(cursor) -> tuple:
+    """
+    Decode a cursor into the sort value and key of the item it points at.
+
+    :raises ValueError: If the cursor is malformed.
+    """
+    try:
+        value, key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    return value, key
+
+
+def next_cursor(items, limit, field):
+    """
+    Return the cursor of the page following a full page of items.
+
+    :param items: One page of items (dictionaries) keyed by ID, in page order.
+    :type items: dict
+
+    :param limit: The page size.
+    :type limit: int
+
+    :param field: The item field the page is sorted by.
+    :type field: str
+
+    :return: The cursor, or None if the page is the last one.
+    :rtype: Union[str, None]
+    """
+    if not items or not limit or len(items) < limit:
+        return None
+
+    key, item = list(items.items())[-1]
+    return encode_cursor(item.get(field), key)
+
+
+def page_by_key(items, after_key=None, limit=None) -> dict:
+    """
+    Return one page of a dictionary, ordered by its keys.
+
+    :param items: The dictionary to paginate, e.g. users keyed by user ID.
+    :type items: dict
+
+    :param after_key: Only return items with a key sorting after this one.
+    :type after_key: str
+
+    :param limit: The maximum number of items to return. Defaults to all.
+    :type limit: int
+
+    :return: The page as a dictionary in key order.
+    :rtype: dict
+    """
+    keys = sorted(key for key in items if after_key is None or str(key) > str(after_key))
+    return {key: items[key] for key in keys[:limit]}
+
+
+class MovieQuery:
+    """
+    Sort order, filters and page of a movie listing.
+
+    Movies are ordered by the sort field and then by movie ID, so the order is total and a page
+    can continue after the last movie of the previous one (keyset pagination). Missing values
+    sort before all others. The cursor of a page is an opaque string encoding the sort value
+    and ID of its last movie.
+    """
+
+    def __init__(self, sort="title", descending=False, year_min=None, year_max=None,
+                 min_rating=None, director=None, after=None, limit=None):
+        """
+        Initializes a movie query.
+
+        :param sort: The field to sort by, one of SORT_FIELDS.
+        :type sort: str
+
+        :param descending: Whether to sort in descending order.
+        :type descending: bool
+
+        :param year_min: Only include movies published in or after this year.
+        :type year_min: int
+
+        :param year_max: Only include movies published in or before this year.
+        :type year_max: int
+
+        :param min_rating: Only include movies rated at least this high.
+        :type min_rating: float
+
+        :param director: Only include movies of this director (case-insensitive).
+        :type director: str
+
+        :param after: The cursor of the previous page. Defaults to None, the first page.
+        :type after: str
+
+        :param limit: The maximum number of movies to return. Defaults to all.
+        :type limit: int
+
+        :raises ValueError: If the sort field or the cursor is invalid.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Sort must be one of: {', '.join(SORT_FIELDS)}")
+
+        self.sort = sort
+        self.descending = descending
+        self.year_min = year_min
+        self.year_max = year_max
+        self.min_rating = min_rating
+        self.director = director
+        self.after = after
+        self.after_key = decode_cursor(after) if after else None
+        self.limit = limit
+
+        # Does cursor point at a value of another field? -> It can't be compared
+        expected_types = (str,) if sort == "title" else (int, float)
+        if self.after_key and self.after_key[0] is not None \
+                and not isinstance(self.after_key[0], expected_types):
+            raise ValueError("Invalid cursor")
+
+    @classmethod
+    def from_args(cls, args, default_limit=None, max_limit=None):
+        """
+        Create a query from request arguments.
+
+        Supported arguments: sort, order ("asc" or "desc"), year_min, year_max, min_rating,
+        director, after and limit.
+
+        :param args: The request arguments, e.g. `request.args`.
+        :type args: dict
+
+        :param default_limit: The page size if no limit is given.
+        :type default_limit: int
+
+        :param max_limit: The largest page size a client may ask for.
+        :type max_limit: int
+
+        :raises ValueError: If any argument is invalid.
+        """
+        limit = int(args.get("limit") or default_limit or 0) or None
+        if limit is not None and max_limit:
+            limit = max(1, min(limit, max_limit))
+
+        order = args.get("order", "asc")
+        if order not in ("asc", "desc"):
+            raise ValueError("Order must be 'asc' or 'desc'")
+
+        return cls(sort=args.get("sort") or "title",
+                   descending=order == "desc",
+                   year_min=int(args["year_min"]) if args.get("year_min") else None,
+                   year_max=int(args["year_max"]) if args.get("year_max") else None,
+                   min_rating=float(args["min_rating"]) if args.get("min_rating") else None,
+                   director=args.get("director") or None,
+                   after=args.get("after") or None,
+                   limit=limit)
+
+    def key(self) -> tuple:
+        """Return a hashable key identifying the query, e.g. for caching its result."""
+        return (self.sort, self.descending, self.year_min, self.year_max, self.min_rating,
+                self.director.lower() if self.director else None, self.after, self.limit)
+
+    def to_args(self, after=None) -> dict:
+        """Return the request arguments of the query, for the page following `after` if given."""
+        args = {"sort": self.sort, "order": "desc" if self.descending else "asc",
+                "year_min": self.year_min, "year_max": self.year_max,
+                "min_rating": self.min_rating, "director": self.director,
+                "after": after or self.after}
+        return {name: value for name, value in args.items() if value is not None}
+
+    def is_filtered(self) -> bool:
+        """Return whether any filter is set or the query continues after a cursor."""
+        return any(value is not None for value in (self.year_min, self.year_max, self.min_rating,
+                                                   self.director, self.after))
+
+    def next_cursor(self, movies):
+        """Return the cursor of the page following a full page of movies, or None."""
+        return next_cursor(movies, self.limit, self.sort)
+
+    def matches(self, movie) -> bool:
+        """Return whether a movie dictionary passes all filters."""
+        year, rating = movie.get("year"), movie.get("rating")
+        return all((
+            self.year_min is None or (year is not None and year >= self.year_min),
+            self.year_max is None or (year is not None and year <= self.year_max),
+            self.min_rating is None or (rating is not None and rating >= self.min_rating),
+            self.director is None or (movie.get("director") or "").lower() == self.director.lower(),
+        ))
+
+    def apply(self, movies) -> dict:
+        """
+        Filter, sort and paginate movies held in memory.
+
+        :param movies: Movies keyed by movie ID.
+        :type movies: dict
+
+        :return: One page of matching movies in query order.
+        :rtype: dict
+        """
+        def sort_key(movie_id, movie):
+            value = movie.get(self.sort)
+            # Missing values sort first, like NULLs in SQLite
+            return (value is not None, value if value is not None else 0, movie_id)
+
+        # Has a cursor? -> Continue after the movie it points at
+        after_key = (sort_key(str(self.after_key[1]), {self.sort: self.after_key[0]})
+                     if self.after_key else None)
+
+        page = []
+        for movie_id, movie in movies.items():
+            if not self.matches(movie):
+                continue
+
+            key = sort_key(movie_id, movie)
+            if after_key is None or (key < after_key if self.descending else key > after_key):
+                page.append((key, movie_id, movie))
+
+        page.sort(key=lambda entry: entry[0], reverse=self.descending)
+        return {movie_id: movie for key, movie_id, movie in page[:self.limit]}
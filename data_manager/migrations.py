@@ -0,0 +1,299 @@
+import logging
+import sys
+from sqlalchemy import create_engine
+from .sql_data_models import db
+
+logger = logging.getLogger(__name__)
+
+# Hot queries of SQLiteDataManager together with the index each of them should use
+HOT_QUERIES = {
+    "ix_movie_imdb_id": ("SELECT movie_id FROM movie WHERE imdb_id = ?", ("tt0096895",)),
+    "ix_movie_title_publication_year": (
+        "SELECT movie_id FROM movie WHERE imdb_id IS NULL AND title = ? AND publication_year = ?",
+        ("Batman", 1989)),
+    "ix_user_movies_user_id_movie_id": (
+        "SELECT movie.movie_id FROM movie JOIN user_movies "
+        "ON user_movies.movie_id = movie.movie_id WHERE user_movies.user_id = ?", (1,)),
+    "ix_review_movie_id": ("SELECT review_id FROM review WHERE movie_id = ?", (1,)),
+    "ix_movie_title": (
+        "SELECT movie_id FROM movie WHERE (title, movie_id) > (?, ?) ORDER BY title, movie_id "
+        "LIMIT 25", ("Batman", 1)),
+    "ix_movie_publication_year": (
+        "SELECT movie_id FROM movie ORDER BY publication_year, movie_id LIMIT 25", ()),
+    "ix_movie_rating": ("SELECT movie_id FROM movie ORDER BY rating DESC, movie_id DESC LIMIT 25", ()),
+    "ix_movie_director": (
+        "SELECT movie_id FROM movie WHERE director = ? COLLATE NOCASE", ("Tim Burton",)),
+}
+
+
+def add_lookup_indexes(connection):
+    """
+    Add indexes on the columns used for lookups and make favorites unique per user.
+
+    Duplicate favorites (same user and movie) are removed first, keeping the oldest entry,
+    since the unique index could not be created otherwise.
+    """
+    connection.exec_driver_sql(
+        "DELETE FROM user_movies WHERE entry_id NOT IN "
+        "(SELECT MIN(entry_id) FROM user_movies GROUP BY user_id, movie_id)")
+    connection.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_user_movies_user_id_movie_id "
+        "ON user_movies (user_id, movie_id)")
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_review_movie_id ON review (movie_id)")
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_movie_title ON movie (title)")
+
+
+def add_movie_identity(connection):
+    """
+    Make title and publication year the unique identity of a movie.
+
+    Duplicate movies are merged into the one with the lowest ID first: their favorites and
+    reviews are moved over, favorites the user already has for the kept movie are dropped.
+    """
+    connection.exec_driver_sql(
+        "CREATE TEMPORARY TABLE movie_merge AS "
+        "SELECT movie.movie_id AS old_id, keeper.keep_id AS new_id FROM movie JOIN "
+        "(SELECT MIN(movie_id) AS keep_id, title, publication_year FROM movie "
+        "GROUP BY title, publication_year) AS keeper "
+        "ON keeper.title = movie.title AND keeper.publication_year IS movie.publication_year "
+        "WHERE movie.movie_id != keeper.keep_id")
+
+    # Favorites that would collide with an existing one are left behind and deleted afterwards
+    connection.exec_driver_sql(
+        "UPDATE OR IGNORE user_movies SET movie_id = (SELECT new_id FROM movie_merge "
+        "WHERE old_id = user_movies.movie_id) "
+        "WHERE movie_id IN (SELECT old_id FROM movie_merge)")
+    connection.exec_driver_sql(
+        "DELETE FROM user_movies WHERE movie_id IN (SELECT old_id FROM movie_merge)")
+    connection.exec_driver_sql(
+        "UPDATE review SET movie_id = (SELECT new_id FROM movie_merge "
+        "WHERE old_id = review.movie_id) "
+        "WHERE movie_id IN (SELECT old_id FROM movie_merge)")
+
+    connection.exec_driver_sql("DELETE FROM movie WHERE movie_id IN (SELECT old_id FROM movie_merge)")
+    connection.exec_driver_sql("DROP TABLE movie_merge")
+
+    connection.exec_driver_sql("DROP INDEX IF EXISTS ix_movie_title")
+    connection.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_movie_title_publication_year "
+        "ON movie (title, publication_year)")
+
+
+def add_listing_indexes(connection):
+    """
+    Add indexes serving movie listings sorted by title, year or rating and filtered by director.
+
+    SQLite appends the rowid (the movie ID) to every index, so each of them matches the order
+    of a keyset paginated listing.
+    """
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_movie_title ON movie (title)")
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_movie_publication_year ON movie (publication_year)")
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_movie_rating ON movie (rating)")
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_movie_director ON movie (director COLLATE NOCASE)")
+
+
+def add_search_index(connection):
+    """
+    Add FTS5 full-text indexes over movie titles and directors and over review texts.
+
+    The indexes are external content tables: they store only the index, read the text from
+    `movie` and `review`, and are kept in sync by triggers on both tables. An SQLite library
+    built without FTS5 gets no indexes, and search falls back to LIKE queries.
+    """
+    compile_options = {row[0] for row in connection.exec_driver_sql("PRAGMA compile_options")}
+    if "ENABLE_FTS5" not in compile_options:
+        logger.warning("SQLite was built without FTS5, full-text search falls back to LIKE queries")
+        return
+
+    for table, key, columns in (("movie", "movie_id", ("title", "director")),
+                                ("review", "review_id", ("review_text",))):
+        column_list = ", ".join(columns)
+        new_values = ", ".join(f"new.{column}" for column in columns)
+        old_values = ", ".join(f"old.{column}" for column in columns)
+
+        connection.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5("
+            f"{column_list}, content='{table}', content_rowid='{key}')")
+
+        # External content -> Deleting from the index takes the old values of the row
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {table}_fts (rowid, {column_list}) VALUES (new.{key}, {new_values}); END")
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {table}_fts ({table}_fts, rowid, {column_list}) "
+            f"VALUES ('delete', old.{key}, {old_values}); END")
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {table}_fts ({table}_fts, rowid, {column_list}) "
+            f"VALUES ('delete', old.{key}, {old_values}); "
+            f"INSERT INTO {table}_fts (rowid, {column_list}) VALUES (new.{key}, {new_values}); END")
+
+        # Index the rows that already exist
+        connection.exec_driver_sql(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+
+def add_imdb_id(connection):
+    """
+    Add the IMDb ID of movies as their unique identity.
+
+    Title and year stay unique only among movies without an IMDb ID, so different films
+    sharing both can be stored once their IDs are known. Existing movies get their IDs from
+    `python -m data_manager.backfill`.
+    """
+    columns = {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(movie)")}
+    if "imdb_id" not in columns:
+        connection.exec_driver_sql("ALTER TABLE movie ADD COLUMN imdb_id VARCHAR(16)")
+
+    connection.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_movie_imdb_id ON movie (imdb_id)")
+    connection.exec_driver_sql("DROP INDEX IF EXISTS ix_movie_title_publication_year")
+    connection.exec_driver_sql(
+        "CREATE UNIQUE INDEX ix_movie_title_publication_year "
+        "ON movie (title, publication_year) WHERE imdb_id IS NULL")
+
+
+# Current time as a POSIX timestamp, in SQL
+SQL_NOW = "(julianday('now') - 2440587.5) * 86400.0"
+
+# Table -> {event: version keys bumped by a changed row, as SQL expressions}
+DATA_VERSION_TRIGGERS = {
+    "user": {
+        "INSERT": ("'users'",),
+        "UPDATE": ("'users'", "'user:' || new.user_id"),
+        "DELETE": ("'users'", "'user:' || old.user_id", "'reviews'"),
+    },
+    "user_movies": {
+        "INSERT": ("'user:' || new.user_id",),
+        "UPDATE": ("'user:' || old.user_id", "'user:' || new.user_id"),
+        "DELETE": ("'user:' || old.user_id",),
+    },
+    "movie": {
+        "INSERT": (),
+        "UPDATE": ("'movies'", "'movie:' || new.movie_id"),
+        "DELETE": ("'movies'", "'movie:' || old.movie_id"),
+    },
+    "review": {
+        "INSERT": ("'user:' || new.user_id", "'reviews:' || new.movie_id"),
+        "UPDATE": ("'user:' || old.user_id", "'reviews:' || old.movie_id", "'reviews:' || new.movie_id"),
+        "DELETE": ("'user:' || old.user_id", "'reviews:' || old.movie_id"),
+    },
+}
+
+
+def add_data_versions(connection):
+    """
+    Add version counters of the data, bumped by triggers in the transaction of every write.
+
+    Every key ("global", "users", "user:<user_id>", "movies", "movie:<movie_id>",
+    "reviews:<movie_id>", ...) has a row with its version, the time it was last bumped and a
+    sequence number, which is the highest of all rows after every bump. Since every write
+    bumps its keys, whichever process or tool it came from (e.g. the backfill CLI), workers
+    share consistent versions and can find the keys changed since they last looked. The row
+    "epoch" is created with a random version, so versions of a database created anew don't
+    match versions handed out for the old one.
+    """
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS data_version ("
+        "key TEXT PRIMARY KEY, "
+        "version INTEGER NOT NULL, "
+        "modified_at REAL NOT NULL, "
+        "seq INTEGER NOT NULL)")
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_data_version_seq ON data_version (seq)")
+    connection.exec_driver_sql(
+        f"INSERT OR IGNORE INTO data_version VALUES ('epoch', abs(random() % 1000000000000), {SQL_NOW}, 0)")
+
+    for table, events in DATA_VERSION_TRIGGERS.items():
+        for event, keys in events.items():
+            bumps = "".join(
+                f"INSERT INTO data_version VALUES ({key}, 1, {SQL_NOW}, "
+                f"(SELECT MAX(seq) + 1 FROM data_version)) "
+                f"ON CONFLICT (key) DO UPDATE SET version = version + 1, "
+                f"modified_at = excluded.modified_at, seq = excluded.seq; "
+                for key in ("'global'",) + keys)
+            connection.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_data_version_{event.lower()} "
+                f"AFTER {event} ON {table} BEGIN {bumps}END")
+
+
+# Ordered list of (schema version, migration step)
+MIGRATIONS = [
+    (1, add_lookup_indexes),
+    (2, add_movie_identity),
+    (3, add_listing_indexes),
+    (4, add_search_index),
+    (5, add_imdb_id),
+    (6, add_data_versions),
+]
+
+
+def migrate(engine) -> int:
+    """
+    Create missing tables and apply all pending migrations in one transaction.
+
+    - Note: The schema version is stored in SQLite's `PRAGMA user_version`. Every migration step
+      brings the database from the previous version to its own version and is applied exactly
+      once, in order.
+
+    :param engine: Engine connected to the SQLite database.
+    :type engine: sqlalchemy.engine.Engine
+
+    :return: The schema version of the database after migrating.
+    :rtype: int
+    """
+    with engine.begin() as connection:
+        db.Model.metadata.create_all(connection)
+        version = connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+        for target_version, migration in MIGRATIONS:
+            if version < target_version:
+                migration(connection)
+                connection.exec_driver_sql(f"PRAGMA user_version = {target_version}")
+                version = target_version
+
+    return version
+
+
+def explain_query_plan(connection, sql, params=()) -> list:
+    """
+    Return the details of SQLite's query plan for a statement.
+
+    :param connection: Connection to the SQLite database.
+    :type connection: sqlalchemy.engine.Connection
+
+    :param sql: The statement to explain, with "?" placeholders.
+    :type sql: str
+
+    :param params: Parameters of the statement.
+    :type params: tuple
+
+    :return: One string per step of the plan, e.g. "SEARCH review USING INDEX ix_review_movie_id (movie_id=?)".
+    :rtype: list
+    """
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def check_indexes(engine) -> dict:
+    """
+    Check which hot queries are served by their intended index.
+
+    :return: A dictionary with the index name as key and a boolean as value.
+    :rtype: dict
+    """
+    with engine.connect() as connection:
+        return {index_name: any(index_name in step
+                                for step in explain_query_plan(connection, sql, params))
+                for index_name, (sql, params) in HOT_QUERIES.items()}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python -m data_manager.migrations <path to sqlite file>")
+
+    sqlite_engine = create_engine(f"sqlite:///{sys.argv[1]}")
+    print(f"Schema version: {migrate(sqlite_engine)}")
+    for index, is_used in check_indexes(sqlite_engine).items():
+        print(f"{index}: {'used' if is_used else 'NOT USED'}")
@@ -0,0 +1,146 @@
+import math
+import re
+from markupsafe import Markup, escape
+from .listing import decode_cursor
+
+# Markers around matched terms in highlighted text, turned into <mark> tags by `highlight_html`
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text) -> list:
+    """Split text into lowercase search terms."""
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def to_match_query(text) -> str:
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every term is quoted, so user input can't produce an FTS5 syntax error. All terms must match
+    and the last one also matches as a prefix, e.g. "dark kni" -> '"dark" "kni"*'.
+
+    :return: The MATCH expression, or an empty string if the text has no terms.
+    :rtype: str
+    """
+    terms = tokenize(text)
+    if not terms:
+        return ""
+    return " ".join(f'"{term}"' for term in terms) + "*"
+
+
+def highlight(text, terms) -> str:
+    """
+    Wrap the words of a text matching any of the search terms in highlight markers.
+
+    The last term also matches as a prefix, like in `to_match_query`.
+    """
+    if not text or not terms:
+        return text
+
+    def is_match(word):
+        word = word.lower()
+        return word in terms[:-1] or word.startswith(terms[-1])
+
+    return TOKEN_PATTERN.sub(
+        lambda match: (f"{HIGHLIGHT_START}{match.group()}{HIGHLIGHT_END}"
+                       if is_match(match.group()) else match.group()), text)
+
+
+def highlight_html(text) -> Markup:
+    """Escape highlighted text for HTML and turn its highlight markers into <mark> tags."""
+    return (Markup(escape(text or ""))
+            .replace(HIGHLIGHT_START, Markup("<mark>"))
+            .replace(HIGHLIGHT_END, Markup("</mark>")))
+
+
+def page_of_matches(matches, after=None, limit=None) -> list:
+    """
+    Return one page of ranked matches, continuing after a cursor.
+
+    :param matches: (score, doc ID) tuples, best match first.
+    :type matches: list
+
+    :param after: The cursor of the previous page, pointing at its last match.
+    :type after: str
+
+    :param limit: The maximum number of matches to return. Defaults to all.
+    :type limit: int
+
+    :rtype: list
+    """
+    if after:
+        after_score, after_id = decode_cursor(after)
+        matches = [match for match in matches if match > (after_score, str(after_id))]
+    return matches[:limit]
+
+
+class InvertedIndex:
+    """
+    In-memory full-text index ranking documents with BM25.
+
+    Used by the JSON backends in place of SQLite's FTS5. Scores are negated like FTS5's
+    `bm25()`, so a lower score is a better match and results sort ascending.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        """
+        Initializes an empty index.
+
+        :param k1: BM25 term frequency saturation.
+        :type k1: float
+
+        :param b: BM25 document length normalization.
+        :type b: float
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings = {}
+        self._lengths = {}
+
+    def add(self, doc_id, text):
+        """Index the terms of a document."""
+        terms = tokenize(text)
+        self._lengths[doc_id] = len(terms)
+        for term in terms:
+            postings = self._postings.setdefault(term, {})
+            postings[doc_id] = postings.get(doc_id, 0) + 1
+
+    def search(self, text) -> list:
+        """
+        Return the documents containing all terms of a text, the last one also as a prefix.
+
+        :return: A list of (score, doc ID) tuples, best match first.
+        :rtype: list
+        """
+        terms = tokenize(text)
+        if not terms or not self._lengths:
+            return []
+
+        # Every term -> The postings of all index terms it matches
+        term_postings = [[self._postings.get(term, {})] for term in terms[:-1]]
+        term_postings.append([postings for term, postings in self._postings.items()
+                              if term.startswith(terms[-1])])
+
+        matching_docs = None
+        for postings_list in term_postings:
+            docs = set().union(*postings_list)
+            matching_docs = docs if matching_docs is None else matching_docs & docs
+
+        doc_count = len(self._lengths)
+        average_length = sum(self._lengths.values()) / doc_count or 1
+        results = []
+        for doc_id in matching_docs or ():
+            score = 0
+            length_norm = 1 - self.b + self.b * self._lengths[doc_id] / average_length
+            for postings_list in term_postings:
+                for postings in postings_list:
+                    frequency = postings.get(doc_id)
+                    if frequency:
+                        idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                        score += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+            results.append((-score, doc_id))
+
+        return sorted(results)
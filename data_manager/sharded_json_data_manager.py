@@ -0,0 +1,302 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from uuid import uuid4
+from .data_manager_interface import DataManagerInterface
+from .json_data_manager import FileLock, JSONDataManager, file_signature
+from .listing import page_by_key
+
+
+class ShardedJSONDataManager(DataManagerInterface):
+    """
+    Data manager for JSON data split into shards of users.
+
+    Users are spread over `buckets` shard files by a hash of their ID, each shard being handled
+    by its own `JSONDataManager`. A small manifest maps every user ID to the user's name, so
+    `get_all_users` doesn't need to open any shard. Writers lock only the shard they change,
+    so concurrent writes to users in different shards don't contend, also across processes.
+
+    Layout of the data directory:
+
+        manifest.json           {user_id: {"name": ...}}
+        shards/<bucket>.json    {user_id: {"name": ..., "movies": {...}}}
+    """
+
+    def __init__(self, directory: str, buckets=64):
+        """
+        Initializes the data directory and creates an empty manifest if there is none.
+
+        :param directory: The directory containing manifest and shards.
+        :type directory: str
+
+        :param buckets: The number of shard files. Must not change once data was written.
+        :type buckets: int
+        """
+        self.directory = directory
+        self.buckets = buckets
+        self.manifest_filename = os.path.join(directory, "manifest.json")
+        self._manifest = None
+        self._manifest_signature = None
+        self._manifest_lock = FileLock(os.path.join(directory, "manifest.lock"))
+        self._shards = {}
+        self._shards_lock = threading.Lock()
+
+        os.makedirs(os.path.join(directory, "shards"), exist_ok=True)
+        with self._manifest_lock:
+            if not os.path.exists(self.manifest_filename):
+                JSONDataManager.write_json(self.manifest_filename, {})
+
+    def bucket_for(self, user_id) -> str:
+        """Return the name of the shard bucket a user belongs to."""
+        digest = hashlib.sha1(str(user_id).encode()).hexdigest()
+        return f"{int(digest[:8], 16) % self.buckets:04d}"
+
+    def _shard(self, user_id, create=False) -> tuple:
+        """
+        Return the data manager and the lock of the shard a user belongs to.
+
+        :param create: Whether to create the shard file if it doesn't exist yet. Only adding
+                       users passes True, so touching unknown users leaves no empty shards behind.
+        :type create: bool
+
+        :return: A tuple of the shard's JSONDataManager and FileLock.
+        :rtype: tuple
+        """
+        bucket = self.bucket_for(user_id)
+
+        with self._shards_lock:
+            if bucket not in self._shards:
+                filename = os.path.join(self.directory, "shards", f"{bucket}.json")
+                self._shards[bucket] = (JSONDataManager(filename), FileLock(f"{filename}.lock"))
+            shard, lock = self._shards[bucket]
+
+        # Is shard not on disk yet and about to be written? -> Create it empty
+        if create and not os.path.exists(shard.filename):
+            with lock:
+                if not os.path.exists(shard.filename):
+                    JSONDataManager.write_json(shard.filename, {})
+
+        return shard, lock
+
+    def _populated_shards(self) -> list:
+        """Return the data managers of all shards holding at least one user."""
+        user_ids_by_bucket = {}
+        for user_id in self.get_all_users():
+            user_ids_by_bucket.setdefault(self.bucket_for(user_id), user_id)
+        return [self._shard(user_id)[0] for user_id in user_ids_by_bucket.values()]
+
+    def _load_manifest(self) -> dict:
+        """Return the manifest, parsing it again only if the file changed."""
+        current_signature = file_signature(self.manifest_filename)
+        if current_signature != self._manifest_signature:
+            with open(self.manifest_filename, "r") as f:
+                self._manifest = json.load(f)
+            self._manifest_signature = current_signature
+        return self._manifest
+
+    def _save_manifest(self, manifest):
+        """Write the manifest atomically. Must be called while holding the manifest lock."""
+        JSONDataManager.write_json(self.manifest_filename, manifest)
+        self._manifest = manifest
+        self._manifest_signature = file_signature(self.manifest_filename)
+
+    def get_all_users(self, after_id=None, limit=None) -> dict:
+        """
+        Return the ID and name of users, read from the manifest only.
+
+        :param after_id: Only return users with an ID sorting after this one.
+        :type after_id: str
+
+        :param limit: The maximum number of users to return. Defaults to all.
+        :type limit: int
+
+        :return: A dictionary where each key is a user ID and each value is a dictionary with the
+                 user's name under the key 'name'.
+        :rtype: dict
+        """
+        try:
+            manifest = self._load_manifest()
+        except OSError:
+            return {}
+
+        if after_id is not None or limit is not None:
+            return page_by_key(manifest, after_id, limit)
+        return manifest
+
+    def iter_movie_titles(self, batch_size=1000):
+        """Iterate over the titles of the movies of all users, shard by shard."""
+        for shard in self._populated_shards():
+            yield from shard.iter_movie_titles(batch_size)
+
+    def add_user(self, new_username) -> bool:
+        """
+        Adds a new user to its shard and to the manifest.
+
+        :param new_username: The name of the new user.
+        :type new_username: str
+
+        :return: True once the user was added.
+        :rtype: bool
+        """
+        new_user_id = str(uuid4())
+        shard, shard_lock = self._shard(new_user_id, create=True)
+
+        with self._manifest_lock:
+            with shard_lock:
+                shard.add_user(new_username, user_id=new_user_id)
+
+            manifest = dict(self._load_manifest())
+            manifest[new_user_id] = {"name": new_username}
+            self._save_manifest(manifest)
+        return True
+
+    def delete_user(self, user_id) -> bool:
+        """
+        Delete a user from their shard and from the manifest.
+
+        :param user_id: The unique identifier of the user to be deleted.
+        :type user_id: str
+
+        :return: True if the user was successfully deleted, False if the user does not exist.
+        :rtype: bool
+        """
+        shard, shard_lock = self._shard(user_id)
+
+        with self._manifest_lock:
+            with shard_lock:
+                # Is shard not on disk? -> There is no user to delete from it
+                is_user_deleted = os.path.exists(shard.filename) and shard.delete_user(user_id)
+
+            manifest = dict(self._load_manifest())
+            if manifest.pop(user_id, None) is not None:
+                self._save_manifest(manifest)
+                is_user_deleted = True
+        return is_user_deleted
+
+    def get_username_and_movies(self, user_id, movie_query=None):
+        """Get the name and movies of a user from the user's shard."""
+        shard, shard_lock = self._shard(user_id)
+
+        # Is shard not on disk? -> None of its users was ever added
+        if not os.path.exists(shard.filename):
+            return None
+        return shard.get_username_and_movies(user_id, movie_query)
+
+    def add_movie(self, user_id, fetched_movie_data) -> bool:
+        """Add a new movie to the user's collection, locking only the user's shard."""
+        shard, shard_lock = self._shard(user_id)
+        with shard_lock:
+            # Is shard not on disk? -> The user doesn't exist
+            return os.path.exists(shard.filename) and shard.add_movie(user_id, fetched_movie_data)
+
+    def update_user_movies(self, user_id, movie_id, update_data) -> bool:
+        """Update the specified movie data for a given user, locking only the user's shard."""
+        shard, shard_lock = self._shard(user_id)
+        with shard_lock:
+            # Is shard not on disk? -> The user doesn't exist
+            return os.path.exists(shard.filename) and shard.update_user_movies(user_id, movie_id, update_data)
+
+    def delete_user_movie(self, user_id, movie_id) -> bool:
+        """Delete the specified movie of a user, locking only the user's shard."""
+        shard, shard_lock = self._shard(user_id)
+        with shard_lock:
+            # Is shard not on disk? -> The user doesn't exist
+            return os.path.exists(shard.filename) and shard.delete_user_movie(user_id, movie_id)
+
+    def add_review(self, user_id, movie_id, review_text) -> bool:
+        """Add a new review of a user for one of their movies, locking only the user's shard."""
+        shard, shard_lock = self._shard(user_id)
+        with shard_lock:
+            # Is shard not on disk? -> The user doesn't exist
+            return os.path.exists(shard.filename) and shard.add_review(user_id, movie_id, review_text)
+
+    def get_all_reviews(self, movie_id, after_id=None, limit=None) -> dict:
+        """
+        Get the reviews of a given movie.
+
+        - Note: Movie IDs don't tell which user they belong to, so the shards of all users are
+          searched. Shards stay parsed in memory, so this doesn't re-read unchanged files.
+        """
+        for user_id in self.get_all_users():
+            shard, shard_lock = self._shard(user_id)
+            user = (shard.get_all_users() or {}).get(user_id) or {}
+            if movie_id in user.get("movies", {}):
+                return shard.get_all_reviews(movie_id, after_id, limit)
+        return {}
+
+    def _search_shards(self, method_name, search_text, after, limit) -> dict:
+        """
+        Run a search in every shard holding users and merge the pages by rank.
+
+        Every shard returns its own page after the cursor, so the best `limit` matches of all
+        pages together form the merged page.
+        """
+        matches = []
+        for shard in self._populated_shards():
+            matches.extend(getattr(shard, method_name)(search_text, after, limit).items())
+
+        matches.sort(key=lambda match: (match[1]["score"], match[0]))
+        return dict(matches[:limit])
+
+    def search_movies(self, search_text, after=None, limit=None) -> dict:
+        """Search titles and directors of the movies of all shards, best match first."""
+        return self._search_shards("search_movies", search_text, after, limit)
+
+    def search_reviews(self, search_text, after=None, limit=None) -> dict:
+        """Search the texts of the reviews of all shards, best match first."""
+        return self._search_shards("search_reviews", search_text, after, limit)
+
+
+def migrate_single_file(json_filename, directory, buckets=64) -> int:
+    """
+    Copy all users of a single-file JSON database into a sharded layout.
+
+    Users already in the sharded layout are overwritten. The single file is left untouched.
+
+    :param json_filename: The path to the single JSON file, e.g. "user_data/movie_data.json".
+    :type json_filename: str
+
+    :param directory: The directory of the sharded layout.
+    :type directory: str
+
+    :param buckets: The number of shard files.
+    :type buckets: int
+
+    :return: The number of migrated users.
+    :rtype: int
+    """
+    with open(json_filename, "r") as f:
+        all_users = json.load(f)
+
+    sharded = ShardedJSONDataManager(directory, buckets)
+
+    # Group users per shard, so every shard file is written once
+    users_by_bucket = {}
+    for user_id, user in all_users.items():
+        users_by_bucket.setdefault(sharded.bucket_for(user_id), {})[user_id] = user
+
+    with sharded._manifest_lock:
+        for users in users_by_bucket.values():
+            shard, shard_lock = sharded._shard(next(iter(users)), create=True)
+            with shard_lock:
+                shard_users = dict(shard.get_all_users() or {})
+                shard_users.update(users)
+                JSONDataManager.write_json(shard.filename, shard_users)
+
+        manifest = dict(sharded.get_all_users())
+        manifest.update({user_id: {"name": user.get("name")} for user_id, user in all_users.items()})
+        sharded._save_manifest(manifest)
+
+    return len(all_users)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        sys.exit("Usage: python -m data_manager.sharded_json_data_manager "
+                 "<json file> <target directory> [buckets]")
+
+    migrated = migrate_single_file(sys.argv[1], sys.argv[2],
+                                   int(sys.argv[3]) if len(sys.argv) == 4 else 64)
+    print(f"Migrated {migrated} users to {sys.argv[2]}")
@@ -1,33 +1,70 @@
 from .data_manager_interface import DataManagerInterface
+from sqlalchemy import and_, or_, text, tuple_, update
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from .listing import decode_cursor
+from .migrations import migrate
+from .search import HIGHLIGHT_END, HIGHLIGHT_START, highlight, to_match_query, tokenize
 from .sql_data_models import db, User, Movie, UserMovies, Review
+from .sqlite_profile import DEFAULT_PRAGMAS, apply_profile, engine_options
+
+# Page sizes for paginated reads
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
 
 
 class SQLiteDataManager(DataManagerInterface):
     """Data manager for handling SQLite data bases"""
 
-    def __init__(self, app, db_uri):
+    def __init__(self, app, db_uri, pragmas=None, pool_size=5, profiler=None):
         """
         Initializes the application with necessary configurations and binds the SQLAlchemy
-        service to the provided Flask app.
+        service to the provided Flask app. Pending schema migrations are applied to the database.
+        Without the FTS5 tables of migration 4 (SQLite built without FTS5), search falls back to
+        LIKE queries.
 
         :param app: The Flask application instance to configure.
         :type app: Flask
         :param db_uri: Database URI for the SQLAlchemy database connection.
         :type db_uri: str
+        :param pragmas: PRAGMA settings applied to every connection. Defaults to DEFAULT_PRAGMAS.
+        :type pragmas: dict
+        :param pool_size: Number of pooled connections shared by the request threads.
+        :type pool_size: int
+        :param profiler: Optional profiler accounting for every statement sent to the database.
+        :type profiler: SQLProfiler
         """
         app.config["SQLALCHEMY_DATABASE_URI"] = db_uri
         app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(pool_size)
         db.init_app(app)
 
-    def get_all_users(self) -> dict:
+        with app.app_context():
+            self.engine = db.engine
+            apply_profile(self.engine, DEFAULT_PRAGMAS if pragmas is None else pragmas)
+            if profiler:
+                profiler.attach(self.engine)
+            migrate(self.engine)
+            with self.engine.connect() as connection:
+                self.has_full_text_search = connection.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'movie_fts'").first() is not None
+
+    def get_all_users(self, after_id=None, limit=None) -> dict:
         """
-        Retrieves all users from the database and returns them in a dictionary.
+        Retrieves users from the database, ordered by ID, and returns them in a dictionary.
 
         Each key in the dictionary is a user ID, and the corresponding value is another dictionary
         with information about the user, such as their name. This structure allows for
         easy access to each user's details in templates and other parts of the application like
-        the jinja2 templates.
+        the jinja2 templates. Users are paginated with a keyset cursor: pass the last user ID of
+        a page as `after_id` to get the next page.
+
+        :param after_id: Only return users with a higher ID than this one. Defaults to None,
+                         which returns the first page.
+        :type after_id: int
+
+        :param limit: The maximum number of users to return. Defaults to all.
+        :type limit: int
 
         :return: A dictionary where each key is a user ID and each value is a dictionary with the
                  user's details. Currently, the user's details include only their name under the
@@ -35,8 +72,11 @@ class SQLiteDataManager(DataManagerInterface):
         :rtype: dict
         """
         try:
-            # Get ID and name of all users
-            all_users = User.query.with_entities(User.user_id, User.user).all()
+            # Get ID and name of one page of users
+            query = User.query.with_entities(User.user_id, User.user)
+            if after_id is not None:
+                query = query.filter(User.user_id > int(after_id))
+            all_users = query.order_by(User.user_id).limit(limit).all()
 
             # Create a dictionary where user ID is the key and username is the value
             users_dict = {user_id: {"name": user_name} for user_id, user_name in all_users}
@@ -47,6 +87,33 @@ class SQLiteDataManager(DataManagerInterface):
             print(f"Error retrieving users: {e}")
             return {}
 
+    def iter_users(self, batch_size=1000):
+        """
+        Iterates over all users ordered by ID without loading them all at once.
+
+        Rows are fetched from the cursor `batch_size` at a time, so memory use doesn't grow with
+        the number of users.
+
+        :param batch_size: The number of rows fetched per batch.
+        :type batch_size: int
+
+        :return: A generator of (user ID, {"name": user name}) pairs.
+        :rtype: generator
+        """
+        query = User.query.with_entities(User.user_id, User.user).order_by(User.user_id)
+        for user_id, user_name in query.yield_per(batch_size):
+            yield user_id, {"name": user_name}
+
+    def iter_movie_titles(self, batch_size=1000):
+        """
+        Iterates over the distinct titles of all movies, fetched in batches of `batch_size`.
+
+        :return: A generator of movie titles.
+        :rtype: generator
+        """
+        for title, in db.session.query(Movie.title).distinct().yield_per(batch_size):
+            yield title
+
     def add_user(self, new_username):
         """
         Adds a new user to the database using the provided username.
@@ -82,8 +149,8 @@ class SQLiteDataManager(DataManagerInterface):
 
     def delete_user(self, user_id) -> bool:
         """
-        Deletes a user and all their associated movies from the database based on the provided
-        user ID.
+        Deletes a user and all their associated movies and reviews from the database based on
+        the provided user ID.
 
         :param user_id: The ID of the user to be deleted.
         :type user_id: int
@@ -94,19 +161,72 @@ class SQLiteDataManager(DataManagerInterface):
 
         if user_to_delete:
             UserMovies.query.filter_by(user_id=user_id).delete()
+            Review.query.filter_by(user_id=user_id).delete()
             db.session.delete(user_to_delete)
             db.session.commit()
             return True
 
         return False
 
-    def get_username_and_movies(self, user_id) -> tuple:
+    @staticmethod
+    def _apply_movie_query(query, movie_query):
+        """
+        Add the filters, keyset condition, order and limit of a movie query to a query of movies.
+
+        - Note: SQLite sorts NULLs first, which the keyset condition accounts for. Every sort
+          field has an index ordered by the field and the movie ID (the rowid), so a page can be
+          read in index order.
+
+        :param query: Query selecting Movie rows.
+        :type query: sqlalchemy.orm.Query
+
+        :param movie_query: Sort order, filters and page to apply.
+        :type movie_query: MovieQuery
+        """
+        column = {"title": Movie.title,
+                  "year": Movie.publication_year,
+                  "rating": Movie.rating}[movie_query.sort]
+
+        if movie_query.year_min is not None:
+            query = query.filter(Movie.publication_year >= movie_query.year_min)
+        if movie_query.year_max is not None:
+            query = query.filter(Movie.publication_year <= movie_query.year_max)
+        if movie_query.min_rating is not None:
+            query = query.filter(Movie.rating >= movie_query.min_rating)
+        if movie_query.director:
+            query = query.filter(Movie.director.collate("NOCASE") == movie_query.director)
+
+        # Has a cursor? -> Continue after the movie it points at
+        if movie_query.after_key:
+            value, after_movie_id = movie_query.after_key[0], int(movie_query.after_key[1])
+            if movie_query.descending and value is None:
+                query = query.filter(and_(column.is_(None), Movie.movie_id < after_movie_id))
+            elif movie_query.descending:
+                query = query.filter(or_(tuple_(column, Movie.movie_id) < tuple_(value, after_movie_id),
+                                         column.is_(None)))
+            elif value is None:
+                query = query.filter(or_(and_(column.is_(None), Movie.movie_id > after_movie_id),
+                                         column.isnot(None)))
+            else:
+                query = query.filter(tuple_(column, Movie.movie_id) > tuple_(value, after_movie_id))
+
+        if movie_query.descending:
+            query = query.order_by(column.desc(), Movie.movie_id.desc())
+        else:
+            query = query.order_by(column, Movie.movie_id)
+        return query.limit(movie_query.limit)
+
+    def get_username_and_movies(self, user_id, movie_query=None) -> tuple:
         """
         Retrieves the specified user's username and their associated movies as a dictionary.
 
         :param user_id: The ID of the user whose username and movies are to be retrieved.
         :type user_id: int
 
+        :param movie_query: Sort order, filters and page of the movies. Defaults to None, which
+                            returns all movies.
+        :type movie_query: MovieQuery
+
         :return: A tuple containing the user's username and a dictionary of their movies,
         where the dictionary key is the movie ID and its value is another dictionary containing
         the movie's title, director, year of publication, and rating.
@@ -115,9 +235,12 @@ class SQLiteDataManager(DataManagerInterface):
         username = user.user
 
         # Get user movies by joining Movie table with user ID and movie ID from UserMovies table
-        user_movies = db.session.query(Movie).join(
+        query = db.session.query(Movie).join(
             UserMovies, UserMovies.movie_id == Movie.movie_id).filter(
-            UserMovies.user_id == user_id).all()
+            UserMovies.user_id == user_id)
+        if movie_query:
+            query = self._apply_movie_query(query, movie_query)
+        user_movies = query.all()
 
         # Return username & empty dict if user has no movies
         if not user_movies:
@@ -137,10 +260,94 @@ class SQLiteDataManager(DataManagerInterface):
 
         return username, movies_dict
 
+    @staticmethod
+    def _find_or_insert_movie(fetched_movie_data) -> int:
+        """
+        Return the ID of a movie, inserting it if it is not known yet.
+
+        Movies with an IMDb ID are found by an indexed point lookup on it. A movie stored before
+        its ID was known (same title and year, no ID) is claimed by setting its ID instead of
+        being inserted again. Movies without an ID are identified by title and year. Inserts use
+        SQLite's `INSERT ... ON CONFLICT DO NOTHING`, so concurrent workers adding the same new
+        movie end up sharing one row instead of racing into duplicates.
+
+        :param fetched_movie_data: Dictionary containing movie data.
+        :type fetched_movie_data: dict
+
+        :return: The movie ID.
+        :rtype: int
+
+        :raises ValueError: If year or rating of the movie are not numeric (e.g. "N/A").
+        """
+        fetched_movie_title = fetched_movie_data["Title"]
+        fetched_movie_year = int(fetched_movie_data["Year"])
+        fetched_movie_rating = float(fetched_movie_data["imdbRating"])
+        imdb_id = fetched_movie_data.get("imdbID") or None
+
+        # Has no IMDb ID? -> Title and year are the identity
+        if imdb_id is None:
+            db.session.execute(insert(Movie).values(
+                title=fetched_movie_title,
+                director=fetched_movie_data["Director"],
+                publication_year=fetched_movie_year,
+                rating=fetched_movie_rating
+            ).on_conflict_do_nothing(index_elements=["title", "publication_year"],
+                                     index_where=Movie.imdb_id.is_(None)))
+            return db.session.query(Movie.movie_id).filter(
+                Movie.imdb_id.is_(None), Movie.title == fetched_movie_title,
+                Movie.publication_year == fetched_movie_year).scalar()
+
+        movie_id = db.session.query(Movie.movie_id).filter_by(imdb_id=imdb_id).scalar()
+        if movie_id is not None:
+            return movie_id
+
+        # Is movie stored without its IMDb ID? -> Claim that row
+        claimed = db.session.execute(update(Movie).where(
+            Movie.imdb_id.is_(None), Movie.title == fetched_movie_title,
+            Movie.publication_year == fetched_movie_year
+        ).values(imdb_id=imdb_id))
+
+        if claimed.rowcount == 0:
+            db.session.execute(insert(Movie).values(
+                title=fetched_movie_title,
+                director=fetched_movie_data["Director"],
+                publication_year=fetched_movie_year,
+                rating=fetched_movie_rating,
+                imdb_id=imdb_id
+            ).on_conflict_do_nothing(index_elements=["imdb_id"]))
+
+        return db.session.query(Movie.movie_id).filter_by(imdb_id=imdb_id).scalar()
+
+    @classmethod
+    def _add_favorite(cls, user_id, fetched_movie_data) -> bool:
+        """
+        Upserts a movie and links it to a user's favorites without committing.
+
+        :param user_id: ID of the user.
+        :type user_id: int
+
+        :param fetched_movie_data: Dictionary containing movie data.
+        :type fetched_movie_data: dict
+
+        :return: True if the movie was added to the favorites, False if it already was in there.
+        :rtype: bool
+
+        :raises ValueError: If year or rating of the movie are not numeric (e.g. "N/A").
+        """
+        movie_id = cls._find_or_insert_movie(fetched_movie_data)
+
+        # Add movie to users list unless it is already in there
+        result = db.session.execute(insert(UserMovies).values(
+            user_id=user_id, movie_id=movie_id
+        ).on_conflict_do_nothing(index_elements=["user_id", "movie_id"]))
+        return result.rowcount == 1
+
     def add_movie(self, user_id, fetched_movie_data) -> bool:
         """
          Adds a movie to the database if it's not already in the user's list of favorites.
 
+         Movie and favorite are upserted in one atomic transaction.
+
          :param user_id: ID of the user.
          :type user_id: int
 
@@ -148,43 +355,57 @@ class SQLiteDataManager(DataManagerInterface):
          :type fetched_movie_data: dict
 
          :return: Boolean indicating if the addition was successful.
-         """
-        fetched_movie_title = fetched_movie_data["Title"]
-        fetched_movie_director = fetched_movie_data["Director"]
-        fetched_movie_year = int(fetched_movie_data["Year"])
-        fetched_movie_rating = float(fetched_movie_data["imdbRating"])
 
-        # Check if movie is already in users list
-        movie = Movie.query.filter_by(title=fetched_movie_title).first()
-        if movie:
-            is_in_favorite = UserMovies.query.filter_by(user_id=user_id,
-                                                        movie_id=movie.movie_id).first()
-            if is_in_favorite:
-                return False
-
-            # Add movie to users list
-            new_favorite_movie = UserMovies(user_id=user_id, movie_id=movie.movie_id)
-            db.session.add(new_favorite_movie)
+         :raises ValueError: If year or rating of the movie are not numeric (e.g. "N/A"), so
+                             incomplete movie data isn't mistaken for a duplicate.
+         """
+        try:
+            is_movie_added = self._add_favorite(user_id, fetched_movie_data)
             db.session.commit()
-            return True
+            return is_movie_added
 
-        # If movie is not already in Movie table -> Add to Movie table & users list
-        if not movie:
-            new_movie = Movie(title=fetched_movie_title,
-                              director=fetched_movie_director,
-                              publication_year=fetched_movie_year,
-                              rating=fetched_movie_rating)
-            # Commit addition to generate movie ID
-            db.session.add(new_movie)
-            db.session.commit()
+        except ValueError:
+            db.session.rollback()
+            raise
+
+        except SQLAlchemyError as e:
+            print(f"Database error while adding movie: {e}")
+            db.session.rollback()
+            return False
+
+    def add_movies(self, user_id, fetched_movies) -> list:
+        """
+        Adds several movies to a user's list of favorites in a single transaction.
+
+        Every movie is upserted like in `add_movie`, but everything is committed once at the end.
+        Movies already in the user's favorites, or repeated within the batch, are skipped.
+
+        :param user_id: ID of the user.
+        :type user_id: int
+
+        :param fetched_movies: List of dictionaries containing movie data.
+        :type fetched_movies: list
+
+        :return: One boolean per movie indicating if it was added, or None if its data is
+                 incomplete. All False if the transaction failed.
+        :rtype: list
+        """
+        try:
+            results = []
+            for fetched_movie_data in fetched_movies:
+                try:
+                    results.append(self._add_favorite(user_id, fetched_movie_data))
+                except ValueError:
+                    # Year or rating not numeric (e.g. "N/A") -> Skip this movie only
+                    results.append(None)
 
-            # Add movie to users list
-            new_favorite_movie = UserMovies(user_id=user_id, movie_id=new_movie.movie_id)
-            db.session.add(new_favorite_movie)
             db.session.commit()
-            return True
+            return results
 
-        return False
+        except SQLAlchemyError as e:
+            print(f"Database error while adding movies: {e}")
+            db.session.rollback()
+            return [False] * len(fetched_movies)
 
     def update_user_movies(self, user_id, movie_id, update_data):
         """
@@ -272,36 +493,195 @@ class SQLiteDataManager(DataManagerInterface):
             db.session.rollback()
             return False
 
-    def get_all_reviews(self, movie_id):
+    def get_all_reviews(self, movie_id, after_id=None, limit=DEFAULT_PAGE_SIZE):
         """
-        Retrieves all reviews for a given movie from the database and formats them into a dictionary.
+        Retrieves one page of reviews for a given movie from the database and formats them into a
+        dictionary.
 
-        This function performs a database query to fetch all reviews associated with the
-        specified movie ID.
-        It joins the Review and User tables to include user details in the result. The function
-        then constructs a dictionary where each key is a review ID, and the value is another
-        dictionary containing details of the review, including movie ID, user ID, username,
-        and review text.
+        This function fetches exactly the needed columns of the Review and User tables with a
+        single query, so no user is lazy loaded per review. Reviews are ordered by their ID and
+        paginated with a keyset cursor: pass the last review ID of a page as `after_id` to get the
+        next page. The function then constructs a dictionary where each key is a review ID, and
+        the value is another dictionary containing details of the review, including movie ID,
+        user ID, username, and review text.
 
         :param movie_id: The ID of the movie for which reviews are being retrieved.
         :type movie_id: int
+
+        :param after_id: Only return reviews with a higher ID than this one. Defaults to None,
+                         which returns the first page.
+        :type after_id: int
+
+        :param limit: The maximum number of reviews to return, capped at MAX_PAGE_SIZE.
+        :type limit: int
+
         :return: A dictionary of review details keyed by review ID.
         :rtype: dict
         """
-        # Get all reviews of a given movie
-        user_reviews = db.session.query(Review).join(
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        # Get one page of reviews of a given movie together with the name of their author
+        query = db.session.query(Review.review_id, Review.movie_id, Review.user_id, User.user,
+                                 Review.review_text).join(
             User, User.user_id == Review.user_id).filter(
-            Review.movie_id == movie_id).all()
+            Review.movie_id == movie_id)
+        if after_id is not None:
+            query = query.filter(Review.review_id > after_id)
+        user_reviews = query.order_by(Review.review_id).limit(limit).all()
 
         # Create dict so jinja2 template can iterate over it
         user_reviews_dict = {
-            review.review_id: {
-                "movie_id": review.movie_id,
-                "user_id": review.user_id,
-                "user_name": review.user.user,
-                "review_text": review.review_text
+            review_id: {
+                "movie_id": review_movie_id,
+                "user_id": user_id,
+                "user_name": user_name,
+                "review_text": review_text
             }
-            for review in user_reviews
+            for review_id, review_movie_id, user_id, user_name, review_text in user_reviews
         }
 
         return user_reviews_dict
+
+    @staticmethod
+    def _search(sql, search_text, after, limit, like_columns=None) -> list:
+        """
+        Run one page of a full-text search ranked by bm25, best match first.
+
+        :param sql: The search statement. It is given the parameters :match, :start and :end
+                    and must select `score` and `rowid` of its FTS5 table last.
+        :type sql: str
+
+        :param like_columns: Columns searched with LIKE instead, when there are no FTS5 tables.
+                             The statement then must end in a WHERE clause the LIKE conditions
+                             are appended to, and select a constant `score`.
+        :type like_columns: tuple
+
+        :return: The rows of the page.
+        :rtype: list
+        """
+        match_query = to_match_query(search_text)
+        if not match_query:
+            return []
+
+        params = {"match": match_query, "start": HIGHLIGHT_START, "end": HIGHLIGHT_END,
+                  "limit": max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)),
+                  "after_score": None, "after_id": None}
+
+        # No FTS5? -> Every term has to be found in one of the columns
+        if like_columns:
+            conditions = []
+            for number, term in enumerate(tokenize(search_text)):
+                conditions.append("(" + " OR ".join(f"{column} LIKE :term_{number} ESCAPE '\\'"
+                                                    for column in like_columns) + ")")
+                # Terms are word characters -> "_" is the only LIKE wildcard to escape
+                params[f"term_{number}"] = "%" + term.replace("_", "\\_") + "%"
+            sql = f"{sql} {' AND '.join(conditions)}"
+
+        # Has a cursor? -> Continue after the match it points at
+        if after:
+            after_score, after_id = decode_cursor(after)
+            params["after_score"], params["after_id"] = float(after_score), int(after_id)
+
+        return db.session.execute(text(
+            f"SELECT * FROM ({sql}) WHERE :after_score IS NULL OR (score, rowid) > (:after_score, :after_id) "
+            f"ORDER BY score, rowid LIMIT :limit"), params).all()
+
+    def search_movies(self, search_text, after=None, limit=DEFAULT_PAGE_SIZE) -> dict:
+        """
+        Searches titles and directors of all movies, best match first.
+
+        Matched words are wrapped in HIGHLIGHT_START and HIGHLIGHT_END in the highlighted fields.
+        Results are paginated with a keyset cursor over rank and movie ID.
+
+        :param search_text: The words to search for. The last word also matches as a prefix.
+        :type search_text: str
+
+        :param after: The cursor of the previous page. Defaults to None, the first page.
+        :type after: str
+
+        :param limit: The maximum number of movies to return, capped at MAX_PAGE_SIZE.
+        :type limit: int
+
+        :return: A dictionary of matching movies keyed by movie ID.
+        :rtype: dict
+        """
+        if self.has_full_text_search:
+            rows = self._search(
+                "SELECT movie.title, movie.director, movie.publication_year, movie.rating, "
+                "highlight(movie_fts, 0, :start, :end) AS title_highlight, "
+                "highlight(movie_fts, 1, :start, :end) AS director_highlight, "
+                "bm25(movie_fts) AS score, movie_fts.rowid AS rowid "
+                "FROM movie_fts JOIN movie ON movie.movie_id = movie_fts.rowid "
+                "WHERE movie_fts MATCH :match", search_text, after, limit)
+        else:
+            rows = self._search(
+                "SELECT movie.title, movie.director, movie.publication_year, movie.rating, "
+                "NULL AS title_highlight, NULL AS director_highlight, "
+                "0.0 AS score, movie.movie_id AS rowid FROM movie WHERE",
+                search_text, after, limit, like_columns=("movie.title", "movie.director"))
+
+        movies = {
+            str(row.rowid): {
+                "title": row.title,
+                "director": row.director,
+                "year": row.publication_year,
+                "rating": row.rating,
+                "title_highlight": row.title_highlight,
+                "director_highlight": row.director_highlight,
+                "score": row.score
+            }
+            for row in rows
+        }
+
+        # Searched with LIKE? -> Highlight the matched words here instead of with FTS5
+        if not self.has_full_text_search:
+            terms = tokenize(search_text)
+            for movie in movies.values():
+                movie["title_highlight"] = highlight(movie["title"], terms)
+                movie["director_highlight"] = highlight(movie["director"], terms)
+
+        return movies
+
+    def search_reviews(self, search_text, after=None, limit=DEFAULT_PAGE_SIZE) -> dict:
+        """
+        Searches the texts of all reviews, best match first.
+
+        Works like `search_movies`. Every review comes with its movie and author and a snippet of
+        its text around the matched words.
+
+        :return: A dictionary of matching reviews keyed by review ID.
+        :rtype: dict
+        """
+        if self.has_full_text_search:
+            rows = self._search(
+                "SELECT review.movie_id, movie.title AS movie_title, review.user_id, "
+                "user.user AS user_name, review.review_text, "
+                "snippet(review_fts, 0, :start, :end, '...', 24) AS snippet, "
+                "bm25(review_fts) AS score, review_fts.rowid AS rowid "
+                "FROM review_fts JOIN review ON review.review_id = review_fts.rowid "
+                "JOIN movie ON movie.movie_id = review.movie_id "
+                "JOIN user ON user.user_id = review.user_id "
+                "WHERE review_fts MATCH :match", search_text, after, limit)
+        else:
+            rows = self._search(
+                "SELECT review.movie_id, movie.title AS movie_title, review.user_id, "
+                "user.user AS user_name, review.review_text, NULL AS snippet, "
+                "0.0 AS score, review.review_id AS rowid FROM review "
+                "JOIN movie ON movie.movie_id = review.movie_id "
+                "JOIN user ON user.user_id = review.user_id WHERE",
+                search_text, after, limit, like_columns=("review.review_text",))
+
+        # Searched with LIKE? -> The snippet is the whole text, highlighted here instead of with FTS5
+        terms = tokenize(search_text)
+        return {
+            str(row.rowid): {
+                "movie_id": row.movie_id,
+                "movie_title": row.movie_title,
+                "user_id": row.user_id,
+                "user_name": row.user_name,
+                "review_text": row.review_text,
+                "snippet": row.snippet if self.has_full_text_search else highlight(row.review_text, terms),
+                "score": row.score
+            }
+            for row in rows
+        }
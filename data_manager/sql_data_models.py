@@ -6,18 +6,34 @@ db = SQLAlchemy()
 class Movie(db.Model):
     """Represents a movie in the database."""
 
+    # A movie is identified by its IMDb ID, so remakes and films sharing title and year stay
+    # separate movies. Movies without one (added before IMDb IDs were stored, or without an ID
+    # in their data) fall back to title and year as identity. The other indexes serve sorted
+    # and filtered listings, each ordered by its column and then the movie ID (the rowid).
+    __table_args__ = (
+        db.Index("ix_movie_imdb_id", "imdb_id", unique=True),
+        db.Index("ix_movie_title_publication_year", "title", "publication_year", unique=True,
+                 sqlite_where=db.text("imdb_id IS NULL")),
+        db.Index("ix_movie_title", "title"),
+        db.Index("ix_movie_publication_year", "publication_year"),
+        db.Index("ix_movie_rating", "rating"),
+        db.Index("ix_movie_director", db.text("director COLLATE NOCASE")),
+    )
+
     movie_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     title = db.Column(db.String(255), nullable=False)
     director = db.Column(db.String(255), nullable=True)
     publication_year = db.Column(db.Integer, nullable=True)
     rating = db.Column(db.Float, nullable=True)
+    imdb_id = db.Column(db.String(16), nullable=True)
 
     def __repr__(self):
         return (f"<Movie(movie_id={self.movie_id}, "
                 f"title='{self.title}', "
                 f"director='{self.director}', "
                 f"publication_year={self.publication_year}, "
-                f"rating={self.rating})>")
+                f"rating={self.rating}, "
+                f"imdb_id='{self.imdb_id}')>")
 
     def __str__(self):
         return (f"Movie ID: {self.movie_id}, "
@@ -45,6 +61,11 @@ class User(db.Model):
 class UserMovies(db.Model):
     """Relationship table that links User and Movie entities together"""
 
+    # A movie can only be once in a user's favorites. The index also serves lookups by user_id.
+    __table_args__ = (
+        db.Index("ix_user_movies_user_id_movie_id", "user_id", "movie_id", unique=True),
+    )
+
     entry_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.user_id"), nullable=False)
     movie_id = db.Column(db.Integer, db.ForeignKey("movie.movie_id"), nullable=False)
@@ -65,7 +86,7 @@ class Review(db.Model):
 
     review_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.user_id"), nullable=False)
-    movie_id = db.Column(db.Integer, db.ForeignKey("movie.movie_id"), nullable=False)
+    movie_id = db.Column(db.Integer, db.ForeignKey("movie.movie_id"), nullable=False, index=True)
     review_text = db.Column(db.Text, nullable=False)
 
     user = db.relationship('User', backref='reviews')
@@ -0,0 +1,142 @@
+import logging
+import time
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Bounds of the per-request query count histogram
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class RequestQueries:
+    """Statements executed while handling one request, counted by their SQL text."""
+
+    def __init__(self):
+        """Initializes the counters of a request without any statement."""
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, duration):
+        """Count one execution of a statement."""
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def repeated(self, threshold) -> list:
+        """
+        Return the statements executed at least `threshold` times, the usual sign of an N+1
+        pattern: one query per item of a list instead of one query for the whole list.
+
+        Statements are compared by their SQL text with placeholders, so the same query with
+        different parameters counts as a repetition.
+
+        :return: (statement, count) tuples, most repeated first.
+        :rtype: list
+        """
+        return [(statement, count) for statement, count in self.statements.most_common()
+                if count >= threshold]
+
+
+class SQLProfiler:
+    """
+    Accounts for the SQL statements executed through an SQLAlchemy engine.
+
+    Every statement is timed with the engine's `before_cursor_execute` and
+    `after_cursor_execute` events. Slow statements are logged with their parameters. Inside a
+    Flask request, statements are also counted per request, and statements repeated within one
+    request are reported as possible N+1 queries, in the log, in the metrics and optionally in
+    an `X-SQL-Profile` response header.
+    """
+
+    def __init__(self, slow_query_seconds=0.1, repeat_threshold=5, metrics=None):
+        """
+        Initializes the profiler.
+
+        :param slow_query_seconds: Statements taking at least this long are logged.
+        :type slow_query_seconds: float
+
+        :param repeat_threshold: Executions of one statement within a request flagged as N+1.
+        :type repeat_threshold: int
+
+        :param metrics: Optional registry the profiler records its metrics in.
+        :type metrics: metrics.MetricsRegistry
+        """
+        self.slow_query_seconds = slow_query_seconds
+        self.repeat_threshold = repeat_threshold
+        self.query_latency = self.request_queries = self.repeated_queries = None
+
+        if metrics:
+            self.query_latency = metrics.histogram(
+                "sql_query_duration_seconds", "Latency of SQL statements.", ("statement",))
+            self.request_queries = metrics.histogram(
+                "sql_queries_per_request", "SQL statements executed per request.", ("route",),
+                QUERY_COUNT_BUCKETS)
+            self.repeated_queries = metrics.counter(
+                "sql_repeated_queries_total",
+                "Statements repeated within a request at least the N+1 threshold.", ("route",))
+
+    def attach(self, engine):
+        """Time every statement executed through the engine."""
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_started_at"].pop()
+
+        if self.query_latency:
+            self.query_latency.observe(duration, statement.split(None, 1)[0].upper())
+
+        if duration >= self.slow_query_seconds:
+            logger.warning("Slow query (%.1f ms): %s; parameters: %r",
+                           duration * 1000, statement, parameters)
+
+        # Is statement executed for a request? -> Count it for that request
+        if has_request_context():
+            queries = g.get("sql_queries")
+            if queries is not None:
+                queries.record(statement, duration)
+
+    def init_app(self, app, debug_header=False):
+        """
+        Count the statements of every request of a Flask app.
+
+        :param app: The Flask app.
+        :type app: flask.Flask
+
+        :param debug_header: Whether to add an `X-SQL-Profile` header to every response, e.g.
+                             "queries=12; time_ms=3.41; repeated=1".
+        :type debug_header: bool
+        """
+        @app.before_request
+        def start_counting():
+            g.sql_queries = RequestQueries()
+
+        @app.after_request
+        def report_queries(response):
+            queries = g.get("sql_queries")
+            if queries is None:
+                return response
+
+            route = request.url_rule.rule if request.url_rule else "<unmatched>"
+            repeated = queries.repeated(self.repeat_threshold)
+            for statement, count in repeated:
+                logger.warning("Possible N+1 query on %s %s: %d executions of %s",
+                               request.method, route, count, statement)
+
+            if self.request_queries:
+                self.request_queries.observe(queries.count, route)
+                if repeated:
+                    self.repeated_queries.inc(route, amount=len(repeated))
+
+            if debug_header:
+                response.headers["X-SQL-Profile"] = (f"queries={queries.count}; "
+                                                     f"time_ms={queries.duration * 1000:.2f}; "
+                                                     f"repeated={len(repeated)}")
+            return response
@@ -0,0 +1,69 @@
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+# Tuned defaults for a multi-threaded web app on a single SQLite file
+DEFAULT_PRAGMAS = {
+    # Readers don't block the writer and vice versa
+    "journal_mode": "WAL",
+    # Safe with WAL: only a power loss can undo the last commits, never corrupt the database
+    "synchronous": "NORMAL",
+    # Bytes of the database file read through memory mapping
+    "mmap_size": 256 * 1024 * 1024,
+    # Negative values are KiB, so about 64 MB of page cache per connection
+    "cache_size": -64000,
+    # Milliseconds a writer waits for the lock before raising "database is locked"
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+}
+
+
+def set_pragmas(dbapi_connection, pragmas):
+    """
+    Apply PRAGMA settings to a raw SQLite connection.
+
+    :param dbapi_connection: A sqlite3 connection.
+    :type dbapi_connection: sqlite3.Connection
+
+    :param pragmas: PRAGMA names and their values.
+    :type pragmas: dict
+    """
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+def apply_profile(engine, pragmas):
+    """
+    Apply the PRAGMA settings to every connection the engine opens from now on.
+
+    :param engine: Engine connected to a SQLite database.
+    :type engine: sqlalchemy.engine.Engine
+
+    :param pragmas: PRAGMA names and their values.
+    :type pragmas: dict
+    """
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        set_pragmas(dbapi_connection, pragmas)
+
+
+def engine_options(pool_size) -> dict:
+    """
+    Return engine options suited for a multi-threaded Flask app.
+
+    Connections are pooled, so the PRAGMAs are applied once per connection instead of once per
+    request, and may be handed to whichever thread serves the next request.
+
+    :param pool_size: Number of connections kept open.
+    :type pool_size: int
+
+    :return: Keyword arguments for `create_engine` / `SQLALCHEMY_ENGINE_OPTIONS`.
+    :rtype: dict
+    """
+    return {
+        "poolclass": QueuePool,
+        "pool_size": pool_size,
+        "max_overflow": pool_size,
+        "connect_args": {"check_same_thread": False},
+    }
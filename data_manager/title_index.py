@@ -0,0 +1,79 @@
+import threading
+from bisect import bisect_left, insort
+
+
+def normalize_title(title) -> str:
+    """Return a title in the form it is indexed and looked up by: casefolded, single spaces."""
+    return " ".join(title.split()).casefold()
+
+
+class TitlePrefixIndex:
+    """
+    In-memory index of movie titles answering prefix queries, for autocompletion.
+
+    Titles are kept in a sorted array of their normalized form, so all titles starting with a
+    prefix are adjacent: one binary search finds the first of them and the following entries
+    are read until the prefix no longer matches. A lookup costs O(log n + limit).
+    """
+
+    def __init__(self):
+        """Initializes an empty index."""
+        self._keys = []
+        self._titles = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def build(self, titles):
+        """
+        Replace the index with the given titles, sorting them once.
+
+        :param titles: Iterable of movie titles, duplicates allowed.
+        :type titles: iterable
+        """
+        new_titles = {}
+        for title in titles:
+            if title:
+                new_titles.setdefault(normalize_title(title), title)
+
+        with self._lock:
+            self._titles = new_titles
+            self._keys = sorted(new_titles)
+
+    def add(self, title):
+        """Add a single title, keeping the array sorted. Known titles are ignored."""
+        if not title:
+            return
+
+        key = normalize_title(title)
+        with self._lock:
+            if key not in self._titles:
+                self._titles[key] = title
+                insort(self._keys, key)
+
+    def suggest(self, prefix, limit=10) -> list:
+        """
+        Return titles starting with a prefix, in alphabetical order.
+
+        :param prefix: The beginning of a title, matched case-insensitively.
+        :type prefix: str
+
+        :param limit: The maximum number of titles to return.
+        :type limit: int
+
+        :return: The matching titles as they were added.
+        :rtype: list
+        """
+        prefix = normalize_title(prefix or "")
+        if not prefix:
+            return []
+
+        with self._lock:
+            suggestions = []
+            for i in range(bisect_left(self._keys, prefix), len(self._keys)):
+                key = self._keys[i]
+                if not key.startswith(prefix) or len(suggestions) >= limit:
+                    break
+                suggestions.append(self._titles[key])
+            return suggestions
@@ -0,0 +1,212 @@
+import threading
+import time
+from uuid import uuid4
+from sqlalchemy import bindparam, text
+
+
+class DataVersions:
+    """
+    Thread-safe version counters of parts of the data, used as validators for conditional requests.
+
+    Every key ("global", "user:<user_id>", "movies") has a counter and the time it was last
+    bumped. Counters start from zero in every process, so ETags also carry a random epoch of
+    the process, keeping them from matching ETags handed out before a restart.
+
+    - Note: The counters live in the memory of one process and only see the writes made
+      through it. Use `SQLiteDataVersions` when several processes or tools write to the same
+      database.
+    """
+
+    def __init__(self):
+        """Initializes all counters to zero, last modified at the start of the process."""
+        self.epoch = uuid4().hex[:12]
+        self.started_at = time.time()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def bump(self, keys):
+        """Increment the counters of the given keys."""
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                version, modified_at = self._versions.get(key, (0, self.started_at))
+                self._versions[key] = (version + 1, now)
+
+    def etag(self, keys) -> str:
+        """
+        Return a strong ETag for data depending on the given keys.
+
+        :rtype: str
+        """
+        with self._lock:
+            versions = [str(self._versions.get(key, (0,))[0]) for key in keys]
+        return "-".join([self.epoch] + versions)
+
+    def last_modified(self, keys) -> float:
+        """
+        Return the time any of the given keys was last bumped.
+
+        :return: A POSIX timestamp.
+        :rtype: float
+        """
+        with self._lock:
+            return max(self._versions.get(key, (0, self.started_at))[1] for key in keys)
+
+
+class SQLiteDataVersions:
+    """
+    Version counters kept in the `data_version` table of the SQLite database itself.
+
+    Triggers bump the counters in the transaction of every write (see
+    `migrations.add_data_versions`), so all workers, and tools like the backfill CLI, share
+    one set of versions, and ETags match across workers and restarts. The changed keys can
+    also be polled, keeping the caches of several workers coherent: they include the tags of
+    `CachingDataManager` and `PageCache`.
+    """
+
+    def __init__(self, engine):
+        """
+        Initializes the versions of a migrated database.
+
+        :param engine: Engine connected to the SQLite database.
+        :type engine: sqlalchemy.engine.Engine
+        """
+        self.engine = engine
+        self._lock = threading.Lock()
+        with engine.connect() as connection:
+            self._last_seq = connection.exec_driver_sql(
+                "SELECT COALESCE(MAX(seq), 0) FROM data_version").scalar()
+
+    def _read(self, keys) -> dict:
+        """Return the (version, modified_at) of the given keys and of the epoch."""
+        query = text("SELECT key, version, modified_at FROM data_version WHERE key IN :keys").bindparams(
+            bindparam("keys", expanding=True))
+        with self.engine.connect() as connection:
+            rows = connection.execute(query, {"keys": ["epoch", *keys]}).all()
+        return {key: (version, modified_at) for key, version, modified_at in rows}
+
+    def etag(self, keys) -> str:
+        """
+        Return a strong ETag for data depending on the given keys.
+
+        :rtype: str
+        """
+        versions = self._read(keys)
+        return "-".join(str(versions.get(key, (0,))[0]) for key in ("epoch", *keys))
+
+    def last_modified(self, keys) -> float:
+        """
+        Return the time any of the given keys was last bumped, or the database got its versions.
+
+        :return: A POSIX timestamp.
+        :rtype: float
+        """
+        return max(modified_at for version, modified_at in self._read(keys).values())
+
+    def publish(self, tags):
+        """Do nothing: the triggers of the database publish the keys of every write."""
+        pass
+
+    def poll(self) -> set:
+        """
+        Return the keys bumped since the last poll, by any process.
+
+        :rtype: set
+        """
+        with self._lock:
+            with self.engine.connect() as connection:
+                rows = connection.exec_driver_sql(
+                    "SELECT seq, key FROM data_version WHERE seq > ? ORDER BY seq",
+                    (self._last_seq,)).all()
+            if rows:
+                self._last_seq = rows[-1][0]
+        return {key for seq, key in rows}
+
+
+def user_version_keys(user_id) -> tuple:
+    """Return the version keys a user's name and movies depend on."""
+    return f"user:{user_id}", "movies"
+
+
+class VersionedDataManager:
+    """
+    Keeps data versions in memory in front of any data manager.
+
+    Only needed for backends without versions of their own, like the JSON files: with SQLite,
+    the triggers behind `SQLiteDataVersions` bump the versions of every write. Every mutating
+    method bumps the versions of the data it can change, after the write is done:
+
+    - global: any data
+    - user:<user_id>: name, movies and reviews of that user
+    - movies: movie rows shared by several users' collections, changed by `update_user_movies`
+
+    The versions (`versions`) allow answering conditional requests without reading the data.
+    Everything else is passed through to the wrapped data manager.
+    """
+
+    def __init__(self, data_manager):
+        """
+        Initializes the versions in front of a data manager.
+
+        :param data_manager: The wrapped data manager, e.g. JSONDataManager or CachingDataManager.
+        :type data_manager: DataManagerInterface
+        """
+        self.data_manager = data_manager
+        self.versions = DataVersions()
+
+    def __getattr__(self, name):
+        """Delegate everything that isn't versioned to the wrapped data manager."""
+        return getattr(self.data_manager, name)
+
+    def _bump(self, *keys):
+        """Bump the global version and the given ones."""
+        self.versions.bump(("global",) + keys)
+
+    def add_user(self, new_username):
+        """Add a new user and bump the global version."""
+        try:
+            return self.data_manager.add_user(new_username)
+        finally:
+            self._bump()
+
+    def delete_user(self, user_id):
+        """Delete a user and bump the user's version."""
+        try:
+            return self.data_manager.delete_user(user_id)
+        finally:
+            self._bump(f"user:{user_id}")
+
+    def add_movie(self, user_id, fetched_movie_data):
+        """Add a movie to a user's collection and bump the user's version."""
+        try:
+            return self.data_manager.add_movie(user_id, fetched_movie_data)
+        finally:
+            self._bump(f"user:{user_id}")
+
+    def add_movies(self, user_id, fetched_movies):
+        """Add several movies to a user's collection and bump the user's version."""
+        try:
+            return self.data_manager.add_movies(user_id, fetched_movies)
+        finally:
+            self._bump(f"user:{user_id}")
+
+    def update_user_movies(self, user_id, movie_id, update_data):
+        """Update a movie and bump the versions of the user and of shared movies."""
+        try:
+            return self.data_manager.update_user_movies(user_id, movie_id, update_data)
+        finally:
+            self._bump(f"user:{user_id}", "movies")
+
+    def delete_user_movie(self, user_id, movie_id):
+        """Delete a movie from a user's collection and bump the user's version."""
+        try:
+            return self.data_manager.delete_user_movie(user_id, movie_id)
+        finally:
+            self._bump(f"user:{user_id}")
+
+    def add_review(self, user_id, movie_id, review_text):
+        """Add a review and bump the user's version, whose movies may carry their reviews."""
+        try:
+            return self.data_manager.add_review(user_id, movie_id, review_text)
+        finally:
+            self._bump(f"user:{user_id}")
@@ -0,0 +1,316 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Union
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+# Statuses of jobs that haven't finished yet
+PENDING_STATUSES = ("queued", "running")
+
+
+class JobStoreInterface(ABC):
+    """Store of jobs and their statuses, shared by the web threads and the workers"""
+
+    @abstractmethod
+    def add(self, job_id, payload):
+        """Add a queued job."""
+        pass
+
+    @abstractmethod
+    def claim(self) -> Union[dict, None]:
+        """Mark the oldest queued job as running and return it, or None if there is none."""
+        pass
+
+    @abstractmethod
+    def touch(self, job_id):
+        """Refresh the update time of a running job, so it isn't taken for abandoned."""
+        pass
+
+    @abstractmethod
+    def finish(self, job_id, status, result=None):
+        """Record the final status and result of a job."""
+        pass
+
+    @abstractmethod
+    def get(self, job_id) -> Union[dict, None]:
+        """Return a job, or None if it is unknown or expired."""
+        pass
+
+    @abstractmethod
+    def pending(self) -> int:
+        """Return the number of queued and running jobs."""
+        pass
+
+
+class MemoryJobStore(JobStoreInterface):
+    """Job store in process memory. Jobs are lost on restart."""
+
+    def __init__(self, ttl=3600):
+        """
+        Initializes an empty store.
+
+        :param ttl: Seconds a finished job stays available for status requests.
+        :type ttl: float
+        """
+        self.ttl = ttl
+        self._jobs = OrderedDict()
+        self._queued = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, job_id, payload):
+        now = time.time()
+        with self._lock:
+            # Drop expired jobs from the front, the oldest ones
+            while self._jobs:
+                oldest = next(iter(self._jobs.values()))
+                if oldest["status"] in PENDING_STATUSES or oldest["updated_at"] + self.ttl > now:
+                    break
+                self._jobs.popitem(last=False)
+
+            self._jobs[job_id] = {"id": job_id, "status": "queued", "payload": payload, "result": None,
+                                  "created_at": now, "updated_at": now}
+            self._queued[job_id] = True
+
+    def claim(self) -> Union[dict, None]:
+        with self._lock:
+            if not self._queued:
+                return None
+            job_id, _ = self._queued.popitem(last=False)
+            job = self._jobs[job_id]
+            job.update(status="running", updated_at=time.time())
+            return dict(job)
+
+    def touch(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job["status"] == "running":
+                job["updated_at"] = time.time()
+
+    def finish(self, job_id, status, result=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job.update(status=status, result=result, updated_at=time.time())
+
+    def get(self, job_id) -> Union[dict, None]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job["status"] in PENDING_STATUSES)
+
+
+class SQLiteJobStore(JobStoreInterface):
+    """
+    Job store in a SQLite file. Jobs survive restarts and can be shared by several worker processes.
+
+    Claiming a job is a single UPDATE, so concurrent workers never run the same job. Running jobs
+    are touched regularly by their worker, and jobs left running by a crashed process are queued
+    again once they haven't been touched for `stale_after`.
+    """
+
+    def __init__(self, path, ttl=3600, stale_after=300):
+        """
+        Opens (and creates if needed) the SQLite file of the store.
+
+        :param path: Path of the SQLite file, e.g. "user_data/jobs.sqlite".
+        :type path: str
+
+        :param ttl: Seconds a finished job stays available for status requests.
+        :type ttl: float
+
+        :param stale_after: Seconds without a touch after which a running job is considered
+                            abandoned. Must be well above the heartbeat interval of the queues.
+        :type stale_after: float
+        """
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA busy_timeout = 5000")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS jobs ("
+                                 "id TEXT PRIMARY KEY, "
+                                 "status TEXT NOT NULL, "
+                                 "payload TEXT NOT NULL, "
+                                 "result TEXT, "
+                                 "created_at REAL NOT NULL, "
+                                 "updated_at REAL NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_created_at "
+                                 "ON jobs (status, created_at)")
+
+    @staticmethod
+    def to_job(row) -> dict:
+        """Return a row of the jobs table as a job dictionary."""
+        job_id, status, payload, result, created_at, updated_at = row
+        return {"id": job_id, "status": status, "payload": json.loads(payload),
+                "result": json.loads(result) if result else None,
+                "created_at": created_at, "updated_at": updated_at}
+
+    def add(self, job_id, payload):
+        now = time.time()
+        with self._lock:
+            self._connection.execute("DELETE FROM jobs WHERE status NOT IN (?, ?) AND updated_at < ?",
+                                     (*PENDING_STATUSES, now - self.ttl))
+            self._connection.execute("INSERT INTO jobs VALUES (?, 'queued', ?, NULL, ?, ?)",
+                                     (job_id, json.dumps(payload), now, now))
+
+    def claim(self) -> Union[dict, None]:
+        now = time.time()
+        with self._lock:
+            # Was a job abandoned by a crashed worker? -> Queue it again
+            self._connection.execute("UPDATE jobs SET status = 'queued' "
+                                     "WHERE status = 'running' AND updated_at < ?",
+                                     (now - self.stale_after,))
+            row = self._connection.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = "
+                "(SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1) "
+                "RETURNING id, status, payload, result, created_at, updated_at", (now,)).fetchone()
+        return self.to_job(row) if row else None
+
+    def touch(self, job_id):
+        with self._lock:
+            self._connection.execute("UPDATE jobs SET updated_at = ? WHERE id = ? AND status = 'running'",
+                                     (time.time(), job_id))
+
+    def finish(self, job_id, status, result=None):
+        with self._lock:
+            self._connection.execute("UPDATE jobs SET status = ?, result = ?, updated_at = ? WHERE id = ?",
+                                     (status, json.dumps(result), time.time(), job_id))
+
+    def get(self, job_id) -> Union[dict, None]:
+        with self._lock:
+            row = self._connection.execute("SELECT id, status, payload, result, created_at, updated_at "
+                                           "FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self.to_job(row) if row else None
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)",
+                                            PENDING_STATUSES).fetchone()[0]
+
+
+class JobQueue:
+    """
+    Runs jobs on a pool of background threads, so requests don't wait for slow work.
+
+    A job is a JSON-serializable payload passed to the handler. The handler returns the final
+    status of the job (e.g. "added", "duplicate", "not_found") and optionally a result. A
+    handler raising an exception marks the job as "failed". Workers are woken up by every
+    submit and also poll the store, picking up jobs queued by other processes sharing it.
+
+    While handlers run, a heartbeat thread touches their jobs, so a shared store doesn't hand a
+    slow job to another process. A job of a process that stalls or crashes mid-way is run again
+    though, so handlers must be idempotent: running a job twice must leave the same data as once.
+    """
+
+    def __init__(self, handler, store, workers=4, poll_interval=1.0, heartbeat_interval=60.0):
+        """
+        Initializes the queue. Workers only start with `start`.
+
+        :param handler: Function taking a payload and returning a status or (status, result).
+        :type handler: function
+
+        :param store: Store keeping the jobs and their statuses.
+        :type store: JobStoreInterface
+
+        :param workers: Number of worker threads.
+        :type workers: int
+
+        :param poll_interval: Seconds an idle worker waits before checking the store again.
+        :type poll_interval: float
+
+        :param heartbeat_interval: Seconds between touches of running jobs.
+        :type heartbeat_interval: float
+        """
+        self.handler = handler
+        self.store = store
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._wakeup = threading.Condition()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._running = set()
+        self._running_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker threads and the heartbeat thread."""
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Stop the workers after their current jobs."""
+        self._stopped.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, payload) -> str:
+        """
+        Queue a job and wake up a worker.
+
+        :param payload: The JSON-serializable input of the handler.
+        :type payload: dict
+
+        :return: The ID of the job, to ask for its status.
+        :rtype: str
+        """
+        job_id = uuid4().hex
+        self.store.add(job_id, payload)
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id) -> Union[dict, None]:
+        """Return a job with its status, or None if it is unknown or expired."""
+        return self.store.get(job_id)
+
+    def _work(self):
+        """Run jobs until the queue is stopped."""
+        while not self._stopped.is_set():
+            job = self.store.claim()
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+
+            with self._running_lock:
+                self._running.add(job["id"])
+            try:
+                outcome = self.handler(job["payload"])
+                status, result = outcome if isinstance(outcome, tuple) else (outcome, None)
+            except Exception as e:
+                logger.exception("Job %s failed", job["id"])
+                status, result = "failed", {"error": str(e)}
+            finally:
+                with self._running_lock:
+                    self._running.discard(job["id"])
+            self.store.finish(job["id"], status, result)
+
+    def _heartbeat(self):
+        """Touch the running jobs of this queue until it is stopped."""
+        while not self._stopped.wait(self.heartbeat_interval):
+            with self._running_lock:
+                job_ids = list(self._running)
+            for job_id in job_ids:
+                try:
+                    self.store.touch(job_id)
+                except Exception:
+                    logger.exception("Touching job %s failed", job_id)
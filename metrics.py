@@ -0,0 +1,237 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import Response, g, request
+
+# Upper bounds in seconds of the latency buckets, from 1 ms to 10 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def format_labels(label_names, label_values, extra="") -> str:
+    """Format label names and values as a Prometheus label set, e.g. '{method="GET"}'."""
+    labels = [f'{name}="{escape_label_value(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def escape_label_value(value) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_value(value) -> str:
+    """Format a sample value, writing whole numbers without a fraction."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing count per label set, e.g. requests or errors."""
+
+    def __init__(self, name, documentation, label_names=()):
+        """
+        Initializes a counter without samples.
+
+        :param name: The metric name, e.g. "omdb_requests_total".
+        :type name: str
+
+        :param documentation: The help text of the metric.
+        :type documentation: str
+
+        :param label_names: Names of the labels every sample is recorded with.
+        :type label_names: tuple
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        """Increment the count of a label set, given as values in the order of the label names."""
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        """Return the metric in Prometheus text format, one line per list entry."""
+        with self._lock:
+            values = sorted(self._values.items())
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{format_labels(self.label_names, label_values)} {format_value(value)}"
+                     for label_values, value in values)
+        return lines
+
+
+class Histogram:
+    """
+    Distribution of observed values per label set, e.g. request latencies.
+
+    Every label set keeps one count per bucket, the sum and the count of its observations, so
+    recording costs a binary search and a few increments regardless of how many values were
+    observed. Buckets are made cumulative only when the metric is rendered.
+    """
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        """
+        Initializes a histogram without samples.
+
+        :param name: The metric name, e.g. "http_request_duration_seconds".
+        :type name: str
+
+        :param documentation: The help text of the metric.
+        :type documentation: str
+
+        :param label_names: Names of the labels every observation is recorded with.
+        :type label_names: tuple
+
+        :param buckets: Sorted upper bounds of the buckets. "+Inf" is always added.
+        :type buckets: tuple
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Label values -> [bucket counts (last one is +Inf), sum, count]
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """Record a value for a label set, given as values in the order of the label names."""
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self._samples.get(label_values)
+            if sample is None:
+                sample = self._samples[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            sample[0][bucket] += 1
+            sample[1] += value
+            sample[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        """Observe the seconds spent in a `with` block, also if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def render(self) -> list:
+        """Return the metric in Prometheus text format, one line per list entry."""
+        with self._lock:
+            samples = sorted((label_values, (list(counts), total, count))
+                             for label_values, (counts, total, count) in self._samples.items())
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in samples:
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                le = f'le="{upper_bound if upper_bound == "+Inf" else format_value(upper_bound)}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.label_names, label_values, le)} "
+                             f"{cumulative}")
+            labels = format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class CallbackMetric:
+    """Metric whose current value is read from a callback when rendered, e.g. cache statistics."""
+
+    def __init__(self, name, documentation, metric_type, callback):
+        """
+        Initializes the metric.
+
+        :param name: The metric name.
+        :type name: str
+
+        :param documentation: The help text of the metric.
+        :type documentation: str
+
+        :param metric_type: The Prometheus metric type, "counter" or "gauge".
+        :type metric_type: str
+
+        :param callback: Function without arguments returning the current value.
+        :type callback: function
+        """
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.callback = callback
+
+    def render(self) -> list:
+        """Return the metric in Prometheus text format, one line per list entry."""
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}",
+                f"{self.name} {format_value(self.callback())}"]
+
+
+class MetricsRegistry:
+    """
+    In-process metrics of the app, exposed in the Prometheus text format.
+
+    Metrics are aggregated in memory and guarded by one lock each, so they can be recorded from
+    any thread. With several worker processes, every worker exposes its own metrics.
+    """
+
+    def __init__(self):
+        """Initializes an empty registry."""
+        self._metrics = []
+
+    def register(self, metric):
+        """Add a metric to the registry and return it."""
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, label_names=()) -> Counter:
+        """Create and register a counter."""
+        return self.register(Counter(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        """Create and register a histogram."""
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def callback(self, name, documentation, metric_type, callback) -> CallbackMetric:
+        """Create and register a metric read from a callback."""
+        return self.register(CallbackMetric(name, documentation, metric_type, callback))
+
+    def render(self) -> str:
+        """Return all metrics in Prometheus text format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def response(self) -> Response:
+        """Return all metrics as a response for Prometheus to scrape."""
+        return Response(self.render(), content_type=CONTENT_TYPE)
+
+
+def instrument_app(app, histogram):
+    """
+    Record the latency of every request of a Flask app.
+
+    Requests are labeled by method, route (the URL rule, so /users/1 and /users/2 share one
+    series) and status code. Requests not matching any route are recorded as "<unmatched>".
+
+    :param app: The Flask app.
+    :type app: flask.Flask
+
+    :param histogram: Histogram with the labels method, route and status.
+    :type histogram: Histogram
+    """
+    @app.before_request
+    def start_timer():
+        g.request_started_at = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        started_at = g.get("request_started_at")
+        if started_at is not None:
+            route = request.url_rule.rule if request.url_rule else "<unmatched>"
+            histogram.observe(time.perf_counter() - started_at,
+                              request.method, route, str(response.status_code))
+        return response
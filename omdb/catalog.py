@@ -0,0 +1,234 @@
+import argparse
+import csv
+import gzip
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from itertools import islice
+from typing import Union
+from data_manager.title_index import normalize_title
+
+logger = logging.getLogger(__name__)
+
+# Accepted column names of dump files, mapped to catalog columns. Covers OMDb responses and
+# plain lowercase names.
+COLUMN_ALIASES = {
+    "imdb_id": ("imdb_id", "imdbID"),
+    "title": ("title", "Title"),
+    "year": ("year", "Year"),
+    "director": ("director", "Director"),
+    "rating": ("rating", "imdbRating"),
+    "votes": ("votes", "imdbVotes"),
+}
+
+# Values meaning "unknown" in OMDb responses and TSV exports
+MISSING_VALUES = {"", "N/A", "\\N"}
+
+
+def to_row(record) -> Union[tuple, None]:
+    """
+    Turn one record of a dump file into a catalog row.
+
+    :param record: A record with any of the column names of COLUMN_ALIASES.
+    :type record: dict
+
+    :return: The row, or None if the record lacks any of IMDb ID, title, year, director and
+             rating. Such a movie couldn't be added anyway, so lookups of it go to OMDb.
+    :rtype: Union[tuple, None]
+    """
+    values = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        value = next((record[alias] for alias in aliases if alias in record), None)
+        values[column] = None if value is None or str(value).strip() in MISSING_VALUES else str(value).strip()
+
+    if not all(values[column] for column in ("imdb_id", "title", "year", "director", "rating")):
+        return None
+
+    votes = (values["votes"] or "0").replace(",", "")
+    return (values["imdb_id"], values["title"], normalize_title(values["title"]), values["year"],
+            values["director"], values["rating"], int(votes) if votes.isdigit() else 0)
+
+
+def read_dump(path):
+    """
+    Stream the records of a dump file one at a time, without loading the file into memory.
+
+    Files ending in .tsv (header row required) are read as tab-separated values,
+    anything else as JSON lines. Both may be gzip compressed (.gz).
+
+    :param path: The path to the dump file.
+    :type path: str
+
+    :return: A generator of records as dictionaries.
+    :rtype: generator
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as file:
+        if path.removesuffix(".gz").endswith(".tsv"):
+            yield from csv.DictReader(file, delimiter="\t", quoting=csv.QUOTE_NONE)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class LocalCatalog:
+    """
+    Local store of movie data answering lookups without OMDb.
+
+    The catalog lives in a SQLite file, indexed by IMDb ID and by normalized title. It is filled
+    in bulk from dump files and answers in the shape of OMDb responses, so it can stand in front
+    of the network transparently. Titles shared by several movies resolve to the one with the
+    most votes, like OMDb's title search favors the best known movie.
+    """
+
+    def __init__(self, path):
+        """
+        Opens (and creates if needed) the SQLite file of the catalog.
+
+        :param path: Path of the SQLite catalog file.
+        :type path: str
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS catalog ("
+                                 "imdb_id TEXT PRIMARY KEY, "
+                                 "title TEXT NOT NULL, "
+                                 "normalized_title TEXT NOT NULL, "
+                                 "year TEXT, "
+                                 "director TEXT, "
+                                 "rating TEXT, "
+                                 "votes INTEGER NOT NULL DEFAULT 0)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS ix_catalog_normalized_title_votes "
+                                 "ON catalog (normalized_title, votes)")
+        self._connection.commit()
+
+    @staticmethod
+    def to_movie_data(row) -> dict:
+        """Return a catalog row as an OMDb response."""
+        imdb_id, title, year, director, rating = row
+        return {
+            "Title": title,
+            "Year": year or "N/A",
+            "Director": director or "N/A",
+            "imdbRating": rating or "N/A",
+            "imdbID": imdb_id,
+            "Response": "True"
+        }
+
+    def get(self, params) -> Union[dict, None]:
+        """
+        Return the catalog entry for the query parameters of an OMDb request.
+
+        :param params: Query parameters, {"i": <IMDb ID>} or {"t": <title>}, optionally with
+                       {"y": <year>} narrowing a title lookup.
+        :type params: dict
+
+        :return: The movie as an OMDb response, or None if the catalog doesn't know it or lacks
+                 its year, director or rating.
+        :rtype: Union[dict, None]
+        """
+        columns = "SELECT imdb_id, title, year, director, rating FROM catalog "
+        with self._lock:
+            if params.get("i"):
+                row = self._connection.execute(f"{columns} WHERE imdb_id = ?",
+                                               (params["i"].strip(),)).fetchone()
+            elif params.get("t") and params.get("y"):
+                row = self._connection.execute(
+                    f"{columns} WHERE normalized_title = ? AND year = ? ORDER BY votes DESC LIMIT 1",
+                    (normalize_title(params["t"]), str(params["y"]).strip())).fetchone()
+            elif params.get("t"):
+                row = self._connection.execute(
+                    f"{columns} WHERE normalized_title = ? ORDER BY votes DESC LIMIT 1",
+                    (normalize_title(params["t"]),)).fetchone()
+            else:
+                row = None
+
+            # Is year, director or rating unknown? -> Miss, so the cache or OMDb can complete the movie
+            if row and not all(row[2:]):
+                row = None
+
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        return self.to_movie_data(row) if row else None
+
+    def import_dump(self, path, chunk_size=10000) -> dict:
+        """
+        Import a dump file into the catalog, chunk by chunk.
+
+        Each chunk is written in its own transaction, so memory use is bounded by the chunk size
+        and an interrupted import keeps the chunks written so far. Known IMDb IDs are updated.
+        Incomplete records are skipped (see `to_row`).
+
+        :param path: The path to the dump file (see `read_dump`).
+        :type path: str
+
+        :param chunk_size: The number of records written per transaction.
+        :type chunk_size: int
+
+        :return: The number of imported and skipped records.
+        :rtype: dict
+        """
+        counts = {"imported": 0, "skipped": 0}
+
+        def complete_rows():
+            for record in read_dump(path):
+                row = to_row(record)
+                if row:
+                    yield row
+                else:
+                    counts["skipped"] += 1
+
+        rows = complete_rows()
+
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            with self._lock:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO catalog "
+                    "(imdb_id, title, normalized_title, year, director, rating, votes) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", chunk)
+                self._connection.commit()
+
+            counts["imported"] += len(chunk)
+            logger.info("Imported %d records, skipped %d incomplete ones", counts["imported"], counts["skipped"])
+
+        return counts
+
+    def stats(self) -> dict:
+        """Return hits, misses and number of movies of the catalog."""
+        with self._lock:
+            size = self._connection.execute("SELECT COUNT(*) FROM catalog").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a movie dump (TSV or JSON lines, "
+                                                 "optionally gzipped) into a local catalog.")
+    parser.add_argument("catalog", help="Path of the SQLite catalog file, e.g. user_data/catalog.sqlite")
+    parser.add_argument("dump", help="Path of the dump file")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+    start = time.perf_counter()
+    counts = LocalCatalog(args.catalog).import_dump(args.dump, args.chunk_size)
+    print(f"Imported {counts['imported']} movies in {time.perf_counter() - start:.1f}s, "
+          f"skipped {counts['skipped']} without IMDb ID, title, year, director or rating", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
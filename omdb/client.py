@@ -0,0 +1,180 @@
+import logging
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth another attempt: rate limiting and upstream hiccups
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class OMDbUnavailableError(Exception):
+    """Raised when OMDb can't be reached or the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker that stops calling an unhealthy upstream.
+
+    After `failure_threshold` consecutive failures the circuit opens and every call fails fast.
+    Once `reset_timeout` seconds have passed, a single trial call is let through (half-open):
+    if it succeeds the circuit closes again, otherwise it re-opens.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        """
+        Initializes a closed circuit breaker.
+
+        :param failure_threshold: Consecutive failures after which the circuit opens.
+        :type failure_threshold: int
+
+        :param reset_timeout: Seconds the circuit stays open before a trial call is allowed.
+        :type reset_timeout: float
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Check if a call to the upstream may be made right now and return Boolean."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            # Is circuit open long enough? -> Let exactly one trial call through
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        """Close the circuit after a successful call."""
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        """Count a failed call and open the circuit if the threshold is reached."""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("OMDb circuit opened after %s failures", self.failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class OMDbClient:
+    """HTTP client for the OMDb API with pooled connections, timeouts and retries"""
+
+    def __init__(self, connect_timeout=3.05, read_timeout=10, max_retries=2, backoff_base=0.2,
+                 backoff_cap=2.0, pool_size=10, circuit_breaker=None, latency_histogram=None):
+        """
+        Initializes a keep-alive session and the retry and circuit breaker policy.
+
+        :param connect_timeout: Seconds to wait for the TCP connection to be established.
+        :type connect_timeout: float
+
+        :param read_timeout: Seconds to wait for OMDb to send a response.
+        :type read_timeout: float
+
+        :param max_retries: Additional attempts after the first one failed.
+        :type max_retries: int
+
+        :param backoff_base: Base delay in seconds of the exponential backoff.
+        :type backoff_base: float
+
+        :param backoff_cap: Upper bound in seconds of a single backoff delay.
+        :type backoff_cap: float
+
+        :param pool_size: Number of connections kept alive per host.
+        :type pool_size: int
+
+        :param circuit_breaker: Breaker guarding the upstream. Defaults to a new CircuitBreaker.
+        :type circuit_breaker: CircuitBreaker
+
+        :param latency_histogram: Optional histogram recording every attempt, labeled with its
+                                  outcome ("success" or "error").
+        :type latency_histogram: metrics.Histogram
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.latency_histogram = latency_histogram
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def backoff_delay(self, attempt) -> float:
+        """Return a "full jitter" delay for the given attempt, so retries don't synchronize."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _record_latency(self, started_at, outcome):
+        """Record the duration of an attempt that started at the given `perf_counter` time."""
+        if self.latency_histogram:
+            self.latency_histogram.observe(time.perf_counter() - started_at, outcome)
+
+    def get_json(self, url, params) -> dict:
+        """
+        Send a GET request to OMDb and return the decoded JSON response.
+
+        Connection errors, timeouts, 429 and 5xx responses are retried with jittered backoff.
+        A call that fails after all retries counts as one failure towards the circuit breaker.
+
+        :param url: The API endpoint URL.
+        :type url: str
+
+        :param params: Query parameters of the request, e.g. {"t": "Batman"}.
+        :type params: dict
+
+        :return: The decoded OMDb response.
+        :rtype: dict
+
+        :raises OMDbUnavailableError: If the circuit is open or all attempts failed.
+        """
+        if not self.circuit_breaker.allow_request():
+            raise OMDbUnavailableError("OMDb is currently unavailable")
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            # Is this a retry? -> Wait before hitting the upstream again
+            if attempt:
+                time.sleep(self.backoff_delay(attempt - 1))
+
+            started_at = time.perf_counter()
+            try:
+                res = self.session.get(url, params=params, timeout=self.timeout)
+                if res.status_code in RETRY_STATUS_CODES:
+                    raise requests.HTTPError(f"OMDb responded with {res.status_code}", response=res)
+                movie_data = res.json()
+
+            except (requests.RequestException, ValueError) as e:
+                logger.info("OMDb request failed (attempt %s): %s", attempt + 1, e)
+                self._record_latency(started_at, "error")
+                last_error = e
+                continue
+
+            self._record_latency(started_at, "success")
+            self.circuit_breaker.record_success()
+            return movie_data
+
+        self.circuit_breaker.record_failure()
+        raise OMDbUnavailableError("OMDb request failed after retries") from last_error
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
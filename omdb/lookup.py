@@ -0,0 +1,116 @@
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from .client import OMDbUnavailableError
+
+logger = logging.getLogger(__name__)
+
+IMDB_ID_PATTERN = re.compile(r"^tt\d{7,}$")
+
+
+class MovieLookup:
+    """Resolves movie titles and IMDb IDs through the local catalog, the lookup cache and the OMDb client"""
+
+    def __init__(self, url, client, cache, max_workers=8, catalog=None):
+        """
+        Initializes the lookup with the OMDb endpoint and its collaborators.
+
+        :param url: The API endpoint URL including the API key.
+        :type url: str
+
+        :param client: Client used for requests to OMDb.
+        :type client: OMDbClient
+
+        :param cache: Cache consulted before every request to OMDb.
+        :type cache: LookupCacheInterface
+
+        :param max_workers: Maximum number of concurrent requests made by `fetch_many`.
+        :type max_workers: int
+
+        :param catalog: Optional local catalog consulted before the cache and OMDb.
+        :type catalog: LocalCatalog
+        """
+        self.url = url
+        self.client = client
+        self.cache = cache
+        self.max_workers = max_workers
+        self.catalog = catalog
+
+    @staticmethod
+    def to_params(query) -> dict:
+        """
+        Build the OMDb query parameters for a movie title or an IMDb ID.
+
+        :param query: A movie title like "Batman" or an IMDb ID like "tt0096895".
+        :type query: str
+
+        :return: {"i": <IMDb ID>} for IMDb IDs, otherwise {"t": <title>}.
+        :rtype: dict
+        """
+        query = query.strip()
+        if IMDB_ID_PATTERN.match(query):
+            return {"i": query}
+        return {"t": query}
+
+    def fetch_data(self, movie_name) -> tuple:
+        """
+        Fetch movie data for the given query parameters.
+
+        - Note: Movies in the local catalog are answered without touching the network. Other
+          responses are served from the lookup cache when possible, including cached
+          "movie not found" answers. If OMDb is unreachable or its circuit breaker is open,
+          or the parameters have neither a title nor an IMDb ID, the fetch counts as
+          unsuccessful.
+
+        :param movie_name: Query parameters of the movie to search for, e.g. {"t": "Batman"}.
+        :type movie_name: dict
+
+        :return: Tuple containing movie data and a boolean indicating success.
+                 If successful, the first element is the movie data, and the second element is True.
+                 If unsuccessful, both elements are None, and the second element is False.
+        :rtype: tuple
+        """
+        # Is neither title nor IMDb ID given? -> Nothing to look up ({"t": None} would be "none")
+        if not any(str(movie_name.get(key) or "").strip() for key in ("t", "i")):
+            return None, False
+
+        # Is movie in the local catalog? -> No request needed
+        if self.catalog:
+            movie_data = self.catalog.get(movie_name)
+            if movie_data:
+                return movie_data, True
+
+        movie_data = self.cache.get(movie_name)
+
+        # Is lookup not cached? -> Fetch from OMDb and cache the answer
+        if movie_data is None:
+            try:
+                movie_data = self.client.get_json(self.url, movie_name)
+            except OMDbUnavailableError as e:
+                logger.warning("Fetching movie data failed: %s", e)
+                return None, False
+            self.cache.set(movie_name, movie_data)
+
+        if movie_data.get("Response") == "True":
+            return movie_data, True
+        return None, False
+
+    def fetch_many(self, queries) -> list:
+        """
+        Resolve several titles or IMDb IDs concurrently on a bounded thread pool.
+
+        Identical queries are only looked up once.
+
+        :param queries: Movie titles and/or IMDb IDs.
+        :type queries: list
+
+        :return: One `fetch_data` result tuple per query, in the order of the queries.
+        :rtype: list
+        """
+        params_by_query = {query: self.to_params(query) for query in queries}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = dict(zip(params_by_query,
+                               executor.map(self.fetch_data, params_by_query.values())))
+
+        return [results[query] for query in queries]
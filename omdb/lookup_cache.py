@@ -0,0 +1,351 @@
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Union
+
+# OMDb errors that mean "this title does not exist" and are therefore safe to cache.
+# Errors like "Invalid API key!" or "Request limit reached!" are transient and never cached.
+NOT_FOUND_ERRORS = {"Movie not found!", "Incorrect IMDb ID."}
+
+
+class LookupCacheInterface(ABC):
+    """Interface for any cache sitting in front of the OMDb API."""
+
+    def __init__(self, ttl, negative_ttl):
+        """
+        Initializes the expiry settings and the hit/miss counters of the cache.
+
+        :param ttl: Seconds a successful lookup stays cached.
+        :type ttl: int
+
+        :param negative_ttl: Seconds a "movie not found" lookup stays cached.
+        :type negative_ttl: int
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(params) -> str:
+        """
+        Build a cache key from the query parameters of an OMDb request.
+
+        Values are normalized (trimmed, lower-cased, whitespace collapsed), so "Batman" and
+        " batman " share one entry. The API key is never part of the key.
+
+        :param params: Query parameters of the OMDb request, e.g. {"t": "Batman"}.
+        :type params: dict
+
+        :return: A stable string key.
+        :rtype: str
+        """
+        normalized = {key: " ".join(str(value).split()).lower()
+                      for key, value in params.items() if key != "apikey"}
+        return json.dumps(normalized, sort_keys=True)
+
+    @staticmethod
+    def is_cacheable(movie_data) -> bool:
+        """Check if an OMDb response is a definite answer that may be cached and return Boolean."""
+        if movie_data.get("Response") == "True":
+            return True
+        return movie_data.get("Error") in NOT_FOUND_ERRORS
+
+    def expiry_for(self, movie_data) -> float:
+        """Return the absolute expiry timestamp for a response, depending on its outcome."""
+        if movie_data.get("Response") == "True":
+            return time.time() + self.ttl
+        return time.time() + self.negative_ttl
+
+    def record_lookup(self, movie_data):
+        """Count a lookup as hit, negative hit or miss."""
+        with self._lock:
+            if movie_data is None:
+                self.misses += 1
+            elif movie_data.get("Response") == "True":
+                self.hits += 1
+            else:
+                self.negative_hits += 1
+
+    def stats(self) -> dict:
+        """
+        Return the counters of the cache.
+
+        :return: A dictionary with hits, negative hits, misses, hit ratio and current size.
+        :rtype: dict
+        """
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+            "size": len(self)
+        }
+
+    @abstractmethod
+    def get(self, params) -> Union[dict, None]:
+        """Get a cached OMDb response for the given query parameters."""
+        pass
+
+    @abstractmethod
+    def set(self, params, movie_data, expires_at=None):
+        """Cache an OMDb response for the given query parameters, until `expires_at` if given."""
+        pass
+
+    @abstractmethod
+    def clear(self):
+        """Remove all entries from the cache."""
+        pass
+
+    @abstractmethod
+    def __len__(self):
+        pass
+
+
+class MemoryLookupCache(LookupCacheInterface):
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_size=1024, ttl=86400, negative_ttl=3600):
+        """
+        Initializes an empty LRU cache.
+
+        :param max_size: Maximum number of entries before the least recently used is evicted.
+        :type max_size: int
+        """
+        super().__init__(ttl, negative_ttl)
+        self.max_size = max_size
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, params) -> Union[dict, None]:
+        """
+        Return the cached response for the given query parameters.
+
+        :param params: Query parameters of the OMDb request.
+        :type params: dict
+
+        :return: The cached OMDb response, or None if it is missing or expired.
+        :rtype: Union[dict, None]
+        """
+        key = self.make_key(params)
+        movie_data = None
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            # Is entry cached and still fresh? -> Mark as most recently used
+            if entry:
+                expires_at, cached_data = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    movie_data = cached_data
+                else:
+                    del self._entries[key]
+
+        self.record_lookup(movie_data)
+        return movie_data
+
+    def set(self, params, movie_data, expires_at=None):
+        """
+        Cache the response for the given query parameters, evicting the oldest entry if full.
+
+        :param params: Query parameters of the OMDb request.
+        :type params: dict
+
+        :param movie_data: The decoded OMDb response.
+        :type movie_data: dict
+
+        :param expires_at: Absolute expiry timestamp, e.g. of an entry copied from another tier.
+                           Defaults to the TTL of the response's outcome.
+        :type expires_at: float
+        """
+        if not self.is_cacheable(movie_data):
+            return
+
+        key = self.make_key(params)
+        with self._lock:
+            self._entries[key] = (expires_at or self.expiry_for(movie_data), movie_data)
+            self._entries.move_to_end(key)
+
+            # Is cache over capacity? -> Evict least recently used entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return the counters of the cache including the number of evictions."""
+        return {**super().stats(), "evictions": self.evictions}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteLookupCache(LookupCacheInterface):
+    """On-disk cache that keeps OMDb responses across restarts"""
+
+    def __init__(self, path, ttl=86400, negative_ttl=3600):
+        """
+        Opens (and creates if needed) the SQLite file backing the cache.
+
+        :param path: Path of the SQLite cache file.
+        :type path: str
+        """
+        super().__init__(ttl, negative_ttl)
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS lookup_cache ("
+                                 "cache_key TEXT PRIMARY KEY, "
+                                 "payload TEXT NOT NULL, "
+                                 "expires_at REAL NOT NULL)")
+        self._connection.commit()
+
+    def get(self, params) -> Union[dict, None]:
+        """
+        Return the cached response for the given query parameters.
+
+        :param params: Query parameters of the OMDb request.
+        :type params: dict
+
+        :return: The cached OMDb response, or None if it is missing or expired.
+        :rtype: Union[dict, None]
+        """
+        return self.get_entry(params)[0]
+
+    def get_entry(self, params) -> tuple:
+        """
+        Return the cached response for the given query parameters together with its expiry.
+
+        :param params: Query parameters of the OMDb request.
+        :type params: dict
+
+        :return: The cached OMDb response and its expiry timestamp, or (None, None) if it is
+                 missing or expired.
+        :rtype: tuple
+        """
+        key = self.make_key(params)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT payload, expires_at FROM lookup_cache WHERE cache_key = ? AND expires_at > ?",
+                (key, time.time())).fetchone()
+
+        movie_data, expires_at = (json.loads(row[0]), row[1]) if row else (None, None)
+        self.record_lookup(movie_data)
+        return movie_data, expires_at
+
+    def set(self, params, movie_data, expires_at=None):
+        """
+        Cache the response for the given query parameters.
+
+        :param params: Query parameters of the OMDb request.
+        :type params: dict
+
+        :param movie_data: The decoded OMDb response.
+        :type movie_data: dict
+
+        :param expires_at: Absolute expiry timestamp. Defaults to the TTL of the response's outcome.
+        :type expires_at: float
+        """
+        if not self.is_cacheable(movie_data):
+            return
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO lookup_cache (cache_key, payload, expires_at) "
+                "VALUES (?, ?, ?)",
+                (self.make_key(params), json.dumps(movie_data), expires_at or self.expiry_for(movie_data)))
+            self._connection.commit()
+
+    def purge_expired(self) -> int:
+        """
+        Delete all expired entries from the cache file.
+
+        :return: The number of deleted entries.
+        :rtype: int
+        """
+        with self._lock:
+            cursor = self._connection.execute("DELETE FROM lookup_cache WHERE expires_at <= ?",
+                                              (time.time(),))
+            self._connection.commit()
+        return cursor.rowcount
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._connection.execute("DELETE FROM lookup_cache")
+            self._connection.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM lookup_cache").fetchone()[0]
+
+
+class TieredLookupCache(LookupCacheInterface):
+    """Two-level cache: an in-process LRU in front of a persistent SQLite tier"""
+
+    def __init__(self, memory_cache, disk_cache):
+        """
+        Initializes the tiers of the cache.
+
+        :param memory_cache: The fast, bounded first tier.
+        :type memory_cache: MemoryLookupCache
+
+        :param disk_cache: The persistent second tier.
+        :type disk_cache: SQLiteLookupCache
+        """
+        super().__init__(memory_cache.ttl, memory_cache.negative_ttl)
+        self.memory_cache = memory_cache
+        self.disk_cache = disk_cache
+
+    def get(self, params) -> Union[dict, None]:
+        """
+        Return the cached response from the first tier that has it.
+
+        Entries found on disk are promoted into memory, keeping their expiry on disk.
+
+        :param params: Query parameters of the OMDb request.
+        :type params: dict
+
+        :return: The cached OMDb response, or None if no tier has it.
+        :rtype: Union[dict, None]
+        """
+        movie_data = self.memory_cache.get(params)
+
+        # Is entry not in memory? -> Try disk and promote on hit, for its remaining time only
+        if movie_data is None:
+            movie_data, expires_at = self.disk_cache.get_entry(params)
+            if movie_data is not None:
+                self.memory_cache.set(params, movie_data, expires_at)
+
+        self.record_lookup(movie_data)
+        return movie_data
+
+    def set(self, params, movie_data, expires_at=None):
+        """Cache the response in both tiers, with the same expiry."""
+        expires_at = expires_at or self.expiry_for(movie_data)
+        self.memory_cache.set(params, movie_data, expires_at)
+        self.disk_cache.set(params, movie_data, expires_at)
+
+    def clear(self):
+        """Remove all entries from both tiers."""
+        self.memory_cache.clear()
+        self.disk_cache.clear()
+
+    def stats(self) -> dict:
+        """Return the overall counters together with the counters of each tier."""
+        return {**super().stats(),
+                "memory": self.memory_cache.stats(),
+                "disk": self.disk_cache.stats()}
+
+    def __len__(self):
+        return len(self.disk_cache)
@@ -0,0 +1,63 @@
+import os
+from dotenv import load_dotenv
+from .catalog import LocalCatalog
+from .client import CircuitBreaker, OMDbClient
+from .lookup import MovieLookup
+from .lookup_cache import MemoryLookupCache, SQLiteLookupCache, TieredLookupCache
+
+# --- Load environment variables ---
+load_dotenv()
+
+# --- URLs for API Access ---
+API_KEY = os.environ.get("MY_API_KEY")
+# Point OMDB_BASE_URL at a local stub server to run without the real OMDb API
+OMDB_BASE_URL = os.environ.get("OMDB_BASE_URL", "http://www.omdbapi.com/")
+FETCH_MOVIE_URL = f"{OMDB_BASE_URL}?apikey={API_KEY}"
+
+# --- OMDb Client Config ---
+OMDB_CONNECT_TIMEOUT = float(os.environ.get("OMDB_CONNECT_TIMEOUT", 3.05))
+OMDB_READ_TIMEOUT = float(os.environ.get("OMDB_READ_TIMEOUT", 10))
+OMDB_MAX_RETRIES = int(os.environ.get("OMDB_MAX_RETRIES", 2))
+OMDB_POOL_SIZE = int(os.environ.get("OMDB_POOL_SIZE", 10))
+OMDB_BREAKER_THRESHOLD = int(os.environ.get("OMDB_BREAKER_THRESHOLD", 5))
+OMDB_BREAKER_RESET = float(os.environ.get("OMDB_BREAKER_RESET", 30))
+OMDB_LOOKUP_WORKERS = int(os.environ.get("OMDB_LOOKUP_WORKERS", 8))
+
+# --- OMDb Lookup Cache Config ---
+OMDB_CACHE_SIZE = int(os.environ.get("OMDB_CACHE_SIZE", 1024))
+OMDB_CACHE_TTL = int(os.environ.get("OMDB_CACHE_TTL", 60 * 60 * 24))
+OMDB_NEGATIVE_CACHE_TTL = int(os.environ.get("OMDB_NEGATIVE_CACHE_TTL", 60 * 60))
+# Set to e.g. "user_data/omdb_cache.sqlite" to keep lookups across restarts
+OMDB_CACHE_PATH = os.environ.get("OMDB_CACHE_PATH")
+# Set to a catalog imported with `python -m omdb.catalog` to resolve movies offline first
+OMDB_CATALOG_PATH = os.environ.get("OMDB_CATALOG_PATH")
+
+
+def make_movie_lookup(latency_histogram=None) -> MovieLookup:
+    """
+    Build the movie lookup of the settings above: local catalog, lookup cache and OMDb client.
+
+    Used by the app and by command line tools, which resolve movies the same way without
+    starting the app.
+
+    :param latency_histogram: Optional histogram observing the latency of every OMDb request.
+    :type latency_histogram: metrics.Histogram
+
+    :rtype: MovieLookup
+    """
+    omdb_client = OMDbClient(connect_timeout=OMDB_CONNECT_TIMEOUT,
+                             read_timeout=OMDB_READ_TIMEOUT,
+                             max_retries=OMDB_MAX_RETRIES,
+                             pool_size=OMDB_POOL_SIZE,
+                             circuit_breaker=CircuitBreaker(OMDB_BREAKER_THRESHOLD, OMDB_BREAKER_RESET),
+                             latency_histogram=latency_histogram)
+
+    lookup_cache = MemoryLookupCache(OMDB_CACHE_SIZE, OMDB_CACHE_TTL, OMDB_NEGATIVE_CACHE_TTL)
+    if OMDB_CACHE_PATH:
+        lookup_cache = TieredLookupCache(lookup_cache,
+                                         SQLiteLookupCache(OMDB_CACHE_PATH, OMDB_CACHE_TTL,
+                                                           OMDB_NEGATIVE_CACHE_TTL))
+
+    catalog = LocalCatalog(OMDB_CATALOG_PATH) if OMDB_CATALOG_PATH else None
+
+    return MovieLookup(FETCH_MOVIE_URL, omdb_client, lookup_cache, OMDB_LOOKUP_WORKERS, catalog)
@@ -0,0 +1,110 @@
+import threading
+from functools import wraps
+from flask import g, request
+from data_manager.caching_data_manager import TaggedCache
+
+
+class PageCache:
+    """
+    Cache for rendered pages, keyed by route and arguments and invalidated by tags.
+
+    Pages are tagged with the data they show, using the same tags as `CachingDataManager`
+    (users, user:<user_id>, movie:<movie_id>, reviews:<movie_id>). Write routes invalidate the
+    tags they affect. On a miss only one request per page renders it, concurrent requests for
+    the same page wait for that render instead of rendering it again. With an invalidation bus,
+    pages are also dropped when other workers invalidate their tags.
+    """
+
+    def __init__(self, max_size=256, ttl=60, invalidation_bus=None):
+        """
+        Initializes an empty page cache.
+
+        :param max_size: Maximum number of cached pages.
+        :type max_size: int
+
+        :param ttl: Seconds a cached page stays valid.
+        :type ttl: float
+
+        :param invalidation_bus: Optional bus sharing invalidations with other workers, e.g. the
+                                 versions of the database.
+        :type invalidation_bus: SQLiteDataVersions
+        """
+        self.cache = TaggedCache(max_size, ttl)
+        self.invalidation_bus = invalidation_bus
+        self._render_locks = {}
+        self._render_locks_lock = threading.Lock()
+
+    @staticmethod
+    def tag(*tags):
+        """Add tags to the page rendered by the current request, e.g. the IDs of shown movies."""
+        g.setdefault("page_tags", set()).update(tags)
+
+    def invalidate(self, *tags):
+        """Remove all cached pages carrying any of the given tags, here and in other workers."""
+        self.cache.invalidate(tags)
+        if self.invalidation_bus:
+            self.invalidation_bus.publish(tags)
+
+    def _poll(self):
+        """Drop the pages other workers invalidated since the last poll."""
+        if self.invalidation_bus:
+            published_tags = self.invalidation_bus.poll()
+            if published_tags:
+                self.cache.invalidate(published_tags)
+
+    def _acquire_render_lock(self, key) -> list:
+        """Return the render lock of a page, registering this request as one of its users."""
+        with self._render_locks_lock:
+            render_lock = self._render_locks.setdefault(key, [threading.Lock(), 0])
+            render_lock[1] += 1
+        render_lock[0].acquire()
+        return render_lock
+
+    def _release_render_lock(self, key, render_lock):
+        """Release the render lock of a page and forget it once no request uses it."""
+        render_lock[0].release()
+        with self._render_locks_lock:
+            render_lock[1] -= 1
+            if not render_lock[1]:
+                del self._render_locks[key]
+
+    def cached(self, tags=None):
+        """
+        Decorate a GET view so its rendered page is served from the cache.
+
+        Only successful pages (views returning a string) are cached; aborted requests and
+        other responses are passed through.
+
+        :param tags: Function receiving the view arguments and returning the page's tags.
+        :type tags: function
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**view_args):
+                if request.method != "GET":
+                    return view(**view_args)
+
+                self._poll()
+                key = (request.endpoint, tuple(sorted(view_args.items())), request.query_string)
+                is_hit, page = self.cache.get(key)
+                if is_hit:
+                    return page
+
+                render_lock = self._acquire_render_lock(key)
+                try:
+                    # Did another request render the page while we waited? -> Serve it
+                    is_hit, page = self.cache.get(key)
+                    if is_hit:
+                        return page
+
+                    generation = self.cache.generation
+                    g.page_tags = set(tags(**view_args)) if tags else set()
+                    page = view(**view_args)
+                    if isinstance(page, str):
+                        self.cache.set(key, page, g.page_tags, generation)
+                    return page
+                finally:
+                    self._release_render_lock(key, render_lock)
+
+            return wrapper
+        return decorator
@@ -0,0 +1,58 @@
+import importlib
+import os
+import sys
+import threading
+import zlib
+import pytest
+from flask import Flask
+from benchmarks.omdb_stub import OMDbStub, make_server
+from data_manager.sql_data_manager import SQLiteDataManager
+
+
+def movie_data(title, year=2000, rating="7.5", director="Jane Doe", imdb_id=None) -> dict:
+    """Return OMDb-shaped data of a movie, as the data managers receive it."""
+    return {"Title": title, "Year": str(year), "imdbRating": rating, "Director": director,
+            "imdbID": imdb_id or f"tt{zlib.crc32(f'{title} {year}'.encode()) % 10 ** 7:07d}"}
+
+
+@pytest.fixture
+def sql_app(tmp_path):
+    """A Flask app bound to a fresh, migrated SQLite database, inside its app context."""
+    app = Flask(__name__)
+    data_manager = SQLiteDataManager(app, f"sqlite:///{tmp_path / 'movies.sqlite'}", pool_size=1)
+    with app.app_context():
+        yield app, data_manager
+
+
+@pytest.fixture(scope="session")
+def omdb_stub():
+    """A local OMDb stub answering every title with a synthetic movie, and its URL."""
+    stub = OMDbStub(seed=1)
+    server = make_server(stub, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield stub, f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+
+
+@pytest.fixture(scope="session")
+def web_app(tmp_path_factory, omdb_stub):
+    """
+    The app of app.py on a fresh database, looking up movies from the OMDb stub.
+
+    The app is configured from the environment when config is first imported, so it is shared
+    by all tests of a session: tests add their own users instead of expecting an empty database.
+    """
+    path = tmp_path_factory.mktemp("web")
+    os.environ.update(DATABASE_URI=f"sqlite:///{path / 'movies.sqlite'}", OMDB_BASE_URL=omdb_stub[1],
+                      MY_API_KEY="test")
+    # Were OMDb settings read while collecting tests (e.g. by the backfill)? -> Read them again
+    if "omdb.settings" in sys.modules:
+        importlib.reload(sys.modules["omdb.settings"])
+    from app import app
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def client(web_app):
+    return web_app.test_client()
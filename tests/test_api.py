@@ -0,0 +1,146 @@
+import json
+import pytest
+from omdb.lookup_cache import LookupCacheInterface
+from tests.conftest import movie_data
+
+
+def add_user(web_app, name, movie_count=0) -> int:
+    """Add a user with `movie_count` favorites through the app's data manager and return its ID."""
+    from config import data_manager
+    with web_app.app_context():
+        data_manager.add_user(name)
+        user_id = max(data_manager.get_all_users(), key=int)
+        for number in range(movie_count):
+            data_manager.add_movie(user_id, movie_data(f"{name} Movie {number}"))
+    return int(user_id)
+
+
+def test_etag_answers_304_for_the_same_representation_only(web_app, client):
+    user_id = add_user(web_app, "Etag", movie_count=3)
+
+    page = client.get("/api/users")
+    etag = page.headers["ETag"]
+    assert "Accept" in page.headers["Vary"]
+    assert client.get("/api/users", headers={"If-None-Match": etag}).status_code == 304
+
+    # Other pages and formats of the same data -> Their own ETags
+    for variant in ({"query_string": {"limit": 1}},
+                    {"query_string": {"stream": 1}},
+                    {"headers": {"Accept": "application/x-ndjson"}}):
+        variant.setdefault("headers", {})["If-None-Match"] = etag
+        response = client.get("/api/users", **variant)
+        response.get_data()
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    # Defaults spelled out -> Same representation
+    assert client.get("/api/users", query_string={"limit": 50},
+                      headers={"If-None-Match": etag}).status_code == 304
+
+    movies_etag = client.get(f"/api/users/{user_id}/movies").headers["ETag"]
+    assert client.get(f"/api/users/{user_id}/movies", query_string={"sort": "year"},
+                      headers={"If-None-Match": movies_etag}).status_code == 200
+    assert client.get(f"/api/users/{user_id}/movies",
+                      headers={"If-None-Match": movies_etag}).status_code == 304
+
+
+@pytest.mark.parametrize("path", ["/api/users?stream=1", "/api/users?format=ndjson"])
+def test_user_exports_stream_every_user(web_app, client, path):
+    add_user(web_app, "Streamed")
+    response = client.get(path)
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    if "ndjson" in path:
+        assert response.mimetype == "application/x-ndjson"
+        users = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert "Streamed" in [user["name"] for user in users]
+    else:
+        assert "Streamed" in [user["name"] for user in response.get_json().values()]
+
+
+def test_adding_a_movie_without_a_name_is_rejected(web_app, client, omdb_stub):
+    user_id = add_user(web_app, "Nameless")
+    stub, _ = omdb_stub
+    requests_before = stub.requests
+
+    response = client.post(f"/users/{user_id}/add_movie", data={"movie_name": "  "})
+
+    assert response.status_code == 400
+    assert stub.requests == requests_before
+
+
+def test_batch_import_reports_a_status_per_item(web_app, client, omdb_stub):
+    user_id = add_user(web_app, "Batch")
+    stub, _ = omdb_stub
+    stub.recordings[LookupCacheInterface.make_key({"t": "Batch Unfinished"})] = {
+        **movie_data("Batch Unfinished"), "Year": "N/A", "Response": "True"}
+
+    response = client.post(f"/api/users/{user_id}/movies/batch",
+                           json={"movies": ["Batch Heat", "batch heat", "Batch Unfinished", "", 42]})
+    assert response.status_code == 200
+    assert response.get_json()["added"] == 1
+    assert [item["status"] for item in response.get_json()["results"]] == \
+        ["added", "duplicate", "incomplete", "invalid", "invalid"]
+
+    # Unknown title -> Not found, known title -> Duplicate on a second batch
+    stub.synthetic = False
+    try:
+        response = client.post(f"/api/users/{user_id}/movies/batch", json=["Batch Nowhere", "Batch Heat"])
+    finally:
+        stub.synthetic = True
+    assert [item["status"] for item in response.get_json()["results"]] == ["not_found", "duplicate"]
+    assert response.get_json()["added"] == 0
+
+
+@pytest.mark.parametrize("payload", [[], {"movies": "Heat"}, None])
+def test_batch_import_rejects_anything_but_a_list(web_app, client, payload):
+    user_id = add_user(web_app, "Batch Rejected")
+
+    response = client.post(f"/api/users/{user_id}/movies/batch", json=payload)
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("path", ["/api/users?stream=1", "/api/users?format=ndjson"])
+def test_streamed_exports_stay_valid_across_batches(web_app, client, monkeypatch, path):
+    import api
+    for number in range(5):
+        add_user(web_app, f"Batched {number}")
+    monkeypatch.setattr(api, "STREAM_BATCH_SIZE", 2)
+    from config import data_manager
+    with web_app.app_context():
+        expected = {str(user_id): user["name"] for user_id, user in data_manager.iter_users()}
+
+    body = client.get(path).get_data(as_text=True)
+
+    if "ndjson" in path:
+        users = {str(user.pop("id")): user for user in map(json.loads, body.splitlines())}
+    else:
+        users = json.loads(body)
+    assert {user_id: user["name"] for user_id, user in users.items()} == expected
+
+
+def test_added_movies_are_suggested(web_app, client):
+    user_id = add_user(web_app, "Suggest")
+    client.post(f"/api/users/{user_id}/movies/batch", json=["Suggestible One", "Suggestible Two"])
+
+    assert client.get("/api/movies/suggest", query_string={"q": "suggestible"}).get_json() == \
+        ["Suggestible One", "Suggestible Two"]
+    assert client.get("/api/movies/suggest", query_string={"q": "Suggestible", "limit": 1}).get_json() == \
+        ["Suggestible One"]
+    assert client.get("/api/movies/suggest").get_json() == []
+
+
+def test_metrics_expose_requests_and_omdb_latency(web_app, client):
+    user_id = add_user(web_app, "Measured")
+    client.post(f"/api/users/{user_id}/movies/batch", json=["Measured Movie"])
+    client.get(f"/api/users/{user_id}/movies")
+
+    response = client.get("/metrics")
+    body = response.get_data(as_text=True)
+
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/users/<user_id>/movies",' \
+           'status="200"}' in body
+    assert 'omdb_request_duration_seconds_count{outcome="success"}' in body
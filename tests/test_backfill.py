@@ -0,0 +1,54 @@
+from sqlalchemy import text
+from data_manager.backfill import backfill_imdb_ids
+from tests.conftest import movie_data
+
+
+class FakeLookup:
+    """Movie lookup answering from a dictionary of title -> OMDb response."""
+
+    max_workers = 2
+
+    def __init__(self, movies):
+        self.movies = movies
+        self.requests = []
+
+    def fetch_data(self, params):
+        self.requests.append(params)
+        movie = self.movies.get(params["t"])
+        return (movie, True) if movie else (None, False)
+
+
+def test_backfill_updates_merges_and_skips_movies(sql_app):
+    app, data_manager = sql_app
+    data_manager.add_user("Alice")
+    user_id = max(data_manager.get_all_users())
+    for title, imdb_id in (("Heat", "tt0113277"), ("Heat Copy", "tt0000001"), ("Alien", "tt0078748"),
+                           ("Unknown", "tt0000002"), ("Ronin", "tt0122690")):
+        data_manager.add_movie(user_id, movie_data(title, year=1995, imdb_id=imdb_id))
+
+    with data_manager.engine.begin() as connection:
+        movie_ids = dict(connection.execute(text("SELECT title, movie_id FROM movie")).all())
+        # Rows stored before IMDb IDs were kept, "Heat Copy" being a second row of "Heat"
+        connection.execute(text("UPDATE movie SET imdb_id = NULL WHERE title != 'Heat'"))
+    data_manager.add_review(user_id, movie_ids["Heat Copy"], "Still great")
+
+    lookup = FakeLookup({
+        "Heat Copy": movie_data("Heat", year=1995, imdb_id="tt0113277"),
+        "Alien": movie_data("Alien", year=1995, imdb_id="tt0078748"),
+        # Another movie of the same title -> Not this one
+        "Ronin": movie_data("Ronin", year=2020, imdb_id="tt9999999"),
+    })
+    counts = backfill_imdb_ids(data_manager.engine, lookup, batch_size=2)
+
+    assert counts == {"updated": 1, "merged": 1, "not_found": 2}
+    assert {"t": "Alien", "y": "1995"} in lookup.requests
+    with data_manager.engine.connect() as connection:
+        imdb_ids = dict(connection.execute(text("SELECT title, imdb_id FROM movie")).all())
+        review_movie_ids = connection.execute(text("SELECT movie_id FROM review")).scalars().all()
+    assert imdb_ids == {"Heat": "tt0113277", "Alien": "tt0078748", "Unknown": None, "Ronin": None}
+    assert review_movie_ids == [movie_ids["Heat"]]
+
+    # Run again -> Only the unresolved movies are looked up
+    lookup.requests.clear()
+    assert backfill_imdb_ids(data_manager.engine, lookup) == {"updated": 0, "merged": 0, "not_found": 2}
+    assert sorted(params["t"] for params in lookup.requests) == ["Ronin", "Unknown"]
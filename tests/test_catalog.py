@@ -0,0 +1,74 @@
+import json
+from omdb.catalog import LocalCatalog
+from omdb.lookup import MovieLookup
+
+
+class FakeCache:
+    """Lookup cache that never has an answer."""
+
+    def get(self, params):
+        return None
+
+    def set(self, params, movie_data):
+        pass
+
+
+class FakeClient:
+    """OMDb client answering every request with a complete movie."""
+
+    def __init__(self):
+        self.requests = []
+
+    def get_json(self, url, params):
+        self.requests.append(params)
+        return {"Title": "Heat", "Year": "1995", "Director": "Michael Mann", "imdbRating": "8.3",
+                "imdbID": "tt0113277", "Response": "True"}
+
+
+def make_catalog(tmp_path, *records):
+    dump_path = tmp_path / "dump.jsonl"
+    dump_path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    catalog = LocalCatalog(str(tmp_path / "catalog.sqlite"))
+    catalog.import_dump(str(dump_path))
+    return catalog
+
+
+def test_catalog_answers_complete_movies_by_id_and_title(tmp_path):
+    catalog = make_catalog(
+        tmp_path,
+        {"imdbID": "tt0113277", "Title": "Heat", "Year": "1995", "Director": "Michael Mann",
+         "imdbRating": "8.3", "imdbVotes": "700,000"},
+        {"imdbID": "tt9999999", "Title": "Heat", "Year": "2024", "Director": "Jane Doe",
+         "imdbRating": "5.0", "imdbVotes": "12"})
+
+    assert catalog.get({"i": "tt0113277"})["Year"] == "1995"
+    assert catalog.get({"t": "  HEAT "})["imdbID"] == "tt0113277"
+    assert catalog.get({"t": "heat", "y": "2024"})["imdbID"] == "tt9999999"
+    assert catalog.stats() == {"hits": 3, "misses": 0, "size": 2}
+
+
+def test_import_skips_incomplete_records(tmp_path):
+    dump_path = tmp_path / "dump.jsonl"
+    dump_path.write_text(json.dumps({"imdbID": "tt0113277", "Title": "Heat", "Year": "1995",
+                                     "Director": "Michael Mann", "imdbRating": "8.3"}) + "\n"
+                         + json.dumps({"imdb_id": "tt0000001", "title": "No Director", "year": "1995",
+                                       "director": "N/A", "rating": "5.0"}) + "\n")
+    catalog = LocalCatalog(str(tmp_path / "catalog.sqlite"))
+
+    assert catalog.import_dump(str(dump_path)) == {"imported": 1, "skipped": 1}
+    assert catalog.stats()["size"] == 1
+
+
+def test_incomplete_catalog_rows_fall_through_to_omdb(tmp_path):
+    catalog = LocalCatalog(str(tmp_path / "catalog.sqlite"))
+    # Row of a catalog imported before incomplete records were skipped
+    catalog._connection.execute("INSERT INTO catalog (imdb_id, title, normalized_title, year, rating) "
+                                "VALUES ('tt0113277', 'Heat', 'heat', '1995', '8.3')")
+    client = FakeClient()
+    lookup = MovieLookup("https://omdb.example", client, FakeCache(), catalog=catalog)
+
+    movie_data, is_found = lookup.fetch_data({"t": "Heat"})
+
+    assert is_found and movie_data["Director"] == "Michael Mann"
+    assert client.requests == [{"t": "Heat"}]
+    assert catalog.stats()["misses"] == 1
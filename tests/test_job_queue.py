@@ -0,0 +1,111 @@
+import threading
+import time
+import pytest
+from job_queue import JobQueue, MemoryJobStore, PENDING_STATUSES, SQLiteJobStore
+
+
+def wait_for(queue, job_id, timeout=5.0) -> dict:
+    """Wait until a job has finished and return it."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] not in PENDING_STATUSES:
+            return job
+        time.sleep(0.01)
+    raise TimeoutError(f"Job {job_id} didn't finish")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    return MemoryJobStore() if request.param == "memory" else SQLiteJobStore(str(tmp_path / "jobs.sqlite"))
+
+
+def handle(payload):
+    if payload["movie_name"] == "Heat":
+        return "added", {"title": "Heat"}
+    if payload["movie_name"] == "Broken":
+        raise RuntimeError("OMDb answered garbage")
+    return "not_found"
+
+
+def test_jobs_finish_with_the_status_of_their_handler(store):
+    queue = JobQueue(handle, store, workers=2, poll_interval=0.01)
+    queue.start()
+    try:
+        added, not_found, failed = (queue.submit({"movie_name": name}) for name in ("Heat", "Nope", "Broken"))
+
+        assert wait_for(queue, added)["result"] == {"title": "Heat"}
+        assert wait_for(queue, not_found)["status"] == "not_found"
+        assert wait_for(queue, failed)["status"] == "failed"
+        assert wait_for(queue, failed)["result"] == {"error": "OMDb answered garbage"}
+        assert queue.get("unknown") is None
+        assert store.pending() == 0
+    finally:
+        queue.stop()
+
+
+def test_queues_sharing_a_store_file_run_every_job_once(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    runs = []
+    runs_lock = threading.Lock()
+
+    def record(payload):
+        with runs_lock:
+            runs.append(payload["number"])
+        return "added"
+
+    queues = [JobQueue(record, SQLiteJobStore(path), workers=3, poll_interval=0.01) for _ in range(2)]
+    job_ids = [queues[number % 2].submit({"number": number}) for number in range(40)]
+    for queue in queues:
+        queue.start()
+    try:
+        for job_id in job_ids:
+            wait_for(queues[0], job_id)
+    finally:
+        for queue in queues:
+            queue.stop()
+
+    assert sorted(runs) == list(range(40))
+
+
+def test_abandoned_jobs_are_queued_again(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / "jobs.sqlite"), stale_after=0.1)
+    store.add("job", {"movie_name": "Heat"})
+
+    # Claimed by a worker that crashes -> Nobody touches or finishes the job
+    assert store.claim()["id"] == "job"
+    assert store.claim() is None
+    time.sleep(0.2)
+    assert store.claim()["id"] == "job"
+
+
+def test_heartbeat_keeps_slow_jobs_from_being_queued_again(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    started = threading.Event()
+    runs = []
+
+    def slow(payload):
+        runs.append(payload)
+        started.set()
+        time.sleep(0.6)
+        return "added"
+
+    queue = JobQueue(slow, SQLiteJobStore(path, stale_after=0.2), workers=1, poll_interval=0.01,
+                     heartbeat_interval=0.05)
+    queue.start()
+    try:
+        job_id = queue.submit({"movie_name": "Heat"})
+        assert started.wait(5)
+
+        # Another process polling the same file -> The running job is never up for grabs
+        other_store = SQLiteJobStore(path, stale_after=0.2)
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            assert other_store.claim() is None
+            time.sleep(0.02)
+
+        assert wait_for(queue, job_id)["status"] == "added"
+    finally:
+        queue.stop()
+
+    assert len(runs) == 1
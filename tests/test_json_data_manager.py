@@ -0,0 +1,109 @@
+import os
+import stat
+import subprocess
+import sys
+import pytest
+from data_manager.json_data_manager import JournaledJSONDataManager, JSONDataManager, file_mode, proc_umask
+
+
+def mode_of(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_write_json_keeps_the_permissions_of_the_file(tmp_path):
+    filename = tmp_path / "movie_data.json"
+    filename.write_text("{}")
+    os.chmod(filename, 0o644)
+
+    JSONDataManager.write_json(str(filename), {"1": {"name": "Alice", "movies": {}}})
+
+    assert mode_of(filename) == 0o644
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_write_json_creates_new_files_like_open_would(tmp_path):
+    umask = os.umask(0o022)
+    try:
+        JSONDataManager.write_json(str(tmp_path / "new.json"), {})
+    finally:
+        os.umask(umask)
+
+    assert mode_of(tmp_path / "new.json") == 0o644
+
+
+def journaled(tmp_path, **kwargs):
+    filename = tmp_path / "movie_data.json"
+    if not filename.exists():
+        filename.write_text("{}")
+    return JournaledJSONDataManager(str(filename), **kwargs)
+
+
+def names(data_manager):
+    return sorted(user["name"] for user in data_manager.get_all_users().values())
+
+
+def test_journal_replays_over_the_snapshot(tmp_path):
+    data_manager = journaled(tmp_path)
+    data_manager.add_user("Alice")
+    data_manager.add_user("Bob")
+
+    assert names(journaled(tmp_path)) == ["Alice", "Bob"]
+    assert (tmp_path / "movie_data.json").read_text() == "{}"
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(tmp_path):
+    data_manager = journaled(tmp_path, compaction_threshold=1)
+    data_manager.add_user("Alice")
+
+    assert (tmp_path / "movie_data.json.journal").read_bytes() == b""
+    assert names(journaled(tmp_path)) == ["Alice"]
+
+
+def test_torn_journal_line_is_dropped_before_the_next_append(tmp_path):
+    journaled(tmp_path).add_user("Alice")
+    # A crash cut the next append short
+    with open(tmp_path / "movie_data.json.journal", "ab") as journal:
+        journal.write(b'{"op": "add_user", "user_id": "x", "na')
+
+    data_manager = journaled(tmp_path)
+    assert names(data_manager) == ["Alice"]
+    data_manager.add_user("Bob")
+
+    assert names(journaled(tmp_path)) == ["Alice", "Bob"]
+    assert (tmp_path / "movie_data.json.journal").read_bytes().endswith(b"}\n")
+
+
+
+def test_append_of_another_process_between_replay_and_append_is_kept(tmp_path, monkeypatch):
+    data_manager = journaled(tmp_path)
+    data_manager.add_user("Alice")
+    other_process = None
+    replay = data_manager.get_all_users
+
+    def replay_then_let_other_process_append():
+        nonlocal other_process
+        all_users = replay()
+        if other_process is None:
+            other_process = subprocess.Popen(
+                [sys.executable, "-c", "import sys; from data_manager.json_data_manager import "
+                                       "JournaledJSONDataManager as Manager; "
+                                       "Manager(sys.argv[1]).add_user('Carol')",
+                 str(tmp_path / "movie_data.json")], cwd=os.path.dirname(os.path.dirname(__file__)))
+            # Holding the journal lock -> The other process waits for it, otherwise it appends now
+            try:
+                other_process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                pass
+        return all_users
+
+    monkeypatch.setattr(data_manager, "get_all_users", replay_then_let_other_process_append)
+    data_manager.add_user("Bob")
+    assert other_process.wait(timeout=10) == 0
+
+    assert names(journaled(tmp_path)) == ["Alice", "Bob", "Carol"]
+
+
+def test_new_file_mode_leaves_the_umask_alone(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "umask", lambda mask: pytest.fail("umask changed"))
+
+    assert file_mode(str(tmp_path / "new.json")) == 0o666 & ~proc_umask()
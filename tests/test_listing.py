@@ -0,0 +1,76 @@
+import pytest
+from data_manager.listing import MovieQuery, SORT_FIELDS, decode_cursor, encode_cursor, page_by_key
+from tests.conftest import movie_data
+
+# Title, year and rating of movies with ties and a missing rating
+MOVIES = [("Heat", 1995, "8.3"), ("Alien", 1979, "8.5"), ("Up", 2009, "8.3"), ("Brazil", 1985, "7.9"),
+          ("Ran", 1985, "8.2"), ("Cube", 1997, "7.2"), ("Zodiac", 2007, None)]
+ORDERS = [(sort, descending) for sort in SORT_FIELDS for descending in (False, True)]
+
+
+def walk(load_page, sort, descending, limit=2) -> list:
+    """Follow the cursors of a listing from its first page to its last."""
+    movie_ids, after = [], None
+    while True:
+        query = MovieQuery(sort=sort, descending=descending, after=after, limit=limit)
+        page = load_page(query)
+        movie_ids.extend(page)
+        after = query.next_cursor(page)
+        if after is None:
+            return movie_ids
+
+
+@pytest.fixture
+def sql_movies(sql_app):
+    app, data_manager = sql_app
+    data_manager.add_user("Alice")
+    user_id = next(iter(data_manager.get_all_users()))
+    for title, year, rating in MOVIES:
+        data_manager.add_movie(user_id, movie_data(title, year, rating or "1.0"))
+
+    movies = data_manager.get_username_and_movies(user_id)[1]
+    zodiac_id = next(movie_id for movie_id, movie in movies.items() if movie["title"] == "Zodiac")
+    data_manager.update_user_movies(user_id, zodiac_id, {"rating": None})
+    return data_manager, user_id
+
+
+@pytest.mark.parametrize("sort, descending", ORDERS)
+def test_sql_cursors_walk_every_movie_once_in_order(sql_movies, sort, descending):
+    data_manager, user_id = sql_movies
+    everything = data_manager.get_username_and_movies(user_id, MovieQuery(sort, descending))[1]
+
+    walked = walk(lambda query: data_manager.get_username_and_movies(user_id, query)[1], sort, descending)
+
+    assert walked == list(everything)
+    assert len(walked) == len(MOVIES)
+
+
+@pytest.mark.parametrize("sort, descending", ORDERS)
+def test_in_memory_cursors_walk_every_movie_once_in_order(sort, descending):
+    movies = {f"id-{index}": {"title": title, "year": year, "rating": float(rating) if rating else None}
+              for index, (title, year, rating) in enumerate(MOVIES)}
+    everything = MovieQuery(sort, descending).apply(movies)
+
+    walked = walk(lambda query: query.apply(movies), sort, descending)
+
+    assert walked == list(everything)
+    assert len(walked) == len(MOVIES)
+    # Missing values sort first, like NULLs in SQLite
+    if sort == "rating":
+        assert walked[-1 if descending else 0] == "id-6"
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    assert decode_cursor(encode_cursor("Heat", 7)) == ("Heat", 7)
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor")
+    with pytest.raises(ValueError):
+        MovieQuery(sort="year", after=encode_cursor("Heat", 7))
+
+
+def test_page_by_key_continues_after_the_last_key():
+    users = {str(user_id): {"name": f"user {user_id}"} for user_id in range(1, 6)}
+
+    assert list(page_by_key(users, limit=2)) == ["1", "2"]
+    assert list(page_by_key(users, "2", 2)) == ["3", "4"]
+    assert list(page_by_key(users, "4", 2)) == ["5"]
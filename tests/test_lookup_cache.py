@@ -0,0 +1,83 @@
+import time
+import pytest
+from omdb.lookup import MovieLookup
+from omdb.lookup_cache import MemoryLookupCache, SQLiteLookupCache, TieredLookupCache
+from tests.conftest import movie_data
+
+NOT_FOUND = {"Response": "False", "Error": "Movie not found!"}
+
+
+def found(title):
+    return {**movie_data(title), "Response": "True"}
+
+
+@pytest.fixture(params=["memory", "disk", "tiered"])
+def lookup_cache(request, tmp_path):
+    if request.param == "memory":
+        return MemoryLookupCache()
+    disk_cache = SQLiteLookupCache(str(tmp_path / "omdb_cache.sqlite"))
+    return disk_cache if request.param == "disk" else TieredLookupCache(MemoryLookupCache(), disk_cache)
+
+
+def test_lookups_are_cached_under_normalized_keys(lookup_cache):
+    lookup_cache.set({"t": "The  Dark Knight", "apikey": "secret"}, found("The Dark Knight"))
+    lookup_cache.set({"t": "Nope"}, NOT_FOUND)
+    lookup_cache.set({"t": "Limited"}, {"Response": "False", "Error": "Request limit reached!"})
+
+    assert lookup_cache.get({"t": " the dark knight "})["Title"] == "The Dark Knight"
+    assert lookup_cache.get({"t": "nope"}) == NOT_FOUND
+    # Transient errors -> Never cached
+    assert lookup_cache.get({"t": "Limited"}) is None
+    assert {key: lookup_cache.stats()[key] for key in ("hits", "negative_hits", "misses")} == \
+        {"hits": 1, "negative_hits": 1, "misses": 1}
+
+
+def test_negative_lookups_expire_after_their_own_ttl():
+    lookup_cache = MemoryLookupCache(ttl=60, negative_ttl=0.1)
+    lookup_cache.set({"t": "Heat"}, found("Heat"))
+    lookup_cache.set({"t": "Nope"}, NOT_FOUND)
+    time.sleep(0.2)
+
+    assert lookup_cache.get({"t": "Heat"}) is not None
+    assert lookup_cache.get({"t": "Nope"}) is None
+
+
+def test_memory_cache_evicts_the_least_recently_used_entry():
+    lookup_cache = MemoryLookupCache(max_size=2)
+    for title in ("A", "B"):
+        lookup_cache.set({"t": title}, found(title))
+    lookup_cache.get({"t": "A"})
+    lookup_cache.set({"t": "C"}, found("C"))
+
+    assert lookup_cache.get({"t": "B"}) is None
+    assert lookup_cache.get({"t": "A"}) is not None
+    assert lookup_cache.stats()["evictions"] == 1
+
+
+def test_entries_promoted_from_disk_keep_their_expiry(tmp_path):
+    disk_cache = SQLiteLookupCache(str(tmp_path / "omdb_cache.sqlite"))
+    disk_cache.set({"t": "Heat"}, found("Heat"), expires_at=time.time() + 0.2)
+    lookup_cache = TieredLookupCache(MemoryLookupCache(ttl=3600), disk_cache)
+
+    assert lookup_cache.get({"t": "Heat"}) is not None
+    time.sleep(0.3)
+
+    assert lookup_cache.get({"t": "Heat"}) is None
+
+
+class CountingClient:
+    def __init__(self):
+        self.requests = []
+
+    def get_json(self, url, params):
+        self.requests.append(params)
+        return found(params.get("t") or "None")
+
+
+@pytest.mark.parametrize("params", [{"t": None}, {"t": "  "}, {}, {"i": ""}])
+def test_lookups_without_title_or_id_are_rejected(params):
+    client, lookup_cache = CountingClient(), MemoryLookupCache()
+    lookup = MovieLookup("https://omdb.example", client, lookup_cache)
+
+    assert lookup.fetch_data(params) == (None, False)
+    assert client.requests == [] and len(lookup_cache) == 0
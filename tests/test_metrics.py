@@ -0,0 +1,48 @@
+from flask import Flask
+from metrics import MetricsRegistry, instrument_app
+
+
+def test_histogram_renders_cumulative_buckets():
+    metrics = MetricsRegistry()
+    histogram = metrics.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(value, "/users")
+
+    lines = metrics.render().splitlines()
+
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{route="/users",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/users",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/users",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/users"} 4.05' in lines
+    assert 'latency_seconds_count{route="/users"} 4' in lines
+
+
+def test_counters_and_callbacks_render_their_values():
+    metrics = MetricsRegistry()
+    counter = metrics.counter("jobs_total", "Jobs.", ("status",))
+    counter.inc('say "hi"')
+    counter.inc('say "hi"', amount=2)
+    metrics.callback("pending", "Pending.", "gauge", lambda: 7)
+
+    lines = metrics.render().splitlines()
+
+    assert 'jobs_total{status="say \\"hi\\""} 3' in lines
+    assert "# TYPE pending gauge" in lines
+    assert "pending 7" in lines
+
+
+def test_requests_are_recorded_by_route():
+    app = Flask(__name__)
+    metrics = MetricsRegistry()
+    instrument_app(app, metrics.histogram("requests_seconds", "Requests.", ("method", "route", "status")))
+    app.add_url_rule("/users/<user_id>", "user", lambda user_id: user_id)
+
+    client = app.test_client()
+    client.get("/users/1")
+    client.get("/users/2")
+    client.get("/nowhere")
+
+    lines = metrics.render().splitlines()
+    assert 'requests_seconds_count{method="GET",route="/users/<user_id>",status="200"} 2' in lines
+    assert 'requests_seconds_count{method="GET",route="<unmatched>",status="404"} 1' in lines
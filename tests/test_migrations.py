@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import create_engine
+from data_manager.migrations import HOT_QUERIES, MIGRATIONS, check_indexes, explain_query_plan, migrate
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'movies.sqlite'}")
+    migrate(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_migrate_reaches_latest_version(engine):
+    assert migrate(engine) == MIGRATIONS[-1][0]
+
+
+@pytest.mark.parametrize("index_name", HOT_QUERIES)
+def test_hot_query_uses_its_index(engine, index_name):
+    sql, params = HOT_QUERIES[index_name]
+    with engine.connect() as connection:
+        plan = explain_query_plan(connection, sql, params)
+
+    assert any(index_name in step for step in plan), plan
+    # Scanning an index in order is fine for a LIMITed listing, scanning the table is not
+    assert not [step for step in plan if step.startswith("SCAN") and "INDEX" not in step], plan
+    assert not [step for step in plan if "TEMP B-TREE" in step], plan
+
+
+def test_check_indexes_reports_every_hot_query_as_used(engine):
+    assert check_indexes(engine) == {index_name: True for index_name in HOT_QUERIES}
@@ -0,0 +1,139 @@
+import threading
+import time
+import pytest
+from benchmarks.omdb_stub import OMDbStub, make_server
+from omdb.client import CircuitBreaker, OMDbClient, OMDbUnavailableError
+from omdb.lookup import MovieLookup
+from omdb.lookup_cache import MemoryLookupCache
+
+
+@pytest.fixture
+def serve():
+    """Start OMDb stubs on free ports and return the URL of each."""
+    servers = []
+
+    def start(stub):
+        server = make_server(stub, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def make_client(**kwargs) -> OMDbClient:
+    """A client that retries without waiting, so failing tests stay fast."""
+    return OMDbClient(**{"max_retries": 2, "backoff_base": 0, "backoff_cap": 0, **kwargs})
+
+
+def test_successful_request_returns_the_response(serve):
+    stub = OMDbStub(seed=1)
+    url = serve(stub)
+
+    movie = make_client().get_json(url, {"t": "Heat", "apikey": "test"})
+
+    assert movie["Title"] == "Heat"
+    assert stub.requests == 1
+
+
+def test_503_responses_are_retried_then_raise(serve):
+    stub = OMDbStub(error_rate=1.0, seed=1)
+    url = serve(stub)
+    client = make_client()
+
+    with pytest.raises(OMDbUnavailableError):
+        client.get_json(url, {"t": "Heat"})
+    # One attempt plus two retries, counted as one failure by the breaker
+    assert stub.requests == 3
+    assert client.circuit_breaker.failures == 1
+
+
+def test_slow_responses_time_out_and_are_retried(serve):
+    stub = OMDbStub(hang_rate=1.0, hang_seconds=0.5, seed=1)
+    url = serve(stub)
+    client = make_client(read_timeout=0.05, max_retries=1)
+
+    started_at = time.monotonic()
+    with pytest.raises(OMDbUnavailableError):
+        client.get_json(url, {"t": "Heat"})
+
+    assert stub.requests == 2
+    assert time.monotonic() - started_at < 0.5
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    client = OMDbClient(backoff_base=0.2, backoff_cap=0.5)
+
+    delays = [client.backoff_delay(attempt) for attempt in range(10) for _ in range(20)]
+
+    assert all(0 <= delay <= 0.5 for delay in delays)
+    assert len(set(delays)) > 1
+    assert all(client.backoff_delay(0) <= 0.2 for _ in range(20))
+
+
+def test_circuit_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    # Reset timeout passed -> Exactly one trial call
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+
+    # Failed trial -> Open again at once
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+    assert breaker.allow_request()
+
+
+def test_open_circuit_fails_fast_until_the_upstream_recovers(serve):
+    stub = OMDbStub(error_rate=1.0, seed=1)
+    url = serve(stub)
+    client = make_client(max_retries=0, circuit_breaker=CircuitBreaker(2, reset_timeout=0.05))
+
+    for _ in range(2):
+        with pytest.raises(OMDbUnavailableError):
+            client.get_json(url, {"t": "Heat"})
+    assert client.circuit_breaker.state == CircuitBreaker.OPEN
+
+    # Open circuit -> No request reaches the upstream
+    with pytest.raises(OMDbUnavailableError):
+        client.get_json(url, {"t": "Heat"})
+    assert stub.requests == 2
+
+    # Upstream recovered -> The trial call closes the circuit
+    stub.error_rate = 0.0
+    time.sleep(0.06)
+    assert client.get_json(url, {"t": "Heat"})["Title"] == "Heat"
+    assert client.circuit_breaker.state == CircuitBreaker.CLOSED
+    assert stub.requests == 3
+
+
+def test_lookup_caches_responses_but_not_failures(serve):
+    stub = OMDbStub(error_rate=1.0, seed=1)
+    url = serve(stub)
+    lookup = MovieLookup(f"{url}?apikey=test", make_client(max_retries=0), MemoryLookupCache())
+
+    assert lookup.fetch_data({"t": "Heat"}) == (None, False)
+    assert lookup.fetch_data({"t": "Heat"}) == (None, False)
+    assert stub.requests == 2
+
+    stub.error_rate = 0.0
+    movie, success = lookup.fetch_data({"t": "Heat"})
+    assert success and movie["Title"] == "Heat"
+    assert lookup.fetch_data({"t": "heat "})[0] == movie
+    assert stub.requests == 3
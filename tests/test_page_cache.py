@@ -0,0 +1,44 @@
+from flask import Flask
+from data_manager.versioned_data_manager import SQLiteDataVersions
+from page_cache import PageCache
+
+
+def worker_app(page_cache, renders):
+    """An app with one cached page, counting how often it is rendered."""
+    app = Flask(__name__)
+
+    @app.route("/users/<user_id>")
+    @page_cache.cached(tags=lambda user_id: {f"user:{user_id}"})
+    def user_page(user_id):
+        renders.append(user_id)
+        return f"movies of {user_id}"
+
+    return app
+
+
+def test_pages_are_cached_until_their_tags_are_invalidated():
+    page_cache, renders = PageCache(), []
+    client = worker_app(page_cache, renders).test_client()
+
+    client.get("/users/1"), client.get("/users/1"), client.get("/users/2")
+    page_cache.invalidate("user:1")
+    client.get("/users/1"), client.get("/users/2")
+
+    assert renders == ["1", "2", "1"]
+
+
+def test_pages_are_dropped_when_another_worker_writes_their_data(sql_app):
+    app, data_manager = sql_app
+    data_manager.add_user("Alice")
+    user_id = next(iter(data_manager.get_all_users()))
+    page_cache, renders = PageCache(invalidation_bus=SQLiteDataVersions(data_manager.engine)), []
+    client = worker_app(page_cache, renders).test_client()
+
+    client.get(f"/users/{user_id}")
+    client.get(f"/users/{user_id}")
+    # Another worker (or tool) writing to the shared database
+    with data_manager.engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE user SET user = 'Alicia'")
+    client.get(f"/users/{user_id}")
+
+    assert renders == [str(user_id), str(user_id)]
@@ -0,0 +1,33 @@
+import os
+from data_manager.sharded_json_data_manager import ShardedJSONDataManager
+from tests.conftest import movie_data
+
+
+def shard_files(directory):
+    return sorted(name for name in os.listdir(directory / "shards") if name.endswith(".json"))
+
+
+def test_reading_unknown_users_creates_no_shards(tmp_path):
+    data_manager = ShardedJSONDataManager(str(tmp_path), buckets=8)
+
+    assert data_manager.get_username_and_movies("unknown") is None
+    assert data_manager.get_all_reviews("unknown") == {}
+    assert data_manager.delete_user("unknown") is False
+    assert data_manager.add_movie("unknown", movie_data("Batman", 1989)) is False
+    assert data_manager.update_user_movies("unknown", "1", {"rating": 9}) is False
+    assert data_manager.delete_user_movie("unknown", "1") is False
+    assert data_manager.add_review("unknown", "1", "Great") is False
+    assert shard_files(tmp_path) == []
+
+
+def test_users_and_movies_live_in_their_shard(tmp_path):
+    data_manager = ShardedJSONDataManager(str(tmp_path), buckets=8)
+    data_manager.add_user("Alice")
+    user_id = next(iter(data_manager.get_all_users()))
+
+    assert data_manager.add_movie(user_id, movie_data("Batman", 1989))
+    assert not data_manager.add_movie(user_id, movie_data("Batman", 1989))
+
+    username, movies = ShardedJSONDataManager(str(tmp_path), buckets=8).get_username_and_movies(user_id)
+    assert (username, [movie["title"] for movie in movies.values()]) == ("Alice", ["Batman"])
+    assert shard_files(tmp_path) == [f"{data_manager.bucket_for(user_id)}.json"]
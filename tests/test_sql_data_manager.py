@@ -0,0 +1,126 @@
+import pytest
+from sqlalchemy import event
+from data_manager.listing import next_cursor
+from data_manager.migrations import add_search_index
+from data_manager.sql_data_models import db
+from tests.conftest import movie_data
+
+
+class StatementCounter:
+    """Counts the statements sent to an engine while it is active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+
+def seed_user(data_manager, movie_count, review_count):
+    """Add a user with `movie_count` favorites and `review_count` reviews of the first one."""
+    data_manager.add_user("Alice")
+    user_id = max(data_manager.get_all_users())
+    for number in range(movie_count):
+        data_manager.add_movie(user_id, movie_data(f"Movie {number}", imdb_id=f"tt{number:07d}"))
+
+    movie_id = int(min(data_manager.get_username_and_movies(user_id)[1], key=int))
+    for number in range(review_count):
+        data_manager.add_review(user_id, movie_id, f"Review {number}")
+    db.session.expire_all()
+    return user_id, movie_id
+
+
+@pytest.mark.parametrize("count", [1, 10, 50])
+def test_user_movies_take_a_fixed_number_of_statements(sql_app, count):
+    app, data_manager = sql_app
+    user_id, _ = seed_user(data_manager, count, 0)
+
+    with StatementCounter(db.engine) as counter:
+        username, movies = data_manager.get_username_and_movies(user_id)
+
+    assert (username, len(movies)) == ("Alice", count)
+    # One statement for the user, one for all of their movies
+    assert len(counter.statements) == 2
+
+
+@pytest.mark.parametrize("count", [1, 10, 50])
+def test_reviews_take_a_single_statement(sql_app, count):
+    app, data_manager = sql_app
+    _, movie_id = seed_user(data_manager, 1, count)
+
+    with StatementCounter(db.engine) as counter:
+        reviews = data_manager.get_all_reviews(movie_id, limit=100)
+
+    assert len(reviews) == count
+    assert {review["user_name"] for review in reviews.values()} == {"Alice"}
+    assert len(counter.statements) == 1
+
+
+def test_add_movie_tells_incomplete_data_from_duplicates(sql_app):
+    app, data_manager = sql_app
+    user_id, _ = seed_user(data_manager, 1, 0)
+
+    with pytest.raises(ValueError):
+        data_manager.add_movie(user_id, movie_data("Unreleased", rating="N/A"))
+    assert data_manager.add_movie(user_id, movie_data("Movie 0", imdb_id="tt0000000")) is False
+
+    added = data_manager.add_movies(user_id, [movie_data("New"), movie_data("No Year", year="N/A"),
+                                              movie_data("New")])
+    assert added == [True, None, False]
+
+
+def test_search_falls_back_to_like_without_fts5(sql_app):
+    app, data_manager = sql_app
+    data_manager.add_user("Alice")
+    user_id = max(data_manager.get_all_users())
+    for title in ("The Dark Knight", "Dark City", "Knight and Day", "Heat"):
+        data_manager.add_movie(user_id, movie_data(title))
+    movie_id = int(min(data_manager.get_username_and_movies(user_id)[1], key=int))
+    data_manager.add_review(user_id, movie_id, "Dark, gritty and long")
+
+    full_text_movies = data_manager.search_movies("dark kni")
+    data_manager.has_full_text_search = False
+    like_movies = data_manager.search_movies("dark kni")
+
+    assert set(like_movies) == set(full_text_movies)
+    assert like_movies[str(movie_id)]["title_highlight"] == "The \x02Dark\x03 \x02Knight\x03"
+    assert list(data_manager.search_reviews("GRITTY")) == list(data_manager.search_reviews("gritty"))
+    assert data_manager.search_reviews("gritty")[str(movie_id)]["snippet"] == "Dark, \x02gritty\x03 and long"
+
+    # Cursor over the constant score -> Pages continue by movie ID
+    first_page = data_manager.search_movies("dark", limit=1)
+    second_page = data_manager.search_movies("dark", after=next_cursor(first_page, 1, "score"), limit=1)
+    assert len(first_page) == len(second_page) == 1
+    assert set(first_page) | set(second_page) == set(data_manager.search_movies("dark"))
+
+
+def test_search_index_migration_is_skipped_without_fts5():
+    class Connection:
+        statements = []
+
+        def exec_driver_sql(self, statement):
+            self.statements.append(statement)
+            return [("THREADSAFE=1",)]
+
+    connection = Connection()
+    add_search_index(connection)
+    assert connection.statements == ["PRAGMA compile_options"]
+
+
+def test_iter_users_yields_every_user_in_id_order(sql_app):
+    _, data_manager = sql_app
+    for number in range(5):
+        data_manager.add_user(f"User {number}")
+
+    users = list(data_manager.iter_users(batch_size=2))
+
+    assert [user["name"] for _, user in users] == [f"User {number}" for number in range(5)]
+    assert [user_id for user_id, _ in users] == sorted(user_id for user_id, _ in users)
@@ -0,0 +1,71 @@
+import logging
+import pytest
+from flask import Flask, jsonify
+from data_manager.sql_data_manager import SQLiteDataManager
+from data_manager.sql_profiler import SQLProfiler
+from metrics import MetricsRegistry
+
+
+@pytest.fixture
+def profiled_app(tmp_path):
+    """An app whose routes list users with one query, or with one query per user (N+1)."""
+    app = Flask(__name__)
+    metrics = MetricsRegistry()
+    profiler = SQLProfiler(slow_query_seconds=10, repeat_threshold=3, metrics=metrics)
+    profiler.init_app(app, debug_header=True)
+    data_manager = SQLiteDataManager(app, f"sqlite:///{tmp_path / 'movies.sqlite'}", pool_size=1,
+                                     profiler=profiler)
+
+    @app.route("/users")
+    def users():
+        return jsonify(data_manager.get_all_users())
+
+    @app.route("/users/movies")
+    def users_movies():
+        return jsonify({user_id: data_manager.get_username_and_movies(user_id)[0]
+                        for user_id in data_manager.get_all_users()})
+
+    with app.app_context():
+        for number in range(4):
+            data_manager.add_user(f"User {number}")
+    return app, metrics, profiler
+
+
+def profile(response) -> dict:
+    """Parse the X-SQL-Profile header, e.g. "queries=12; time_ms=3.41; repeated=1"."""
+    return dict(field.split("=") for field in response.headers["X-SQL-Profile"].split("; "))
+
+
+def test_statements_are_counted_per_request(profiled_app):
+    app, metrics, _ = profiled_app
+
+    response = app.test_client().get("/users")
+
+    assert profile(response)["queries"] == "1"
+    assert profile(response)["repeated"] == "0"
+    lines = metrics.render().splitlines()
+    assert 'sql_queries_per_request_count{route="/users"} 1' in lines
+    assert any(line.startswith('sql_query_duration_seconds_count{statement="SELECT"}') for line in lines)
+
+
+def test_repeated_statements_are_flagged_as_n_plus_one(profiled_app, caplog):
+    app, metrics, _ = profiled_app
+
+    with caplog.at_level(logging.WARNING, logger="data_manager.sql_profiler"):
+        response = app.test_client().get("/users/movies")
+
+    assert int(profile(response)["queries"]) > 4
+    assert profile(response)["repeated"] != "0"
+    assert "Possible N+1 query on GET /users/movies" in caplog.text
+    assert any(line.startswith('sql_repeated_queries_total{route="/users/movies"}')
+               for line in metrics.render().splitlines())
+
+
+def test_slow_statements_are_logged(profiled_app, caplog):
+    app, _, profiler = profiled_app
+    profiler.slow_query_seconds = 0
+
+    with caplog.at_level(logging.WARNING, logger="data_manager.sql_profiler"):
+        app.test_client().get("/users")
+
+    assert "Slow query" in caplog.text
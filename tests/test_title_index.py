@@ -0,0 +1,27 @@
+from data_manager.title_index import TitlePrefixIndex, normalize_title
+
+
+def test_titles_are_normalized():
+    assert normalize_title("  The   Dark\tKnight ") == "the dark knight"
+    assert normalize_title("STRASSE") == normalize_title("Straße")
+
+
+def test_suggest_returns_titles_by_prefix_in_order():
+    index = TitlePrefixIndex()
+    index.build(["The Matrix", "the  matrix", "The Mask", "Heat", None, "The Thing"])
+
+    assert len(index) == 4
+    assert index.suggest("the ma") == ["The Mask", "The Matrix"]
+    assert index.suggest("THE", limit=2) == ["The Mask", "The Matrix"]
+    assert index.suggest("Zodiac") == []
+    assert index.suggest("  ") == []
+
+
+def test_added_titles_are_suggested():
+    index = TitlePrefixIndex()
+    index.build(["Heat"])
+
+    index.add("Heathers")
+    index.add("heat")
+
+    assert index.suggest("hea") == ["Heat", "Heathers"]
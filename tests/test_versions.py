@@ -0,0 +1,141 @@
+from flask import Flask
+from data_manager.caching_data_manager import CachingDataManager, TaggedCache
+from data_manager.listing import MovieQuery
+from data_manager.sql_data_manager import SQLiteDataManager
+from data_manager.json_data_manager import JSONDataManager
+from data_manager.versioned_data_manager import (DataVersions, SQLiteDataVersions, VersionedDataManager,
+                                                 user_version_keys)
+from tests.conftest import movie_data
+
+
+class Worker:
+    """One app process: its own app, engine, read cache and versions on a shared database."""
+
+    def __init__(self, db_uri):
+        self.app = Flask(__name__)
+        sql_data_manager = SQLiteDataManager(self.app, db_uri, pool_size=1)
+        self.engine = sql_data_manager.engine
+        self.data_manager = CachingDataManager(sql_data_manager,
+                                               invalidation_bus=SQLiteDataVersions(self.engine))
+        self.versions = SQLiteDataVersions(self.engine)
+
+    def __getattr__(self, name):
+        method = getattr(self.data_manager, name)
+
+        def in_app_context(*args, **kwargs):
+            with self.app.app_context():
+                return method(*args, **kwargs)
+        return in_app_context
+
+
+def two_workers(tmp_path):
+    db_uri = f"sqlite:///{tmp_path / 'movies.sqlite'}"
+    return Worker(db_uri), Worker(db_uri)
+
+
+def test_writes_bump_versions_seen_by_every_worker(tmp_path):
+    first, second = two_workers(tmp_path)
+    first.add_user("Alice")
+    user_id = next(iter(first.get_all_users()))
+    keys = user_version_keys(user_id)
+
+    etag, last_modified = second.versions.etag(keys), second.versions.last_modified(keys)
+    assert first.versions.etag(keys) == etag
+
+    first.add_movie(user_id, movie_data("Batman", 1989))
+
+    assert second.versions.etag(keys) != etag
+    assert second.versions.etag(keys) == first.versions.etag(keys)
+    assert second.versions.last_modified(keys) >= last_modified
+
+
+def test_writes_outside_the_app_bump_versions(tmp_path):
+    first, second = two_workers(tmp_path)
+    first.add_user("Alice")
+    etag = second.versions.etag(("global", "users"))
+
+    # Like the backfill CLI, writing straight to the database
+    with first.engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE user SET user = 'Alicia'")
+
+    assert second.versions.etag(("global", "users")) != etag
+
+
+def test_read_cache_drops_what_other_workers_wrote(tmp_path):
+    first, second = two_workers(tmp_path)
+    first.add_user("Alice")
+    user_id = next(iter(first.get_all_users()))
+
+    assert second.get_username_and_movies(user_id) == ("Alice", {})
+    first.add_movie(user_id, movie_data("Batman", 1989))
+
+    username, movies = second.get_username_and_movies(user_id)
+    assert [movie["title"] for movie in movies.values()] == ["Batman"]
+
+
+def test_polling_versions_returns_the_changed_keys_once(tmp_path):
+    first, second = two_workers(tmp_path)
+    versions = SQLiteDataVersions(second.engine)
+    first.add_user("Alice")
+    user_id = next(iter(first.get_all_users()))
+    first.add_movie(user_id, movie_data("Batman", 1989))
+
+    assert {"global", "users", f"user:{user_id}"} <= versions.poll()
+    assert versions.poll() == set()
+
+
+def test_memory_versions_change_with_every_bump():
+    versions = DataVersions()
+    etag, last_modified = versions.etag(("user:1",)), versions.last_modified(("user:1",))
+
+    versions.bump(("global", "user:2"))
+    assert versions.etag(("user:1",)) == etag
+
+    versions.bump(("global", "user:1"))
+    assert versions.etag(("user:1",)) != etag
+    assert versions.last_modified(("user:1",)) >= last_modified
+
+
+def test_versioned_data_manager_bumps_the_versions_of_its_writes(tmp_path):
+    filename = tmp_path / "movie_data.json"
+    filename.write_text("{}")
+    data_manager = VersionedDataManager(JSONDataManager(str(filename)))
+    data_manager.add_user("Alice")
+    user_id = next(iter(data_manager.get_all_users()))
+    keys = user_version_keys(user_id)
+    etag = data_manager.versions.etag(keys)
+
+    data_manager.add_movie(user_id, movie_data("Batman", 1989))
+
+    assert data_manager.versions.etag(keys) != etag
+
+
+def test_tagged_cache_invalidates_by_tag_and_skips_stale_loads():
+    cache = TaggedCache()
+    cache.set("alice", "Alice's movies", {"user:1", "movie:7"})
+    cache.set("bob", "Bob's movies", {"user:2"})
+
+    generation = cache.generation
+    cache.invalidate({"movie:7"})
+    cache.set("carol", "loaded before the invalidation", {"user:3"}, generation)
+
+    assert cache.get("alice") == (False, None)
+    assert cache.get("bob") == (True, "Bob's movies")
+    assert cache.get("carol") == (False, None)
+
+
+def test_query_pages_drop_when_a_shared_movie_changes_into_them(sql_app):
+    app, sql_data_manager = sql_app
+    data_manager = CachingDataManager(sql_data_manager)
+    for name in ("Alice", "Bob"):
+        data_manager.add_user(name)
+    alice_id, bob_id = sorted(data_manager.get_all_users(), key=int)
+    for user_id in (alice_id, bob_id):
+        data_manager.add_movie(user_id, movie_data("Batman", 1989))
+    movie_id = next(iter(data_manager.get_username_and_movies(bob_id)[1]))
+    highly_rated = MovieQuery(min_rating=8)
+
+    assert data_manager.get_username_and_movies(bob_id, highly_rated) == ("Bob", {})
+    data_manager.update_user_movies(alice_id, movie_id, {"rating": 9.0})
+
+    assert list(data_manager.get_username_and_movies(bob_id, highly_rated)[1]) == [movie_id]